@@ -53,6 +53,7 @@ def pytest_runtest_setup(item):
     Per-test setup.
     - Add an option to run those tests marked as 'slow'
     - Clear the django cache between runs
+    - Clear the in-process caches between runs
     """
 
     if 'slow' in item.keywords and not item.config.getoption("--runslow"):
@@ -62,6 +63,20 @@ def pytest_runtest_setup(item):
 
     cache.clear()
 
+    from treeherder.etl.perf import signature_cache
+    from treeherder.etl.taskcluster_pulse.handler import task_group_verdicts
+    from treeherder.log_parser.failureline import group_cache
+    from treeherder.model.bugscache_index import bugscache_index
+    from treeherder.model.reference_data import reference_data
+    from treeherder.utils.taskcluster import task_definitions
+
+    signature_cache.clear()
+    group_cache.clear()
+    bugscache_index.clear()
+    reference_data.clear()
+    task_definitions.clear()
+    task_group_verdicts.clear()
+
 
 @pytest.fixture(scope="session", autouse=True)
 def block_unmocked_requests():
@@ -1,9 +1,15 @@
+import copy
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mock import MagicMock
 
 from tests.test_utils import add_log_response
-from treeherder.etl.jobs import store_job_data
+from treeherder.etl.jobs import _load_job, _remove_existing_jobs, store_job_data
 from treeherder.model.error_summary import get_error_summary
-from treeherder.model.models import Job, JobLog, TextLogError
+from treeherder.model.models import Job, JobLog, Push, TextLogError
 
 
 def check_job_log(test_repository, job_guid, parse_status):
@@ -119,3 +125,61 @@ def test_store_job_with_default_tier(test_repository, failure_classifications, p
 
     job = Job.objects.get(guid=job_guid)
     assert job.tier == 1
+
+
+@pytest.mark.slow
+def test_store_job_states_benchmark(
+    test_repository,
+    failure_classifications,
+    push_stored,
+    pending_job,
+    running_job,
+    completed_job,
+    mock_log_parser,
+):
+    """
+    Compare storing the pending, running and completed states of jobs with
+    the former way, which looked up and updated each job with several
+    queries.
+    """
+    revision = push_stored[0]['revision']
+
+    def get_job_states(prefix, count=50):
+        job_states = []
+        for i in range(count):
+            for job_state in (pending_job, running_job, completed_job):
+                datum = copy.deepcopy(job_state)
+                datum['revision'] = revision
+                datum['job']['job_guid'] = '{}{}'.format(prefix, i)
+                job_states.append(datum)
+        return job_states
+
+    def store_with_upserts(job_states):
+        for datum in job_states:
+            store_job_data(test_repository, [datum])
+
+    def store_job_by_job(job_states):
+        for datum in job_states:
+            for datum in _remove_existing_jobs([datum]):
+                push_id = Push.objects.values_list('id', flat=True).get(revision=revision)
+                _load_job(test_repository, datum['job'], push_id)
+
+    results = {}
+    for name, store in [('upserts', store_with_upserts), ('job by job', store_job_by_job)]:
+        job_states = get_job_states(name)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            store(job_states)
+            duration = time.perf_counter() - start
+        results[name] = (len(context.captured_queries), duration)
+        assert set(Job.objects.filter(guid__startswith=name).values_list('state', flat=True)) == {
+            'completed'
+        }
+
+    print(
+        "stored {} job states: {} queries in {:.3f}s with upserts, "
+        "{} queries in {:.3f}s job by job".format(
+            len(job_states), *results['upserts'], *results['job by job']
+        )
+    )
+    assert results['upserts'][0] < results['job by job'][0]
@@ -1,6 +1,12 @@
+import json
+import os
+from datetime import datetime, timedelta
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from treeherder.etl.bugzilla import BzApiBugProcess
+from treeherder.etl.bugzilla import BzApiBugProcess, is_material_change
 from treeherder.model.models import Bugscache
 
 
@@ -15,3 +21,91 @@ def test_bz_api_process(mock_bugzilla_api_request):
     # test that a second ingestion of the same bugs doesn't insert new rows
     process.run()
     assert Bugscache.objects.count() == 17
+
+
+@pytest.fixture
+def recent_bugs(monkeypatch, test_base_dir):
+    """Serves recently changed sample bugs, and records the parameters of each request."""
+    import treeherder.etl.bugzilla
+
+    with open(os.path.join(test_base_dir, 'sample_data', 'bug_list.json')) as f:
+        bug_list = json.load(f)['bugs']
+    for i, bug in enumerate(bug_list):
+        last_change_time = datetime.utcnow() - timedelta(days=10, minutes=i)
+        bug['last_change_time'] = last_change_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    requests = []
+
+    def _fetch_json(url, params=None):
+        requests.append(params)
+        return {'bugs': bug_list}
+
+    monkeypatch.setattr(treeherder.etl.bugzilla, 'fetch_json', _fetch_json)
+    return bug_list, requests
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bz_api_process_incremental(recent_bugs):
+    bug_list, requests = recent_bugs
+    process = BzApiBugProcess()
+    process.run()
+    assert Bugscache.objects.count() == len(bug_list)
+    assert 'last_change_time' not in requests[-1]
+
+    # only the bugs changed since the last sync are requested and written
+    newest_change = max(bug['last_change_time'] for bug in bug_list)
+    bug_list[:] = [dict(bug_list[0], summary='Intermittent new summary')]
+    bug_list[0]['last_change_time'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    with CaptureQueriesContext(connection) as context:
+        process.run()
+    assert requests[-1]['last_change_time'] == newest_change
+    assert Bugscache.objects.count() == 17
+    assert Bugscache.objects.get(id=bug_list[0]['id']).summary == 'Intermittent new summary'
+    writes = [q for q in context.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+    assert len(writes) == 1
+
+    # a full sync removes the bugs Bugzilla doesn't return anymore
+    process.run(full=True)
+    assert 'last_change_time' not in requests[-1]
+    assert list(Bugscache.objects.values_list('id', flat=True)) == [bug_list[0]['id']]
+
+
+def test_bz_api_process_fetches_pages_concurrently(monkeypatch):
+    import treeherder.etl.bugzilla
+
+    monkeypatch.setattr(treeherder.etl.bugzilla, 'BUGS_PER_PAGE', 2)
+    monkeypatch.setattr(treeherder.etl.bugzilla, 'MAX_PAGE_REQUESTS_PER_SECOND', 1000)
+
+    def _fetch_json(url, params=None):
+        ids = range(params['offset'], min(params['offset'] + params['limit'], 11))
+        bugs = [
+            {
+                'id': bug_id + 1,
+                'summary': 'Intermittent bug {}'.format(bug_id + 1),
+                'keywords': ['intermittent-failure'],
+                'last_change_time': '2020-01-01T00:00:00Z',
+            }
+            for bug_id in ids
+        ]
+        return {'bugs': bugs}
+
+    monkeypatch.setattr(treeherder.etl.bugzilla, 'fetch_json', _fetch_json)
+
+    bugs = BzApiBugProcess().fetch_bugs()
+    assert sorted(bug.id for bug in bugs) == list(range(1, 12))
+
+
+def test_is_material_change():
+    bug = Bugscache(id=1, status='NEW', resolution='', summary='Intermittent test_foo.js')
+
+    assert is_material_change(None, bug)
+    assert is_material_change(bug, None)
+    assert not is_material_change(
+        bug, Bugscache(id=1, status='ASSIGNED', resolution='', summary=bug.summary)
+    )
+    assert is_material_change(
+        bug, Bugscache(id=1, status='RESOLVED', resolution='FIXED', summary=bug.summary)
+    )
+    assert is_material_change(
+        bug, Bugscache(id=1, status='NEW', resolution='', summary='Intermittent test_bar.js')
+    )
@@ -1,6 +1,8 @@
 import copy
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests import test_utils
 from tests.sample_data_generator import job_data
@@ -307,3 +309,91 @@ def test_ingest_job_with_updated_job_group(
 
     assert second_job.job_group.name == second_job_datum["job"]["group_name"]
     assert first_job.job_group.name == first_job_datum["job"]["group_name"]
+
+
+def test_ingest_job_state_transition_reuses_reference_data(
+    test_repository, failure_classifications, sample_data, sample_push, mock_log_parser
+):
+    """Reference data resolved for a job isn't queried again for its next state"""
+    job_data = sample_data.job_data[:1]
+    job_data[0]['job']['state'] = 'running'
+    test_utils.do_job_ingestion(test_repository, job_data, sample_push)
+
+    job_data[0]['job']['state'] = 'completed'
+    with CaptureQueriesContext(connection) as context:
+        store_job_data(test_repository, job_data)
+
+    reference_data_tables = (
+        'build_platform',
+        'machine_platform',
+        'machine',
+        'job_type',
+        'job_group',
+        'product',
+        'option_collection',
+        'failure_classification',
+        'reference_data_signatures',
+    )
+    for query in context.captured_queries:
+        for table in reference_data_tables:
+            assert 'FROM `{}`'.format(table) not in query['sql']
+    assert Job.objects.get().state == 'completed'
+
+
+def test_ingest_job_batch_query_count(
+    test_repository, failure_classifications, sample_data, sample_push, mock_log_parser
+):
+    """A batch of jobs is stored with the same queries, whatever its size"""
+    job_data = copy.deepcopy(sample_data.job_data[:10])
+    for datum in job_data:
+        datum['job']['state'] = 'running'
+        datum.pop('superseded', None)
+    test_utils.do_job_ingestion(test_repository, job_data, sample_push)
+
+    for datum in job_data:
+        datum['job']['state'] = 'completed'
+    with CaptureQueriesContext(connection) as context:
+        store_job_data(test_repository, job_data)
+
+    push_table = 'FROM {}'.format(connection.ops.quote_name('push'))
+    job_update = 'UPDATE {}'.format(connection.ops.quote_name('job'))
+    push_queries = [query for query in context.captured_queries if push_table in query['sql']]
+    job_updates = [
+        query for query in context.captured_queries if query['sql'].startswith(job_update)
+    ]
+    assert len(push_queries) == 1
+    assert len(job_updates) == 1
+    assert set(Job.objects.values_list('state', flat=True)) == {'completed'}
+
+
+def test_ingest_job_state_transition_writes_changed_columns(
+    test_repository, failure_classifications, sample_data, sample_push, mock_log_parser
+):
+    """A job state is stored with a single write, of the columns it changed"""
+    job_data = sample_data.job_data[:1]
+    job_data[0]['job']['state'] = 'running'
+    test_utils.do_job_ingestion(test_repository, job_data, sample_push)
+
+    def get_job_writes(context):
+        job_table = connection.ops.quote_name('job')
+        return [
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith(
+                ('INSERT INTO {}'.format(job_table), 'UPDATE {}'.format(job_table))
+            )
+        ]
+
+    # nothing changed
+    with CaptureQueriesContext(connection) as context:
+        store_job_data(test_repository, job_data)
+    assert get_job_writes(context) == []
+
+    job_data[0]['job']['state'] = 'completed'
+    with CaptureQueriesContext(connection) as context:
+        store_job_data(test_repository, job_data)
+    job_writes = get_job_writes(context)
+    assert len(job_writes) == 1
+    assert connection.ops.quote_name('state') in job_writes[0]
+    assert connection.ops.quote_name('signature_id') not in job_writes[0]
+    assert Job.objects.get().state == 'completed'
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import uuid
 
@@ -7,7 +8,8 @@ import slugid
 
 from treeherder.etl.exceptions import MissingPushException
 from treeherder.etl.job_loader import JobLoader
-from treeherder.etl.taskcluster_pulse.handler import handleMessage
+from treeherder.etl.taskcluster_pulse import handler
+from treeherder.etl.taskcluster_pulse.handler import handleMessage, ignore_task
 from treeherder.model.models import Job, JobLog, TaskclusterMetadata
 
 
@@ -327,3 +329,81 @@ def change_state_result(test_job, job_loader, new_state, new_result, exp_state,
     job = Job.objects.get(id=1)
     assert job.state == exp_state
     assert job.result == exp_result
+
+
+def test_ingest_pulse_jobs_batch(
+    pulse_jobs, test_repository, push_stored, failure_classifications, mock_log_parser
+):
+    """
+    Ingest a batch of jobs through the JSON Schema validated JobLoader
+    """
+    jl = JobLoader()
+    failed = jl.process_jobs(pulse_jobs, 'https://firefox-ci-tc.services.mozilla.com')
+
+    assert failed == []
+    assert Job.objects.count() == 5
+    assert set(TaskclusterMetadata.objects.values_list('task_id', flat=True)) == set(
+        [
+            'IYyscnNMTLuxzna7PNqUJQ',
+            'XJCbbRQ6Sp-UL1lL-tw5ng',
+            'ZsSzJQu3Q7q2MfehIBAzKQ',
+            'bIzVZt9jQQKgvQYD3a2HQw',
+        ]
+    )
+    assert JobLog.objects.filter(job_id=1).count() == 2
+
+
+@responses.activate
+def test_ingest_pulse_jobs_batch_with_missing_push(
+    pulse_jobs, test_repository, push_stored, failure_classifications, mock_log_parser
+):
+    """
+    A job with a missing push is left out of its batch, the others are ingested
+    """
+    jl = JobLoader()
+    job = pulse_jobs[0]
+    job["origin"]["revision"] = "1234567890123456789012345678901234567890"
+    responses.add(
+        responses.GET,
+        "https://firefox-ci-tc.services.mozilla.com/api/queue/v1/task/IYyscnNMTLuxzna7PNqUJQ",
+        json={},
+        content_type='application/json',
+        status=200,
+    )
+
+    failed = jl.process_jobs(pulse_jobs, 'https://firefox-ci-tc.services.mozilla.com')
+
+    assert failed == [job]
+    assert Job.objects.count() == 4
+
+
+def test_ignore_task_looks_up_decision_task_once_per_group(monkeypatch):
+    """
+    The tasks of a mobile task group share the verdict of its decision task
+    """
+    fetched = []
+
+    class Queue:
+        def __init__(self, options, session):
+            pass
+
+        async def task(self, taskId):
+            fetched.append(taskId)
+            await asyncio.sleep(0)
+            if taskId == 'master-group':
+                return {"metadata": {"source": ["branch:master"]}, "routes": []}
+            return {"metadata": {"source": ["branch:pr-1"]}, "routes": []}
+
+    monkeypatch.setattr(handler.taskcluster.aio, 'Queue', Queue)
+    tasks = [
+        {"payload": {}, "taskGroupId": group}
+        for group in ['master-group', 'pr-group'] * 3 + ['master-group']
+    ]
+
+    verdicts = asyncio.get_event_loop().run_until_complete(
+        asyncio.gather(*[ignore_task(task, 'a', 'https://tc', 'fenix') for task in tasks])
+    )
+
+    assert verdicts == [False, True] * 3 + [False]
+    assert sorted(fetched) == ['master-group', 'pr-group']
+    assert not handler.pending_task_group_lookups
@@ -6,13 +6,14 @@ import time
 
 import pytest
 from typing import List
+from unittest.mock import patch
 
 from django.core.management import call_command
 from django.db import IntegrityError
 
 from tests.etl.test_perf_data_adapters import _verify_signature
 from tests.test_utils import create_generic_job
-from treeherder.etl.perf import store_performance_artifact
+from treeherder.etl.perf import signature_cache, store_performance_artifact
 from treeherder.model.models import Push
 from treeherder.perf.models import (
     MultiCommitDatum,
@@ -311,6 +312,59 @@ def test_changing_extra_options_decouples_perf_signatures(
     assert initial_signature_amount < PerformanceSignature.objects.all().count()
 
 
+def test_ingesting_many_subtests_takes_a_bounded_amount_of_queries(
+    test_repository, perf_job, sample_perf_artifact, django_assert_max_num_queries
+):
+    many_subtests_artifact = copy.deepcopy(sample_perf_artifact)
+    many_subtests_artifact['blob']['suites'][0]['subtests'] = [
+        {'name': 'subtest-{}'.format(i), 'value': float(i), 'unit': MEASUREMENT_UNIT}
+        for i in range(50)
+    ]
+    _, submit_datum = _prepare_test_data(many_subtests_artifact)
+
+    with django_assert_max_num_queries(30):
+        store_performance_artifact(perf_job, submit_datum)
+    signature_amount = PerformanceSignature.objects.count()
+    datum_amount = PerformanceDatum.objects.count()
+
+    # ingesting the same artifact again changes nothing
+    with django_assert_max_num_queries(20):
+        store_performance_artifact(perf_job, submit_datum)
+    assert signature_amount == PerformanceSignature.objects.count()
+    assert datum_amount == PerformanceDatum.objects.count()
+
+
+def test_recurring_signatures_are_resolved_from_cache(
+    test_repository, later_perf_push, perf_job, generic_reference_data, sample_perf_artifact
+):
+    _, submit_datum = _prepare_test_data(sample_perf_artifact)
+    store_performance_artifact(perf_job, submit_datum)
+    assert signature_cache.counters['hits'] == 0
+
+    later_job = create_generic_job(
+        'lateguid', test_repository, later_perf_push.id, generic_reference_data
+    )
+    store_performance_artifact(later_job, submit_datum)
+
+    assert signature_cache.counters['hits'] == DATA_PER_ARTIFACT
+    signature = PerformanceSignature.objects.get(suite='youtube-watch', test='fcp')
+    assert signature.last_updated == later_perf_push.time
+    assert 2 * DATA_PER_ARTIFACT == PerformanceDatum.objects.count()
+
+
+def test_validated_perf_data_is_not_validated_again(
+    test_repository, perf_job, sample_perf_artifact
+):
+    _, submit_datum = _prepare_test_data(sample_perf_artifact)
+    submit_datum['validated'] = True
+
+    with patch('treeherder.etl.perf.validate_perf_data') as validate_perf_data:
+        store_performance_artifact(perf_job, submit_datum)
+
+    assert not validate_perf_data.called
+    assert DATA_PER_ARTIFACT == PerformanceDatum.objects.count()
+
+
 # Multi perf data (for the same job) ingestion workflow
 @pytest.mark.parametrize('PERFHERDER_ENABLE_MULTIDATA_INGESTION', [True, False])
 def test_multi_data_can_be_ingested_for_same_job_and_push(
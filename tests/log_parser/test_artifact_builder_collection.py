@@ -1,7 +1,9 @@
 import pytest
 import responses
+from django.conf import settings
 
 from tests.test_utils import add_log_response
+from treeherder.log_parser import artifactbuildercollection
 from treeherder.log_parser.artifactbuildercollection import (
     MAX_DOWNLOAD_SIZE_IN_BYTES,
     ArtifactBuilderCollection,
@@ -54,6 +56,23 @@ def test_all_builders_complete():
     assert exp == lpc.artifacts
 
 
+@responses.activate
+@pytest.mark.parametrize('processes', [0, 2])
+def test_parsing_stops_once_builders_are_saturated(processes, monkeypatch):
+    """Once the error lines reported are all found, the rest of the log is skipped."""
+    monkeypatch.setattr(artifactbuildercollection, 'CHUNK_SIZE_IN_BYTES', 64 * 1024)
+    url = add_log_response('large-number-of-error-lines.txt.gz')
+    builder = LogViewerArtifactBuilder(url)
+    lpc = ArtifactBuilderCollection(url, builders=[builder], processes=processes)
+
+    lpc.parse()
+
+    assert lpc.complete
+    assert len(lpc.artifacts[builder.name]['errors']) == settings.MAX_ERROR_LINES
+    # the log has 17673 lines
+    assert builder.lineno < 17000
+
+
 @responses.activate
 def test_log_download_size_limit():
     """Test that logs whose Content-Length exceed the size limit are not parsed."""
@@ -71,3 +90,28 @@ def test_log_download_size_limit():
 
     with pytest.raises(LogSizeException):
         lpc.parse()
+
+
+@responses.activate
+@pytest.mark.parametrize(
+    'log',
+    [
+        # windows line endings
+        'crash-1.txt.gz',
+        # more errors than reported
+        'large-number-of-error-lines.txt.gz',
+        # performance data
+        'mozilla-inbound-linux64-bm72-build1-build225.txt.gz',
+    ],
+)
+def test_parsing_in_chunks(log, monkeypatch):
+    """Logs parsed in chunks by several processes get the same artifacts."""
+    url = add_log_response(log)
+    lpc = ArtifactBuilderCollection(url, processes=0)
+    lpc.parse()
+
+    monkeypatch.setattr(artifactbuildercollection, 'CHUNK_SIZE_IN_BYTES', 64 * 1024)
+    chunked_lpc = ArtifactBuilderCollection(url, processes=2)
+    chunked_lpc.parse()
+
+    assert lpc.artifacts == chunked_lpc.artifacts
@@ -1,5 +1,9 @@
+import gzip
+import os
+
 import pytest
 
+from tests.sampledata import SampleData
 from treeherder.log_parser.parsers import ErrorParser
 
 ERROR_TEST_CASES = (
@@ -108,6 +112,11 @@ def test_error_lines_matched(line):
     assert len(parser.artifact) == 1
 
 
+@pytest.mark.parametrize("term", ErrorParser.IN_SEARCH_TERMS)
+def test_search_terms_are_error_candidates(term):
+    assert ErrorParser().is_error_candidate(term)
+
+
 @pytest.mark.parametrize("line", ERROR_TEST_CASES)
 def test_error_lines_taskcluster(line):
     parser = ErrorParser()
@@ -148,3 +157,17 @@ def test_taskcluster_strip_prefix():
     parser.parse_line("[vcs 2016-09-07T19:03:02.188327Z] 23:57:52 ERROR - Return code: 1", 3)
     assert len(parser.artifact) == 1
     assert parser.artifact[0]['linenumber'] == 3
+
+
+@pytest.mark.slow
+def test_error_candidates_cover_sample_logs():
+    """Only lines which aren't error candidates may skip the full checks."""
+    sample_data = SampleData()
+    parser = ErrorParser()
+    for log_name in sorted(os.listdir(sample_data.logs_dir)):
+        if not log_name.endswith('.txt.gz'):
+            continue
+        with gzip.open(sample_data.get_log_path(log_name), 'rt', errors='replace') as log:
+            for line in log:
+                if not parser.is_error_candidate(line):
+                    assert not parser._is_error_line(line), line
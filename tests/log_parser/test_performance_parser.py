@@ -1,5 +1,12 @@
+import gzip
 import json
+import os
+import re
+import timeit
 
+import pytest
+
+from tests.sampledata import SampleData
 from treeherder.log_parser.parsers import EmptyPerformanceData, PerformanceParser
 
 
@@ -30,3 +37,62 @@ def test_performance_log_parsing_malformed_perfherder_data():
     parser.parse_line('PERFHERDER_DATA: {}'.format(json.dumps(valid_perfherder_data)), 3)
 
     assert parser.get_artifact() == [valid_perfherder_data]
+
+
+@pytest.mark.parametrize(
+    'line, data',
+    [
+        ('PERFHERDER_DATA: {"a": 1}', '{"a": 1}'),
+        ('12:00:00 INFO - PERFHERDER_DATA:  {"a": {"b": 2}} \r', '{"a": {"b": 2}}'),
+        ('PERFHERDER_DATA: none here, PERFHERDER_DATA: {"a": 1}', '{"a": 1}'),
+        ('PERFHERDER_DATA:{"a": 1}', None),
+        ('PERFHERDER_DATA: not json', None),
+        ('TEST-PASS | some/test.js', None),
+    ],
+)
+def test_find_data(line, data):
+    assert PerformanceParser.find_data(line) == data
+
+
+def test_find_data_lines():
+    chunk = b'first line\r\nPERFHERDER_DATA: {"a": 1}\r\nother line\nlast PERFHERDER_DATA: {}'
+
+    offsets = PerformanceParser.find_data_lines(chunk)
+
+    assert [chunk[start:end] for (start, end) in offsets] == [
+        line for line in chunk.splitlines() if b'PERFHERDER_DATA' in line
+    ]
+
+
+@pytest.mark.slow
+def test_find_data_benchmark():
+    sample_data = SampleData()
+    lines = []
+    for log_name in sorted(os.listdir(sample_data.logs_dir)):
+        if log_name.endswith('.txt.gz'):
+            with gzip.open(sample_data.get_log_path(log_name), 'rt', errors='replace') as log:
+                lines.extend(log.read().splitlines())
+
+    # how PERFHERDER_DATA lines used to be matched
+    re_performance = re.compile(r'.*?PERFHERDER_DATA:\s+({.*})')
+
+    def regex_data(line):
+        match = re_performance.match(line)
+        return match.group(1) if match else None
+
+    assert [regex_data(line) for line in lines] == [
+        PerformanceParser.find_data(line) for line in lines
+    ]
+
+    before = min(timeit.repeat(lambda: [regex_data(line) for line in lines], number=1, repeat=3))
+    after = min(
+        timeit.repeat(
+            lambda: [PerformanceParser.find_data(line) for line in lines], number=1, repeat=3
+        )
+    )
+    print(
+        "matched {} lines: {:.0f} lines/s before, {:.0f} lines/s after".format(
+            len(lines), len(lines) / before, len(lines) / after
+        )
+    )
+    assert after < before
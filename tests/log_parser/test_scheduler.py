@@ -0,0 +1,69 @@
+from unittest.mock import Mock
+
+import pytest
+
+from treeherder.log_parser import scheduler, tasks
+from treeherder.model.models import Job, JobLog, Repository
+
+
+@pytest.fixture
+def apply_async(monkeypatch):
+    apply_async = Mock()
+    monkeypatch.setattr(tasks.parse_logs, 'apply_async', apply_async)
+    return apply_async
+
+
+def job_logs(*names, status=JobLog.PENDING):
+    return [JobLog(id=i, name=name, url='', status=status) for i, name in enumerate(names, 1)]
+
+
+def test_schedule_log_parsing_groups_logs_per_lane(apply_async):
+    repository = Repository(name='mozilla-central')
+    logs = job_logs('live_backing_log', 'errorsummary_json', 'buildbot_text')
+
+    scheduler.schedule_log_parsing(
+        [(Job(id=1), logs, 'success'), (Job(id=2), logs, 'testfailed')], repository
+    )
+
+    calls = [
+        (call[1]['queue'], call[1]['priority'], call[1]['args'])
+        for call in apply_async.call_args_list
+    ]
+    assert calls == [
+        ('log_parser_fail_json_sheriffed', 3, [2, [2], 'failures']),
+        ('log_parser_fail_raw_sheriffed', 3, [2, [1], 'failures']),
+        ('log_parser', 1, [1, [1, 2], 'normal']),
+    ]
+    assert all(call[1]['kwargs']['lane'] == call[1]['queue'] for call in apply_async.call_args_list)
+
+
+def test_schedule_log_parsing_orders_lanes(apply_async):
+    logs = job_logs('live_backing_log')
+
+    scheduler.schedule_log_parsing(
+        [(Job(id=1), logs, 'success'), (Job(id=2), logs, 'busted')], Repository(name='try')
+    )
+
+    assert [call[1]['queue'] for call in apply_async.call_args_list] == [
+        'log_parser_fail_raw_unsheriffed',
+        'log_parser',
+    ]
+    assert [call[1]['priority'] for call in apply_async.call_args_list] == [2, 0]
+
+
+def test_schedule_log_parsing_skips_parsed_logs(apply_async):
+    logs = job_logs('live_backing_log', status=JobLog.PARSED)
+
+    scheduler.schedule_log_parsing([(Job(id=1), logs, 'success')], Repository(name='try'))
+
+    assert not apply_async.called
+
+
+def test_get_lane_depths():
+    channel = Mock()
+    channel.queue_declare.side_effect = lambda queue, passive: (queue, len(queue), 1)
+
+    depths = scheduler.get_lane_depths(Mock(default_channel=channel))
+
+    assert depths == {lane: len(lane) for lane in scheduler.LANES}
+    assert all(call[2]['passive'] for call in channel.queue_declare.mock_calls)
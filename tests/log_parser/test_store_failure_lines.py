@@ -6,6 +6,7 @@ from django.conf import settings
 from requests.exceptions import HTTPError
 
 from treeherder.log_parser.failureline import (
+    read_log,
     store_failure_lines,
     write_failure_lines,
     get_group_results,
@@ -183,6 +184,44 @@ def test_store_error_summary_group_status(activate_responses, test_repository, t
     assert error_groups.first().name == "toolkit/components/pictureinpicture/tests/browser.ini"
 
 
+def test_store_error_summary_group_status_in_bulk(
+    activate_responses, test_repository, test_job, django_assert_max_num_queries
+):
+    log_path = SampleData().get_log_path("mochitest-browser-chrome_errorsummary.log")
+    log_url = 'http://my-log.mozilla.org'
+
+    with open(log_path) as log_handler:
+        responses.add(responses.GET, log_url, body=log_handler.read(), status=200)
+
+    # some of the groups are known already
+    Group.objects.create(name="dom/base/test/browser.ini")
+    log_obj = JobLog.objects.create(job=test_job, name="errorsummary_json", url=log_url)
+
+    with django_assert_max_num_queries(15):
+        store_failure_lines(log_obj)
+
+    assert FailureLine.objects.count() == 5
+    assert GroupStatus.objects.filter(job_log=log_obj).count() == 29
+    assert Group.objects.count() == 29
+
+
+def test_read_log_buffers_failure_lines_and_group_results_separately(monkeypatch):
+    log_path = SampleData().get_log_path("mochitest-browser-chrome_errorsummary.log")
+    monkeypatch.setattr(settings, 'FAILURE_LINES_CUTOFF', 3)
+    monkeypatch.setattr(settings, 'GROUP_RESULTS_CUTOFF', 10)
+
+    with open(log_path) as log_handler:
+        log_iter = (json.loads(line) for line in log_handler)
+        log_list = read_log(log_iter)
+
+        # the rest of the log isn't needed
+        assert len(list(log_iter)) == 35 - 16
+
+    assert [item['action'] for item in log_list] == (
+        ['test_groups'] + ['test_result'] * 2 + ['truncated'] + ['group_result'] * 10
+    )
+
+
 def test_get_group_results(activate_responses, test_repository, test_job):
     log_path = SampleData().get_log_path("mochitest-browser-chrome_errorsummary.log")
     log_url = 'http://my-log.mozilla.org'
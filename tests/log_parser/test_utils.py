@@ -1,13 +1,19 @@
+import gzip
 import os
+import timeit
 from copy import deepcopy
 
 import pytest
 import simplejson as json
 from django.db.utils import DataError
+import jsonschema
 from jsonschema import ValidationError
 
+from tests.sampledata import SampleData
+from treeherder.log_parser.parsers import PerformanceParser
 from treeherder.log_parser.utils import (
     MAX_LENGTH,
+    PERFHERDER_SCHEMA,
     SECOND_MAX_LENGTH,
     _lookup_extra_options_max,
     validate_perf_data,
@@ -111,3 +117,50 @@ def test_model_insert_too_long_string(test_perf_signature):
     test_perf_signature.extra_options = " ".join(too_long_extra_options)
     with pytest.raises(DataError):
         test_perf_signature.save()
+
+
+def test_validate_perf_schema_reports_best_matching_error():
+    datum = deepcopy(LENGTH_OK)
+    datum['suites'][0]['name'] = 42
+
+    with pytest.raises(ValidationError) as exc:
+        validate_perf_data(datum)
+    with pytest.raises(ValidationError) as expected_exc:
+        jsonschema.validate(datum, PERFHERDER_SCHEMA)
+    assert exc.value.message == expected_exc.value.message
+
+
+def _sample_perf_data():
+    sample_data = SampleData()
+    perf_data = []
+    for log_name in sorted(os.listdir(sample_data.logs_dir)):
+        if not log_name.endswith('.txt.gz'):
+            continue
+        with gzip.open(sample_data.get_log_path(log_name), 'rt', errors='replace') as log:
+            for line in log:
+                data = PerformanceParser.find_data(line)
+                if data is not None:
+                    perf_data.append(json.loads(data))
+    return perf_data
+
+
+@pytest.mark.slow
+def test_validate_perf_data_benchmark():
+    perf_data = _sample_perf_data()
+    assert perf_data
+
+    def validate_with_shared_validator():
+        for datum in perf_data:
+            validate_perf_data(datum)
+
+    def validate_with_new_validator():
+        for datum in perf_data:
+            jsonschema.validate(datum, PERFHERDER_SCHEMA)
+
+    shared = min(timeit.repeat(validate_with_shared_validator, number=20, repeat=3))
+    new = min(timeit.repeat(validate_with_new_validator, number=20, repeat=3))
+    print(
+        "validated {} sample payloads 20 times: {:.3f}s with the shared validator, "
+        "{:.3f}s building a validator each time".format(len(perf_data), shared, new)
+    )
+    assert shared < new
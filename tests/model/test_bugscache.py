@@ -1,12 +1,19 @@
 import json
 import os
+import time
 from datetime import datetime, timedelta
 
 import pytest
 from django.db import connection
 from django.test.utils import CaptureQueriesContext
 
-from treeherder.model.models import Bugscache
+from treeherder.model.bugscache_index import (
+    BugscacheIndex,
+    bugscache_index,
+    invalidate_bugscache_index,
+)
+from treeherder.model.error_summary import get_error_summary
+from treeherder.model.models import Bugscache, TextLogError
 
 
 @pytest.fixture
@@ -156,3 +163,208 @@ def test_for_empty_search_query(transactional_db, sample_bugs, search_term, exp_
 
         search_query = get_search_query(context.captured_queries[-1]['sql'])
         assert search_query
+
+
+def _bugscache_row(bug_id, summary, resolution='', modified=None):
+    return {
+        'id': bug_id,
+        'status': 'NEW',
+        'resolution': resolution,
+        'summary': summary,
+        'crash_signature': '',
+        'keywords': 'intermittent-failure',
+        'os': 'Unspecified',
+        'modified': modified or datetime.now(),
+        'whiteboard': '',
+    }
+
+
+def test_bugscache_index_search():
+    index = BugscacheIndex()
+    index.add(
+        [
+            _bugscache_row(1, 'Intermittent browser_foo.js | Test timed out'),
+            _bugscache_row(2, 'browser_foo.js | TIMED OUT, then browser_foo.js | timed out'),
+            _bugscache_row(3, 'Intermittent browser_foo.js | Test timed out', resolution='FIXED'),
+            _bugscache_row(4, 'browser_foo.js | timed out', modified=datetime(2000, 1, 1)),
+            _bugscache_row(5, 'Intermittent browser_bar.js | Test timed out'),
+        ]
+    )
+
+    # case insensitive, ranked by the number of occurrences of the term
+    suggestions = index.search('foo.js | test timed out')
+    assert [b['id'] for b in suggestions['open_recent']] == [1]
+    assert [b['id'] for b in suggestions['all_others']] == [3]
+
+    suggestions = index.search('foo.js |')
+    assert [b['id'] for b in suggestions['open_recent']] == [2, 1]
+    assert [b['id'] for b in suggestions['all_others']] == [3, 4]
+    assert set(suggestions['open_recent'][0].keys()) == {
+        'crash_signature',
+        'resolution',
+        'summary',
+        'keywords',
+        'os',
+        'id',
+        'status',
+        'whiteboard',
+    }
+
+    # terms without any delimited word are checked against every summary
+    assert [b['id'] for b in index.search('imed')['open_recent']] == [2, 1, 5]
+
+    index.add([_bugscache_row(5, 'Intermittent browser_foo.js | Test timed out')])
+    index.remove([1])
+    suggestions = index.search('browser_foo.js | test timed out')
+    assert [b['id'] for b in suggestions['open_recent']] == [5]
+    assert index.search('browser_bar.js') == {'open_recent': [], 'all_others': []}
+
+
+def test_bugscache_index_search_many():
+    index = BugscacheIndex()
+    index.add([_bugscache_row(1, 'Intermittent browser_foo.js | Test timed out')])
+
+    results = index.search_many(['browser_foo.js', 'BROWSER_FOO.JS', 'browser_bar.js'])
+    assert [b['id'] for b in results['browser_foo.js']['open_recent']] == [1]
+    assert results['BROWSER_FOO.JS'] == results['browser_foo.js']
+    assert results['browser_bar.js'] == {'open_recent': [], 'all_others': []}
+    assert index.results.counters == {'hits': 0, 'misses': 2}
+
+    # results are shared with later searches, whatever the case of the terms
+    index.remove([1])
+    results = index.search_many(['Browser_Foo.js'])
+    assert [b['id'] for b in results['Browser_Foo.js']['open_recent']] == [1]
+    assert index.results.counters == {'hits': 1, 'misses': 2}
+
+
+def test_bugscache_search_many(transactional_db, sample_bugs):
+    bug_list = sample_bugs['bugs']
+    _update_bugscache(bug_list)
+
+    search_terms = [search_term for search_term, _ in BUG_SEARCHES]
+    results = Bugscache.search_many(search_terms)
+    assert results == {search_term: Bugscache.search(search_term) for search_term in search_terms}
+
+    # refreshing the index drops the cached results
+    Bugscache.objects.filter(id=455091).delete()
+    invalidate_bugscache_index()
+    results = Bugscache.search_many(['test_popup_preventdefault_chrome.xul'])
+    assert results['test_popup_preventdefault_chrome.xul'] == {
+        'open_recent': [],
+        'all_others': [],
+    }
+
+
+@pytest.mark.parametrize(("search_term", "exp_bugs"), BUG_SEARCHES)
+@pytest.mark.parametrize('days_ago', [50, 400])
+def test_bugscache_index_matches_search(
+    transactional_db, sample_bugs, search_term, exp_bugs, days_ago
+):
+    """Test that the index finds the same bugs as the FULLTEXT search."""
+    bug_list = sample_bugs['bugs']
+    for bug in bug_list:
+        bug['last_change_time'] = datetime.now() - timedelta(days=days_ago)
+    _update_bugscache(bug_list)
+
+    bugscache_index.sync()
+    assert bugscache_index.search(search_term) == Bugscache.search(search_term)
+
+
+def test_bugscache_index_is_refreshed_incrementally(transactional_db, sample_bugs):
+    bug_list = sample_bugs['bugs']
+    _update_bugscache(bug_list)
+    bugscache_index.sync()
+    assert len(bugscache_index) == len(bug_list)
+
+    # nothing changed: the index is only refreshed once invalidated
+    with CaptureQueriesContext(connection) as context:
+        bugscache_index.sync()
+    assert len(context.captured_queries) == 0
+
+    Bugscache.objects.filter(id=455091).delete()
+    Bugscache.objects.filter(id=1054669).update(
+        summary='Intermittent test_switch_frame.py | Connection refused',
+        modified=datetime.now(),
+    )
+    invalidate_bugscache_index()
+
+    with CaptureQueriesContext(connection) as context:
+        bugscache_index.sync()
+    # one query for the modification dates, one for the modified bug
+    assert len(context.captured_queries) == 2
+    assert len(bugscache_index) == len(bug_list) - 1
+
+    assert bugscache_index.search('test_popup_preventdefault_chrome.xul') == {
+        'open_recent': [],
+        'all_others': [],
+    }
+    suggestions = bugscache_index.search('test_switch_frame.py | Connection refused')
+    assert [b['id'] for b in suggestions['open_recent']] == [1054669]
+
+
+def test_bugzilla_update_invalidates_bugscache_index(transactional_db, bugs):
+    bugscache_index.sync()
+    assert len(bugscache_index) == len(bugs)
+    version = bugscache_index.version
+
+    invalidate_bugscache_index()
+    bugscache_index.sync()
+    assert bugscache_index.version != version
+
+
+def test_error_summary_does_not_query_bugscache(transactional_db, sample_bugs, test_job):
+    bug_list = sample_bugs['bugs']
+    for bug in bug_list:
+        bug['last_change_time'] = datetime.now() - timedelta(days=50)
+    _update_bugscache(bug_list)
+    bugscache_index.sync()
+
+    lines = [
+        'TEST-UNEXPECTED-FAIL | test_popup_preventdefault_chrome.xul | Test timed out',
+        'TEST-UNEXPECTED-FAIL | foo/test_switch_frame.py | TimeoutException',
+    ]
+    for line_number, line in enumerate(lines):
+        TextLogError.objects.create(job=test_job, line=line, line_number=line_number)
+
+    with CaptureQueriesContext(connection) as context:
+        error_summary = get_error_summary(test_job)
+
+    assert not any('bugscache' in query['sql'] for query in context.captured_queries)
+    assert [[b['id'] for b in item['bugs']['open_recent']] for item in error_summary] == [
+        [455091],
+        [1054669, 1078237],
+    ]
+
+
+@pytest.mark.slow
+def test_bugscache_index_search_benchmark(transactional_db, sample_bugs):
+    bug_list = sample_bugs['bugs']
+    copies = []
+    for i in range(200):
+        for bug in bug_list:
+            copy = dict(bug, id=bug['id'] * 1000 + i)
+            copy['summary'] = '{} {}'.format(copy['summary'], i)
+            copies.append(copy)
+    _update_bugscache(copies)
+    bugscache_index.sync()
+
+    search_terms = [search_term for search_term, _ in BUG_SEARCHES] * 5
+
+    start = time.perf_counter()
+    searched = [Bugscache.search(search_term) for search_term in search_terms]
+    fulltext_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [bugscache_index.search(search_term) for search_term in search_terms]
+    index_duration = time.perf_counter() - start
+
+    for expected, found in zip(searched, indexed):
+        for bugs in ('open_recent', 'all_others'):
+            assert sorted(b['id'] for b in found[bugs]) == sorted(b['id'] for b in expected[bugs])
+
+    print(
+        'Searched {} bugs for {} terms: FULLTEXT {:.3f}s, index {:.3f}s'.format(
+            len(copies), len(search_terms), fulltext_duration, index_duration
+        )
+    )
+    assert index_duration < fulltext_duration
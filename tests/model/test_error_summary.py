@@ -1,10 +1,18 @@
+from datetime import datetime
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from treeherder.model.bugscache_index import invalidate_bugscache_index
 from treeherder.model.error_summary import (
     get_cleaned_line,
     get_crash_signature,
     get_error_search_term,
+    get_error_summary,
+    refresh_error_summaries,
 )
+from treeherder.model.models import Bugscache, ErrorSummary, TextLogError
 
 LINE_CLEANING_TEST_CASES = (
     (
@@ -242,3 +250,52 @@ def test_get_blacklisted_search_term(line, exp_search_term):
     """Test search term extraction for lines that contain a blacklisted term"""
     actual_search_term = get_error_search_term(line)
     assert actual_search_term == exp_search_term
+
+
+def _create_bug(bug_id, summary):
+    return Bugscache.objects.create(
+        id=bug_id, status='NEW', resolution='', summary=summary, modified=datetime.now()
+    )
+
+
+@pytest.fixture
+def failed_jobs(test_job, test_job_2):
+    """Two jobs with an error line each."""
+    for job, test in ((test_job, 'test_foo.js'), (test_job_2, 'test_bar.js')):
+        line = 'TEST-UNEXPECTED-FAIL | {} | Test timed out'.format(test)
+        TextLogError.objects.create(job=job, line=line, line_number=1)
+    return test_job, test_job_2
+
+
+def test_error_summary_is_stored(transactional_db, failed_jobs):
+    job = failed_jobs[0]
+    _create_bug(1, 'Intermittent test_foo.js | Test timed out')
+
+    error_summary = get_error_summary(job)
+    assert [b['id'] for b in error_summary[0]['bugs']['open_recent']] == [1]
+    assert ErrorSummary.objects.get(job=job).bug_suggestions == error_summary
+
+    # later reads only load the stored suggestions
+    with CaptureQueriesContext(connection) as context:
+        assert get_error_summary(job) == error_summary
+    assert len(context.captured_queries) == 1
+
+
+def test_refresh_error_summaries(transactional_db, failed_jobs):
+    foo_job, bar_job = failed_jobs
+    bug = _create_bug(1, 'Intermittent test_foo.js | Test timed out')
+    get_error_summary(foo_job)
+    get_error_summary(bar_job)
+
+    old_summary = bug.summary
+    bug.summary = 'Intermittent test_bar.js | Test timed out'
+    bug.modified = datetime.now()
+    bug.save()
+    invalidate_bugscache_index()
+
+    # the bug matches a term of both jobs, either before or after the change
+    assert refresh_error_summaries([old_summary, bug.summary]) == 2
+    assert get_error_summary(foo_job)[0]['bugs']['open_recent'] == []
+    assert [b['id'] for b in get_error_summary(bar_job)[0]['bugs']['open_recent']] == [1]
+
+    assert refresh_error_summaries(['Intermittent test_baz.js | Test timed out']) == 0
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from treeherder.model.models import (
+    BuildPlatform,
+    FailureClassification,
+    Machine,
+    Option,
+    OptionCollection,
+)
+from treeherder.model.reference_data import invalidate_reference_data, reference_data
+
+
+def test_reference_data_is_created_once(transactional_db):
+    reference_data.sync()
+    machine = reference_data.get(Machine, name='t-linux64-ms-001')
+    assert Machine.objects.get(name='t-linux64-ms-001').id == machine.id
+
+    with CaptureQueriesContext(connection) as context:
+        assert reference_data.get(Machine, name='t-linux64-ms-001').id == machine.id
+    assert len(context.captured_queries) == 0
+
+    # other processes find the row in the shared cache
+    reference_data.rows.clear()
+    with CaptureQueriesContext(connection) as context:
+        assert reference_data.get(Machine, name='t-linux64-ms-001').id == machine.id
+    assert len(context.captured_queries) == 0
+    assert Machine.objects.count() == 1
+
+
+def test_reference_data_invalidation(transactional_db):
+    reference_data.sync()
+    machine = reference_data.get(Machine, name='t-linux64-ms-001')
+    Machine.objects.all().delete()
+
+    invalidate_reference_data()
+    reference_data.sync()
+    assert reference_data.get(Machine, name='t-linux64-ms-001').id != machine.id
+    assert Machine.objects.count() == 1
+
+
+def test_reference_data_preload(transactional_db, failure_classifications):
+    BuildPlatform.objects.create(os_name='linux', platform='linux64', architecture='x86_64')
+    reference_data.preload()
+
+    with CaptureQueriesContext(connection) as context:
+        build_platform = reference_data.get(
+            BuildPlatform, os_name='linux', platform='linux64', architecture='x86_64'
+        )
+        reference_data.get(FailureClassification, create=False, name='not classified')
+    assert len(context.captured_queries) == 0
+    assert build_platform.platform == 'linux64'
+
+
+def test_reference_data_option_collection(transactional_db):
+    reference_data.sync()
+    option_collection_hash = reference_data.get_option_collection_hash(['opt', 'debug'])
+    assert option_collection_hash == OptionCollection.calculate_hash(['opt', 'debug'])
+    assert set(
+        OptionCollection.objects.filter(option_collection_hash=option_collection_hash).values_list(
+            'option__name', flat=True
+        )
+    ) == {'opt', 'debug'}
+
+    with CaptureQueriesContext(connection) as context:
+        reference_data.get_option_collection_hash(['debug', 'opt'])
+    assert len(context.captured_queries) == 0
+    assert Option.objects.count() == 2
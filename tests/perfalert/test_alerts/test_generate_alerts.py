@@ -1,16 +1,19 @@
 import datetime
 import time
+from unittest.mock import Mock
 
 import pytest
+from django.core.cache import cache
 
 from treeherder.model.models import Push
-from treeherder.perf.alerts import generate_new_alerts_in_series
+from treeherder.perf.alerts import CHANGE_DETECTOR_CACHE_KEY, generate_new_alerts_in_series
 from treeherder.perf.models import (
     PerformanceAlert,
     PerformanceAlertSummary,
     PerformanceDatum,
     PerformanceSignature,
 )
+from treeherder.perf.tasks import generate_alerts, get_alerts_scheduling_counters, schedule_alerts
 
 
 def _verify_alert(
@@ -230,6 +233,48 @@ def test_detect_alerts_in_series_with_retriggers(
     )
 
 
+def test_detect_alerts_in_series_incrementally(
+    test_repository,
+    test_issue_tracker,
+    failure_classifications,
+    generic_reference_data,
+    test_perf_signature,
+):
+    # analyze the series after each new datum, as happens during ingestion
+    base_time = time.time()  # generate it based off current time
+    INTERVAL = 30
+    for i in range(1, INTERVAL + 1):
+        _generate_performance_data(
+            test_repository,
+            test_perf_signature,
+            test_issue_tracker,
+            generic_reference_data,
+            base_time,
+            i,
+            0.5 if i <= INTERVAL / 2 else 1.0,
+            1,
+        )
+        generate_new_alerts_in_series(test_perf_signature)
+
+        state = cache.get(CHANGE_DETECTOR_CACHE_KEY.format(test_perf_signature.id))
+        assert state['last_datum_id'] == PerformanceDatum.objects.latest('id').id
+
+    assert PerformanceAlert.objects.count() == 1
+    assert PerformanceAlertSummary.objects.count() == 1
+    _verify_alert(
+        1,
+        (INTERVAL / 2) + 1,
+        (INTERVAL / 2),
+        test_perf_signature,
+        0.5,
+        1.0,
+        True,
+        PerformanceAlert.UNTRIAGED,
+        PerformanceAlertSummary.UNTRIAGED,
+        None,
+    )
+
+
 def test_no_alerts_with_old_data(
     test_repository,
     test_issue_tracker,
@@ -362,3 +407,32 @@ def test_alert_change_type_absolute(
 
     assert PerformanceAlert.objects.count() == expected_num_alerts
     assert PerformanceAlertSummary.objects.count() == expected_num_alerts
+
+
+def test_schedule_alerts_coalesces_requests(settings, monkeypatch):
+    settings.PERFHERDER_ALERTS_COALESCING_WINDOW = 60
+    apply_async = Mock()
+    monkeypatch.setattr(generate_alerts, 'apply_async', apply_async)
+
+    assert schedule_alerts(1)
+    assert not schedule_alerts(1)
+    assert schedule_alerts(2)
+
+    assert [call[1]['args'] for call in apply_async.call_args_list] == [[1], [2]]
+    assert all(call[1]['countdown'] == 60 for call in apply_async.call_args_list)
+    assert get_alerts_scheduling_counters() == {'received': 3, 'coalesced': 1}
+
+
+def test_generate_alerts_reopens_scheduling(
+    settings, monkeypatch, test_repository, test_perf_signature
+):
+    settings.PERFHERDER_ALERTS_COALESCING_WINDOW = 60
+    apply_async = Mock()
+    monkeypatch.setattr(generate_alerts, 'apply_async', apply_async)
+
+    assert schedule_alerts(test_perf_signature.id)
+    generate_alerts(test_perf_signature.id)
+
+    # data arriving after the analysis started needs a new one
+    assert schedule_alerts(test_perf_signature.id)
+    assert apply_async.call_count == 2
@@ -1,9 +1,11 @@
+import copy
 import os
 
 import pytest
 
 from tests.sampledata import SampleData
 from treeherder.perfalert.perfalert import (
+    ChangeDetector,
     RevisionDatum,
     analyze,
     calc_t,
@@ -13,6 +15,18 @@ from treeherder.perfalert.perfalert import (
 )
 
 
+def _vectorized_detect_changes(*args, **kwargs):
+    pytest.importorskip('numpy')
+    from treeherder.perfalert.perfalert.vectorized import detect_changes_vectorized
+
+    return detect_changes_vectorized(*args, **kwargs)
+
+
+detect_changes_engines = pytest.mark.parametrize(
+    "detect_changes", [detect_changes, _vectorized_detect_changes], ids=["python", "vectorized"]
+)
+
+
 @pytest.mark.parametrize(
     ("revision_data", "weight_fn", "expected"),
     [
@@ -54,7 +68,8 @@ def test_calc_t(old_data, new_data, expected):
     assert calc_t([RevisionDatum(0, 0, old_data)], [RevisionDatum(1, 1, new_data)]) == expected
 
 
-def test_detect_changes():
+@detect_changes_engines
+def test_detect_changes(detect_changes):
     data = []
 
     times = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
@@ -88,7 +103,8 @@ def test_detect_changes():
     ]
 
 
-def test_detect_changes_few_revisions_many_values():
+@detect_changes_engines
+def test_detect_changes_few_revisions_many_values(detect_changes):
     """
     Tests that we correctly detect a regression with
     a small number of revisions but a large number of values
@@ -108,6 +124,7 @@ def test_detect_changes_few_revisions_many_values():
     assert result == [(0, False), (1, True), (1, False)]
 
 
+@detect_changes_engines
 @pytest.mark.parametrize(
     ("filename", "expected_timestamps"),
     [
@@ -120,7 +137,7 @@ def test_detect_changes_few_revisions_many_values():
         ('tp5rss.json', [1372846906, 1373413365, 1373424974]),
     ],
 )
-def test_detect_changes_historical_data(filename, expected_timestamps):
+def test_detect_changes_historical_data(detect_changes, filename, expected_timestamps):
     """Parse JSON produced by http://graphs.mozilla.org/api/test/runs"""
     # Configuration for Analyzer
     FORE_WINDOW = 12
@@ -141,3 +158,70 @@ def test_detect_changes_historical_data(filename, expected_timestamps):
     )
     regression_timestamps = [d.push_timestamp for d in results if d.change_detected]
     assert regression_timestamps == expected_timestamps
+
+
+@pytest.mark.parametrize(
+    "filename", ['runs1.json', 'runs2.json', 'runs3.json', 'a11y.json', 'tp5rss.json']
+)
+def test_vectorized_detect_changes_matches_reference(filename):
+    payload = SampleData.get_perf_data(os.path.join('graphs', filename))
+    data = [RevisionDatum(r[2], r[2], [r[3]]) for r in payload['test_runs']]
+
+    expected = detect_changes(copy.deepcopy(data))
+    actual = _vectorized_detect_changes(copy.deepcopy(data))
+
+    assert [d.change_detected for d in actual] == [d.change_detected for d in expected]
+    for (reference, vectorized) in zip(expected[1:], actual[1:]):
+        assert vectorized.amount_prev_data == reference.amount_prev_data
+        assert vectorized.amount_next_data == reference.amount_next_data
+        assert vectorized.historical_stats == pytest.approx(reference.historical_stats)
+        assert vectorized.forward_stats == pytest.approx(reference.forward_stats)
+        if reference.historical_stats['variance'] or reference.forward_stats['variance']:
+            assert vectorized.t == pytest.approx(reference.t)
+
+
+def test_change_detector_matches_detect_changes():
+    payload = SampleData.get_perf_data(os.path.join('graphs', 'runs2.json'))
+    data = [RevisionDatum(r[2], r[2], [r[3]]) for r in payload['test_runs']]
+
+    detector = ChangeDetector()
+    detector.load(detect_changes(copy.deepcopy(data[:100])))
+    for datum in data[100:]:
+        assert detector.update([copy.deepcopy(datum)]) is not None
+
+    expected = detect_changes(copy.deepcopy(data))
+    assert len(detector.data) == detector.max_revisions
+    assert [(d.push_timestamp, d.t, d.change_detected) for d in detector.data] == [
+        (d.push_timestamp, d.t, d.change_detected) for d in expected[-detector.max_revisions :]
+    ]
+    assert [d.push_timestamp for d in expected if d.change_detected] == [
+        1357704596,
+        1358971894,
+        1365014104,
+    ]
+
+
+def test_change_detector_update_returns_reanalyzed_revisions():
+    detector = ChangeDetector(min_back_window=5, max_back_window=5, fore_window=5, t_threshold=2)
+    detector.load(detect_changes([RevisionDatum(t, t, [0.0]) for t in range(8)]))
+
+    reanalyzed = detector.update([RevisionDatum(t, t, [1.0]) for t in range(8, 16)])
+
+    # the first revision whose fore window sees the new data is 4
+    assert [d.push_timestamp for d in reanalyzed] == list(range(2, 16))
+    assert [d.push_timestamp for d in detector.data if d.change_detected] == [8]
+
+    # a retrigger only affects the revisions around it
+    reanalyzed = detector.update([RevisionDatum(14, 14, [1.0])])
+    assert [d.push_timestamp for d in reanalyzed] == list(range(8, 16))
+    assert len(detector.data[14].values) == 2
+
+
+def test_change_detector_needs_full_analysis_for_old_data():
+    detector = ChangeDetector(
+        min_back_window=2, max_back_window=2, fore_window=2, t_threshold=2, max_revisions=10
+    )
+    detector.load(detect_changes([RevisionDatum(t, t, [0.0]) for t in range(20)]))
+    assert [d.push_timestamp for d in detector.data] == list(range(10, 20))
+
+    assert detector.update([RevisionDatum(5, 5, [1.0])]) is None
@@ -1,8 +1,13 @@
+import asyncio
+import time
+
 import pytest
 from django.conf import settings
 
 from tests.conftest import IS_WINDOWS
-from treeherder.services.pulse.consumers import Consumers, PulseConsumer
+from treeherder.etl.tasks.pulse_tasks import store_pulse_tasks, store_pulse_tasks_batch
+from treeherder.services.pulse import pipeline
+from treeherder.services.pulse.consumers import Consumers, PulseConsumer, TaskConsumer
 
 from .utils import create_and_destroy_exchange
 
@@ -47,3 +52,93 @@ def test_PulseConsumer(pulse_connection):
             None,
         )
         cons.prepare()
+
+
+class FakeMessage:
+    delivery_info = {
+        'exchange': 'exchange/taskcluster-queue/v1/task-pending',
+        'routing_key': 'primary.foo',
+    }
+
+    def __init__(self):
+        self.acked = False
+
+    def ack(self):
+        self.acked = True
+
+
+def test_TaskConsumer_batches_messages(settings, monkeypatch):
+    settings.PULSE_TASKS_BATCH_SIZE = 3
+    settings.PULSE_TASKS_BATCH_WINDOW = 60
+    batches = []
+    monkeypatch.setattr(
+        store_pulse_tasks_batch, 'apply_async', lambda args, queue: batches.append(args[0])
+    )
+
+    cons = TaskConsumer(
+        {
+            "root_url": "https://firefox-ci-tc.services.mozilla.com",
+            "pulse_url": settings.CELERY_BROKER_URL,
+        },
+        None,
+    )
+    messages = [FakeMessage() for _ in range(4)]
+    for index, message in enumerate(messages):
+        cons.on_message({'index': index}, message)
+
+    # the first three messages are handed over and acknowledged together
+    assert [[body['index'] for body, _, _ in batch] for batch in batches] == [[0, 1, 2]]
+    assert [message.acked for message in messages] == [True, True, True, False]
+
+    # the last one once it waited long enough
+    cons.on_iteration()
+    assert len(batches) == 1
+    settings.PULSE_TASKS_BATCH_WINDOW = 0
+    cons.on_iteration()
+    assert [[body['index'] for body, _, _ in batch] for batch in batches] == [[0, 1, 2], [3]]
+    assert messages[3].acked
+
+
+def test_TaskPipeline_stores_handled_messages(settings, monkeypatch):
+    settings.PULSE_TASKS_BATCH_SIZE = 10
+    settings.PULSE_TASKS_BATCH_WINDOW = 60
+    stored = []
+    retried = []
+
+    async def handle_message(message):
+        if message["payload"]["index"] == 2:
+            raise Exception("Task not found")
+        return [message["payload"]]
+
+    def process_jobs(self, pulse_jobs, root_url):
+        stored.extend(job["index"] for job in pulse_jobs)
+        return [job for job in pulse_jobs if job["index"] == 1]
+
+    monkeypatch.setattr(pipeline.handler, 'handleMessage', handle_message)
+    monkeypatch.setattr(pipeline.JobLoader, 'process_jobs', process_jobs)
+    monkeypatch.setattr(
+        store_pulse_tasks, 'apply_async', lambda args, queue: retried.append(args[0]["index"])
+    )
+
+    loop = asyncio.new_event_loop()
+    try:
+        task_pipeline = pipeline.TaskPipeline("https://firefox-ci-tc.services.mozilla.com", loop)
+        messages = [FakeMessage() for _ in range(4)]
+        for index, message in enumerate(messages):
+            exchange = message.delivery_info['exchange']
+            task_pipeline.submit({'index': index}, exchange, 'primary.foo', message)
+        assert task_pipeline.in_flight == 4
+
+        deadline = time.monotonic() + 10
+        while task_pipeline.handled.qsize() < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        task_pipeline.process()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+
+    # messages are stored together, then acknowledged
+    assert stored == [0, 1, 3]
+    assert task_pipeline.in_flight == 0
+    assert all(message.acked for message in messages)
+    # the failed ones are retried on their own
+    assert retried == [1, 2]
@@ -1,10 +1,12 @@
+import copy
 from threading import local
 
 import pytest
 
 from treeherder.etl.exceptions import MissingPushException
 from treeherder.etl.push import store_push_data
-from treeherder.etl.tasks.pulse_tasks import store_pulse_tasks
+from treeherder.etl.tasks import pulse_tasks
+from treeherder.etl.tasks.pulse_tasks import store_pulse_tasks, store_pulse_tasks_batch
 from treeherder.model.models import Job
 
 
@@ -37,3 +39,35 @@ def test_retry_missing_revision_succeeds(
     assert Job.objects.count() == 1
     assert Job.objects.values()[0]["guid"] == job["taskId"]
     assert thread_data.retries == 1
+
+
+def test_store_pulse_tasks_batch(
+    sample_data, push_stored, test_repository, failure_classifications, mock_log_parser, monkeypatch
+):
+    """
+    The jobs of a batch of messages are stored together, messages which fail
+    are handed to store_pulse_tasks.
+    """
+    revision = push_stored[0]["revision"]
+    jobs = copy.deepcopy(sample_data.pulse_jobs)
+    for job in jobs:
+        job["origin"]["project"] = test_repository.name
+        job["origin"]["revision"] = revision
+
+    async def handle_message(message):
+        if message["payload"] is None:
+            raise Exception("Task not found")
+        return [message["payload"]]
+
+    retried = []
+    monkeypatch.setattr(pulse_tasks, "handleMessage", handle_message)
+    monkeypatch.setattr(
+        store_pulse_tasks, "apply_async", lambda args, queue: retried.append(args[:3])
+    )
+
+    messages = [[job, "exchange/taskcluster-queue/v1/task-completed", "bar"] for job in jobs]
+    messages.append([None, "exchange/taskcluster-queue/v1/task-completed", "bar"])
+    store_pulse_tasks_batch(messages, 'https://firefox-ci-tc.services.mozilla.com')
+
+    assert Job.objects.count() == 5
+    assert retried == [messages[-1]]
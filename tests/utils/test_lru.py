@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from treeherder.utils.lru import LRUCache
+
+
+def test_lru_cache_drops_least_recently_used_entries():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'c': 3}
+    assert cache.counters == {'hits': 3, 'misses': 2}
+
+
+def test_lru_cache_entries_expire():
+    cache = LRUCache(max_size=2, timeout=10)
+    with patch('treeherder.utils.lru.time.monotonic', return_value=100):
+        cache.set('a', 1)
+    with patch('treeherder.utils.lru.time.monotonic', return_value=109):
+        assert cache.get('a') == 1
+    with patch('treeherder.utils.lru.time.monotonic', return_value=110):
+        assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_invalidation():
+    cache = LRUCache(max_size=3)
+    cache.set_many({'a': 1, 'b': 2, 'c': 3})
+
+    cache.delete_many(['a', 'b'])
+    assert cache.get_many(['a', 'b', 'c']) == {'c': 3}
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.counters == {'hits': 0, 'misses': 0}
+
+
+def test_lru_cache_can_be_disabled():
+    cache = LRUCache(max_size=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
@@ -0,0 +1,36 @@
+import responses
+from django.core.cache import cache
+
+from treeherder.utils.taskcluster import (
+    TASK_DEFINITION_CACHE_KEY,
+    TaskDefinitionCache,
+    get_task_definition,
+    task_definitions,
+)
+
+ROOT_URL = 'https://firefox-ci-tc.services.mozilla.com'
+
+
+@responses.activate
+def test_get_task_definition_is_cached():
+    url = ROOT_URL + '/api/queue/v1/task/AJAxnJJoQtaFlOjE0B9HyA'
+    responses.add(responses.GET, url, json={'taskGroupId': 'a'}, status=200)
+
+    assert get_task_definition(ROOT_URL, 'AJAxnJJoQtaFlOjE0B9HyA') == {'taskGroupId': 'a'}
+    assert get_task_definition(ROOT_URL, 'AJAxnJJoQtaFlOjE0B9HyA') == {'taskGroupId': 'a'}
+
+    assert len(responses.calls) == 1
+    assert task_definitions.counters == {'hits': 1, 'misses': 1, 'shared_hits': 0}
+
+
+def test_task_definitions_are_shared_between_processes():
+    task_definitions = TaskDefinitionCache(max_size=10, timeout=60, shared=True)
+    other_process = TaskDefinitionCache(max_size=10, timeout=60, shared=True)
+
+    task_definitions.set(ROOT_URL, 'a', {'taskGroupId': 'a'})
+
+    assert cache.get(TASK_DEFINITION_CACHE_KEY.format(ROOT_URL, 'a')) == {'taskGroupId': 'a'}
+    assert other_process.get(ROOT_URL, 'a') == {'taskGroupId': 'a'}
+    assert other_process.get(ROOT_URL, 'a') == {'taskGroupId': 'a'}
+    assert other_process.get('https://other.taskcluster.net', 'a') is None
+    assert other_process.counters == {'hits': 1, 'misses': 1, 'shared_hits': 1}
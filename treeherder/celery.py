@@ -1,10 +1,14 @@
+import logging
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'treeherder.config.settings')
 
+logger = logging.getLogger(__name__)
+
 app = Celery('treeherder')
 
 # Using a string here means the worker doesn't have to serialize
@@ -15,3 +19,15 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def preload_reference_data(**kwargs):
+    # job ingestion resolves platforms, job types... from memory
+    from treeherder.model.reference_data import reference_data
+
+    try:
+        reference_data.preload()
+    except Exception:
+        # lookups fall back to the cache and database
+        logger.exception('Failed to preload reference data')
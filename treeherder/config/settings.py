@@ -39,6 +39,26 @@ PULSE_AUTO_DELETE_QUEUES = env.bool("PULSE_AUTO_DELETE_QUEUES", default=False)
 if os.environ.get("VIRTUAL_ENV"):
     PULSE_AUTO_DELETE_QUEUES = True
 
+# Amount of task messages each Pulse listener hands to the `store_pulse_tasks` workers
+# together (1 hands them one by one), and for how many seconds at most it holds
+# them back before that
+PULSE_TASKS_BATCH_SIZE = env.int("PULSE_TASKS_BATCH_SIZE", default=1)
+PULSE_TASKS_BATCH_WINDOW = env.float("PULSE_TASKS_BATCH_WINDOW", default=1.0)
+
+# Whether the Pulse listeners store task messages themselves rather than handing them
+# to the `store_pulse_tasks` workers, handling up to PULSE_TASKS_PIPELINE_CONCURRENCY
+# messages at once. Messages are stored in batches as above, and only acknowledged
+# once stored.
+PULSE_TASKS_PIPELINE = env.bool("PULSE_TASKS_PIPELINE", default=False)
+PULSE_TASKS_PIPELINE_CONCURRENCY = env.int("PULSE_TASKS_PIPELINE_CONCURRENCY", default=50)
+
+# Amount of Taskcluster task definitions each ingestion process keeps in memory (0
+# disables caching) and for how many seconds, and whether they are also shared with
+# the other processes through the cache
+TASK_DEFINITION_CACHE_SIZE = env.int("TASK_DEFINITION_CACHE_SIZE", default=10000)
+TASK_DEFINITION_CACHE_TIMEOUT = env.int("TASK_DEFINITION_CACHE_TIMEOUT", default=6 * 60 * 60)
+TASK_DEFINITION_SHARED_CACHE = env.bool("TASK_DEFINITION_SHARED_CACHE", default=False)
+
 # Hosts
 SITE_URL = env("SITE_URL", default='http://localhost:8000')
 
@@ -306,21 +326,49 @@ AUTH0_CLIENTID = env('AUTH0_CLIENTID', default="q8fZZFfGEmSB2c5uSI8hOkKdDGXnlo5z
 
 # Celery
 
-# TODO: Replace the use of different log parser queues for failures vs not with the
-# RabbitMQ priority feature (since the idea behind separate queues was only to ensure
-# failures are dealt with first if there is a backlog). After that it should be possible
-# to simplify the queue configuration, by using the recommended CELERY_TASK_ROUTES instead:
+# Whether the log parser queues are declared as priority queues, so that within a
+# lane the logs of failed jobs and of sheriffed trees are parsed first (see
+# `treeherder.log_parser.scheduler`). RabbitMQ refuses to redeclare a queue with
+# different arguments, so the existing log parser queues have to be deleted when
+# this is toggled.
+LOG_PARSER_QUEUE_PRIORITIES = env.bool("LOG_PARSER_QUEUE_PRIORITIES", default=False)
+LOG_PARSER_QUEUE_ARGUMENTS = {'x-max-priority': 3} if LOG_PARSER_QUEUE_PRIORITIES else None
+
+# The log parser queues are the lanes of `treeherder.log_parser.scheduler`. After
+# the lanes rely on the priority feature alone, it should be possible to simplify
+# the queue configuration, by using the recommended CELERY_TASK_ROUTES instead:
 # http://docs.celeryproject.org/en/latest/userguide/routing.html#automatic-routing
 CELERY_TASK_QUEUES = [
     Queue('default', Exchange('default'), routing_key='default'),
-    Queue('log_parser', Exchange('default'), routing_key='log_parser.normal'),
-    Queue('log_parser_fail_raw_sheriffed', Exchange('default'), routing_key='log_parser.failures'),
     Queue(
-        'log_parser_fail_raw_unsheriffed', Exchange('default'), routing_key='log_parser.failures'
+        'log_parser',
+        Exchange('default'),
+        routing_key='log_parser.normal',
+        queue_arguments=LOG_PARSER_QUEUE_ARGUMENTS,
+    ),
+    Queue(
+        'log_parser_fail_raw_sheriffed',
+        Exchange('default'),
+        routing_key='log_parser.failures',
+        queue_arguments=LOG_PARSER_QUEUE_ARGUMENTS,
+    ),
+    Queue(
+        'log_parser_fail_raw_unsheriffed',
+        Exchange('default'),
+        routing_key='log_parser.failures',
+        queue_arguments=LOG_PARSER_QUEUE_ARGUMENTS,
     ),
-    Queue('log_parser_fail_json_sheriffed', Exchange('default'), routing_key='log_parser.failures'),
     Queue(
-        'log_parser_fail_json_unsheriffed', Exchange('default'), routing_key='log_parser.failures'
+        'log_parser_fail_json_sheriffed',
+        Exchange('default'),
+        routing_key='log_parser.failures',
+        queue_arguments=LOG_PARSER_QUEUE_ARGUMENTS,
+    ),
+    Queue(
+        'log_parser_fail_json_unsheriffed',
+        Exchange('default'),
+        routing_key='log_parser.failures',
+        queue_arguments=LOG_PARSER_QUEUE_ARGUMENTS,
     ),
     Queue('pushlog', Exchange('default'), routing_key='pushlog'),
     Queue('generate_perf_alerts', Exchange('default'), routing_key='generate_perf_alerts'),
@@ -378,6 +426,13 @@ CELERY_BEAT_SCHEDULE = {
         'relative': True,
         'options': {'queue': "seta_analyze_failures"},
     },
+    # how many logs are waiting to be parsed, per lane
+    'report-log-parser-lanes-every-minute': {
+        'task': 'report-log-parser-lanes',
+        'schedule': timedelta(minutes=1),
+        'relative': True,
+        'options': {'queue': "default"},
+    },
 }
 
 # CORS Headers
@@ -431,13 +486,22 @@ BZ_API_URL = "https://bugzilla.mozilla.org"
 BUGFILER_API_URL = env("BUGZILLA_API_URL", default=BZ_API_URL)
 BUGFILER_API_KEY = env("BUG_FILER_API_KEY", default=None)
 BZ_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Amount of bug suggestion searches each process keeps results for (0 disables
+# caching) and for how many seconds
+BUGSCACHE_SEARCH_CACHE_SIZE = env.int('BUGSCACHE_SEARCH_CACHE_SIZE', default=10000)
+BUGSCACHE_SEARCH_CACHE_TIMEOUT = env.int('BUGSCACHE_SEARCH_CACHE_TIMEOUT', default=3600)
 
 # For intermittents commenter
 COMMENTER_API_KEY = env("BUG_COMMENTER_API_KEY", default=None)
 
 # Log Parsing
 MAX_ERROR_LINES = 100
+# Amount of processes parsing each log in chunks, 0 parses logs serially.
+# Requires Celery workers which can have child processes (e.g. `--pool=solo`).
+LOG_PARSER_PROCESSES = env.int('LOG_PARSER_PROCESSES', default=0)
 FAILURE_LINES_CUTOFF = 35
+# Amount of test group results stored per errorsummary log
+GROUP_RESULTS_CUTOFF = env.int('GROUP_RESULTS_CUTOFF', default=1000)
 
 # Perfherder
 # Default minimum regression threshold for perfherder is 2% (otherwise
@@ -448,6 +512,14 @@ PERFHERDER_REGRESSION_THRESHOLD = 2
 PERFHERDER_ALERTS_MIN_BACK_WINDOW = 12
 PERFHERDER_ALERTS_MAX_BACK_WINDOW = 24
 PERFHERDER_ALERTS_FORE_WINDOW = 12
+# Merge the alerts analyses requested for a signature within this many seconds
+PERFHERDER_ALERTS_COALESCING_WINDOW = env.int('PERFHERDER_ALERTS_COALESCING_WINDOW', default=60)
+# Use the numpy-backed implementation of the t-test analysis (requires numpy)
+PERFHERDER_ALERTS_VECTORIZED = env.bool('PERFHERDER_ALERTS_VECTORIZED', default=False)
+# Amount of perf signatures each ingestion process keeps in memory (0 disables
+# caching) and for how many seconds
+PERFHERDER_SIGNATURE_CACHE_SIZE = env.int('PERFHERDER_SIGNATURE_CACHE_SIZE', default=20000)
+PERFHERDER_SIGNATURE_CACHE_TIMEOUT = env.int('PERFHERDER_SIGNATURE_CACHE_TIMEOUT', default=3600)
 # Assess if tests should be (non)sheriffed
 QUANTIFYING_PERIOD = timedelta(weeks=24)  # how far back to look over Bugzilla data
 BUG_COOLDOWN_TIME = timedelta(weeks=2)  # time after bug is ready for assessment
@@ -28,8 +28,8 @@ def store_text_log_summary_artifact(job, text_log_summary_artifact):
             if not created:
                 logger.warning('duplicate error lines processed for job %s', job.id)
 
-    # get error summary immediately (to warm the cache)
-    error_summary.get_error_summary(job)
+    # compute and store the bug suggestions immediately
+    error_summary.get_error_summary(job, refresh=True)
 
 
 def store_job_artifacts(artifact_data):
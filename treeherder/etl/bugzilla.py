@@ -1,15 +1,47 @@
+import datetime
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import dateutil.parser
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 
+from treeherder.model.bugscache_index import invalidate_bugscache_index
+from treeherder.model.error_summary import refresh_error_summaries
 from treeherder.model.models import Bugscache
 from treeherder.utils.github import fetch_json
 
 logger = logging.getLogger(__name__)
 
+# last_change_time of the most recently changed bug seen by a successful sync
+SYNC_WATERMARK_CACHE_KEY = 'bugscache-sync-watermark'
+# held while a sync runs, so syncs don't overlap
+SYNC_LOCK_CACHE_KEY = 'bugscache-sync-lock'
+SYNC_LOCK_TIMEOUT = 60 * 60
 
-def fetch_intermittent_bugs(offset, limit):
+BUGS_PER_PAGE = 500
+# pages are requested in batches of CONCURRENT_PAGE_REQUESTS, starting no more
+# than MAX_PAGE_REQUESTS_PER_SECOND requests each second
+CONCURRENT_PAGE_REQUESTS = 4
+MAX_PAGE_REQUESTS_PER_SECOND = 2
+BULK_BATCH_SIZE = 500
+
+BUGSCACHE_FIELDS = (
+    'status',
+    'resolution',
+    'summary',
+    'crash_signature',
+    'keywords',
+    'os',
+    'modified',
+    'whiteboard',
+)
+
+
+def fetch_intermittent_bugs(offset, limit, changed_since=None):
     url = settings.BZ_API_URL + '/rest/bug'
     params = {
         'keywords': 'intermittent-failure',
@@ -21,51 +53,186 @@ def fetch_intermittent_bugs(offset, limit):
         'offset': offset,
         'limit': limit,
     }
+    if changed_since is not None:
+        # bugs changed at that time or later
+        params['last_change_time'] = changed_since.strftime(settings.BZ_DATETIME_FORMAT)
     response = fetch_json(url, params=params)
     return response.get('bugs', [])
 
 
+class RateLimiter:
+    """Spaces calls to `wait` so that they return at most `rate` times per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
 class BzApiBugProcess:
-    def run(self):
-        bug_list = []
+    """
+    Syncs the bugscache table with the intermittent bugs changed in Bugzilla
+    during the last year.
+
+    Once a sync succeeded, later ones only fetch the bugs changed since the
+    most recent change it saw.  A full sync is still needed from time to time
+    (`run(full=True)`) to drop bugs which lost the intermittent-failure
+    keyword.
+    """
+
+    def run(self, full=False):
+        if not cache.add(SYNC_LOCK_CACHE_KEY, True, SYNC_LOCK_TIMEOUT):
+            logger.warning('Another bugscache update is running, skipping this one')
+            return
+
+        try:
+            watermark = None if full else cache.get(SYNC_WATERMARK_CACHE_KEY)
+            bug_list = self.fetch_bugs(changed_since=watermark)
+            if watermark is None and not bug_list:
+                # an empty full sync would wipe the table
+                return
+
+            changes = self.store_bugs(bug_list, full=watermark is None)
+            if changes:
+                invalidate_bugscache_index()
+
+            modified = [bug.modified for bug in bug_list]
+            if watermark is not None:
+                modified.append(watermark)
+            cache.set(SYNC_WATERMARK_CACHE_KEY, max(modified), None)
+
+            summaries = set()
+            for old, new in changes:
+                if is_material_change(old, new):
+                    summaries.update(bug.summary for bug in (old, new) if bug is not None)
+            refresh_error_summaries(summaries)
+        finally:
+            cache.delete(SYNC_LOCK_CACHE_KEY)
+
+    def fetch_bugs(self, changed_since=None):
+        """Returns the intermittent bugs changed since the given time, as Bugscache objects."""
+        rate_limiter = RateLimiter(MAX_PAGE_REQUESTS_PER_SECOND)
 
-        offset = 0
-        limit = 500
+        def fetch_page(offset):
+            rate_limiter.wait()
+            return fetch_intermittent_bugs(offset, BUGS_PER_PAGE, changed_since)
+
+        bugs = {}
+
+        def add_bugs(page):
+            for bug in page:
+                bugscache = self.to_bugscache(bug)
+                if bugscache is not None:
+                    # bugs changed while paging can be seen twice
+                    bugs[bugscache.id] = bugscache
+
+        # most incremental syncs fit in a single page
+        page = fetch_page(0)
+        add_bugs(page)
+        if len(page) < BUGS_PER_PAGE:
+            return list(bugs.values())
+
+        offset = BUGS_PER_PAGE
+        with ThreadPoolExecutor(CONCURRENT_PAGE_REQUESTS) as executor:
+            # Keep querying Bugzilla until there are no more results.
+            while True:
+                offsets = [offset + i * BUGS_PER_PAGE for i in range(CONCURRENT_PAGE_REQUESTS)]
+                pages = list(executor.map(fetch_page, offsets))
+                for page in pages:
+                    add_bugs(page)
+                if any(len(page) < BUGS_PER_PAGE for page in pages):
+                    break
+                offset += len(offsets) * BUGS_PER_PAGE
+
+        return list(bugs.values())
+
+    def to_bugscache(self, bug):
         max_summary_length = Bugscache._meta.get_field('summary').max_length
         max_whiteboard_length = Bugscache._meta.get_field('whiteboard').max_length
 
-        # Keep querying Bugzilla until there are no more results.
-        while True:
-            bug_results_chunk = fetch_intermittent_bugs(offset, limit)
-            bug_list += bug_results_chunk
-            if len(bug_results_chunk) < limit:
-                break
-            offset += limit
-
-        if bug_list:
-            bugs_stored = set(Bugscache.objects.values_list('id', flat=True))
-            old_bugs = bugs_stored.difference(set(bug['id'] for bug in bug_list))
-            Bugscache.objects.filter(id__in=old_bugs).delete()
-
-            for bug in bug_list:
-                # we currently don't support timezones in treeherder, so
-                # just ignore it when importing/updating the bug to avoid
-                # a ValueError
-                try:
-                    Bugscache.objects.update_or_create(
-                        id=bug['id'],
-                        defaults={
-                            'status': bug.get('status', ''),
-                            'resolution': bug.get('resolution', ''),
-                            'summary': bug.get('summary', '')[:max_summary_length],
-                            'crash_signature': bug.get('cf_crash_signature', ''),
-                            'keywords': ",".join(bug['keywords']),
-                            'os': bug.get('op_sys', ''),
-                            'modified': dateutil.parser.parse(
-                                bug['last_change_time'], ignoretz=True
-                            ),
-                            'whiteboard': bug.get('whiteboard', '')[:max_whiteboard_length],
-                        },
-                    )
-                except Exception as e:
-                    logger.error("error inserting bug '%s' into db: %s", bug, e)
+        # we currently don't support timezones in treeherder, so
+        # just ignore it when importing/updating the bug to avoid
+        # a ValueError
+        try:
+            return Bugscache(
+                id=bug['id'],
+                status=bug.get('status', ''),
+                resolution=bug.get('resolution', ''),
+                summary=bug.get('summary', '')[:max_summary_length],
+                crash_signature=bug.get('cf_crash_signature', ''),
+                keywords=",".join(bug['keywords']),
+                os=bug.get('op_sys', ''),
+                modified=dateutil.parser.parse(bug['last_change_time'], ignoretz=True),
+                whiteboard=bug.get('whiteboard', '')[:max_whiteboard_length],
+            )
+        except Exception as e:
+            logger.error("error parsing bug '%s': %s", bug, e)
+            return None
+
+    def store_bugs(self, bug_list, full=False):
+        """
+        Inserts and updates the given bugs, and removes the outdated ones.
+
+        When `bug_list` holds every intermittent bug (`full`), stored bugs
+        missing from it are removed, otherwise only those which weren't
+        changed in the last year.  Returns the changes made, as a list of
+        (stored bug, new bug) pairs, either being None for bugs inserted or
+        removed.
+        """
+        stored = {
+            bug.id: bug for bug in Bugscache.objects.only('id', 'modified', 'summary', 'resolution')
+        }
+        new_bugs = [bug for bug in bug_list if bug.id not in stored]
+        # a bug changed in any way has a newer last_change_time
+        changed_bugs = [
+            bug for bug in bug_list if bug.id in stored and stored[bug.id].modified != bug.modified
+        ]
+
+        if full:
+            old_bugs = set(stored).difference(bug.id for bug in bug_list)
+        else:
+            time_limit = datetime.datetime.utcnow() - datetime.timedelta(days=365)
+            old_bugs = {bug.id for bug in stored.values() if bug.modified < time_limit}
+            old_bugs.difference_update(bug.id for bug in bug_list)
+
+        with transaction.atomic():
+            if old_bugs:
+                Bugscache.objects.filter(id__in=old_bugs).delete()
+            # bugs inserted meanwhile by another sync are up to date too
+            Bugscache.objects.bulk_create(
+                new_bugs, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+            )
+            Bugscache.objects.bulk_update(
+                changed_bugs, BUGSCACHE_FIELDS, batch_size=BULK_BATCH_SIZE
+            )
+
+        logger.info(
+            'Bugscache: %s bugs inserted, %s updated, %s removed',
+            len(new_bugs),
+            len(changed_bugs),
+            len(old_bugs),
+        )
+        return (
+            [(None, bug) for bug in new_bugs]
+            + [(stored[bug.id], bug) for bug in changed_bugs]
+            + [(stored[bug_id], None) for bug_id in old_bugs]
+        )
+
+
+def is_material_change(old, new):
+    """
+    Whether a change to a bug can change the bug suggestions it appears in,
+    other than the details of the bug itself.
+    """
+    if old is None or new is None:
+        return True
+    # resolving a bug moves it out of the open_recent suggestions
+    return old.summary != new.summary or old.resolution != new.resolution
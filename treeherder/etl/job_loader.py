@@ -1,14 +1,15 @@
 import logging
 import uuid
+from collections import defaultdict
 
 import jsonschema
 import newrelic.agent
 import slugid
 
-from treeherder.etl.taskcluster_pulse.handler import ignore_task
+from treeherder.etl.taskcluster_pulse.handler import ignore_task, run_coroutine
 from treeherder.etl.common import to_timestamp
 from treeherder.etl.exceptions import MissingPushException
-from treeherder.etl.jobs import store_job_data
+from treeherder.etl.jobs import get_push_ids, store_job_data
 from treeherder.etl.schema import get_json_schema
 from treeherder.model.models import Push, Repository
 from treeherder.utils.taskcluster import get_task_definition
@@ -83,6 +84,56 @@ class JobLoader:
             except Repository.DoesNotExist:
                 logger.info("Job with unsupported project: %s", project)
 
+    def process_jobs(self, pulse_jobs, root_url):
+        """
+        Same as ``process_job`` for a batch of jobs, storing the jobs of each
+        repository together.
+
+        Returns the jobs which couldn't be stored, e.g. because their push
+        doesn't exist yet, for them to be processed on their own.
+        """
+        failed = []
+        transformed_jobs = defaultdict(list)
+        repositories = {}
+        for pulse_job in pulse_jobs:
+            if not self._is_valid_job(pulse_job):
+                continue
+            project = pulse_job["origin"]["project"]
+            try:
+                if project not in repositories:
+                    repositories[project] = Repository.objects.get(name=project)
+            except Repository.DoesNotExist:
+                logger.info("Job with unsupported project: %s", project)
+                continue
+            repository = repositories[project]
+            if repository.active_status != 'active':
+                (real_task_id, _) = task_and_retry_ids(pulse_job["taskId"])
+                logger.debug("Task %s belongs to a repository that is not active.", real_task_id)
+                continue
+            if pulse_job["state"] == "unscheduled":
+                continue
+
+            try:
+                transformed_jobs[project].append((pulse_job, self.transform(pulse_job)))
+            except AttributeError:
+                logger.warning("Skipping job due to bad attribute", exc_info=1)
+
+        for project, jobs in transformed_jobs.items():
+            repository = repositories[project]
+            push_ids = get_push_ids(repository, {job["revision"] for _, job in jobs})
+            ready = []
+            for pulse_job, transformed_job in jobs:
+                try:
+                    if transformed_job["revision"] not in push_ids:
+                        self.check_missing_push(repository, pulse_job)
+                        continue
+                    ready.append(transformed_job)
+                except Exception:
+                    failed.append(pulse_job)
+            store_job_data(repository, ready)
+
+        return failed
+
     def validate_revision(self, repository, pulse_job):
         revision = pulse_job["origin"].get("revision")
         # will raise an exception if repository with name does not
@@ -100,17 +151,21 @@ class JobLoader:
             )
 
         if not Push.objects.filter(**filter_kwargs).exists():
-            (real_task_id, _) = task_and_retry_ids(pulse_job["taskId"])
-            project = pulse_job["origin"]["project"]
-            repository = Repository.objects.get(name=project)
-            task = get_task_definition(repository.tc_root_url, real_task_id)
-            # We do this to prevent raising an exception for a task that will never be ingested
-            if not ignore_task(task, real_task_id, repository.tc_root_url, project):
-                raise MissingPushException(
-                    "No push found in {} for revision {} for task {}".format(
-                        pulse_job["origin"]["project"], revision, real_task_id
-                    )
+            self.check_missing_push(repository, pulse_job)
+
+    def check_missing_push(self, repository, pulse_job):
+        """Raises unless the task of a job without push is never meant to be ingested."""
+        (real_task_id, _) = task_and_retry_ids(pulse_job["taskId"])
+        project = pulse_job["origin"]["project"]
+        task = get_task_definition(repository.tc_root_url, real_task_id)
+        # We do this to prevent raising an exception for a task that will never be ingested
+        ignore = run_coroutine(ignore_task(task, real_task_id, repository.tc_root_url, project))
+        if not ignore:
+            raise MissingPushException(
+                "No push found in {} for revision {} for task {}".format(
+                    project, pulse_job["origin"].get("revision"), real_task_id
                 )
+            )
 
     def transform(self, pulse_job):
         """
@@ -2,14 +2,17 @@ import copy
 import logging
 import os
 import time
+from collections import defaultdict
 from datetime import datetime
 from hashlib import sha1
 
 import newrelic.agent
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.utils import IntegrityError
+from django.db import transaction
+from django.db.models import Model, Q
 
 from treeherder.etl.common import get_guid_root
+from treeherder.log_parser.scheduler import schedule_log_parsing
 from treeherder.model.models import (
     BuildPlatform,
     FailureClassification,
@@ -19,16 +22,37 @@ from treeherder.model.models import (
     JobType,
     Machine,
     MachinePlatform,
-    Option,
-    OptionCollection,
     Product,
     Push,
     ReferenceDataSignatures,
     TaskclusterMetadata,
 )
+from treeherder.model.reference_data import reference_data
 
 logger = logging.getLogger(__name__)
 
+BULK_BATCH_SIZE = 500
+
+# the columns of a job updated by each of its states
+JOB_UPDATE_FIELDS = (
+    'guid',
+    'signature',
+    'build_platform',
+    'machine_platform',
+    'machine',
+    'option_collection_hash',
+    'job_type',
+    'job_group',
+    'product',
+    'result',
+    'state',
+    'tier',
+    'submit_time',
+    'start_time',
+    'end_time',
+    'push_id',
+)
+
 
 def _get_number(s):
     try:
@@ -37,23 +61,32 @@ def _get_number(s):
         return 0
 
 
-def _remove_existing_jobs(data):
+def _get_existing_jobs(job_guids):
+    """
+    Returns the stored jobs having any of `job_guids`, or the root of any of
+    them, by guid.
+    """
+    guids = set()
+    for job_guid in job_guids:
+        guids.update([job_guid[0:50], get_guid_root(job_guid[0:50])])
+    return {job.guid: job for job in Job.objects.filter(guid__in=guids)}
+
+
+def _remove_existing_jobs(data, existing_jobs=None):
     """
     Remove jobs from data where we already have them in the same state.
 
     1. split the incoming jobs into pending, running and complete.
     2. fetch the ``job_guids`` from the db that are in the same state as they
-       are in ``data``.
+       are in ``data``, unless the stored jobs are given as ``existing_jobs``.
     3. build a new list of jobs in ``new_data`` that are not already in
        the db and pass that back.  It could end up empty at that point.
     """
     new_data = []
 
-    guids = [datum['job']['job_guid'] for datum in data]
-    state_map = {
-        guid: state
-        for (guid, state) in Job.objects.filter(guid__in=guids).values_list('guid', 'state')
-    }
+    if existing_jobs is None:
+        existing_jobs = _get_existing_jobs(datum['job']['job_guid'] for datum in data)
+    state_map = {guid: job.state for guid, job in existing_jobs.items()}
 
     for datum in data:
         job = datum['job']
@@ -72,50 +105,77 @@ def _remove_existing_jobs(data):
     return new_data
 
 
-def _load_job(repository, job_datum, push_id):
+def get_push_ids(repository, revisions):
     """
-    Load a job into the treeherder database
-
-    If the job is a ``retry`` the ``job_guid`` will have a special
-    suffix on it.  But the matching ``pending``/``running`` job will not.
-    So we append the suffixed ``job_guid`` to ``retry_job_guids``
-    so that we can update the job_id_lookup later with the non-suffixed
-    ``job_guid`` (root ``job_guid``). Then we can find the right
-    ``pending``/``running`` job and update it with this ``retry`` job.
+    Returns a dict mapping each of `revisions` (possibly short ones) to the
+    id of its push, leaving out those which have none.
+    """
+    revisions = set(revisions)
+    short_revisions = {revision for revision in revisions if len(revision) < 40}
+    query = Q(revision__in=revisions - short_revisions)
+    for revision in short_revisions:
+        query |= Q(revision__startswith=revision)
+
+    push_ids = {}
+    for revision, push_id in Push.objects.filter(query, repository=repository).values_list(
+        'revision', 'id'
+    ):
+        if revision in revisions:
+            push_ids[revision] = push_id
+        for short_revision in short_revisions:
+            if revision.startswith(short_revision):
+                push_ids[short_revision] = push_id
+    return push_ids
+
+
+def _handle_job_error(datum, e):
+    """Reports an error storing a job, from within the block handling it."""
+    # Surface the error immediately unless running in production, where we'd
+    # rather report it on New Relic and not block storing the remaining jobs.
+    if 'DYNO' not in os.environ:
+        raise e
+
+    logger.exception(e)
+    # make more fields visible in new relic for the job
+    # where we encountered the error
+    datum.update(datum.get("job", {}))
+    newrelic.agent.record_exception(params=datum)
+
+
+def _get_job_values(repository, job_datum, push_id):
+    """
+    Resolves the reference data of a job and returns the values of its
+    ``Job`` row, without touching the job itself.
     """
-    build_platform, _ = BuildPlatform.objects.get_or_create(
+    reference_data.sync()
+
+    build_platform = reference_data.get(
+        BuildPlatform,
         os_name=job_datum.get('build_platform', {}).get('os_name', 'unknown'),
         platform=job_datum.get('build_platform', {}).get('platform', 'unknown'),
         architecture=job_datum.get('build_platform', {}).get('architecture', 'unknown'),
     )
 
-    machine_platform, _ = MachinePlatform.objects.get_or_create(
+    machine_platform = reference_data.get(
+        MachinePlatform,
         os_name=job_datum.get('machine_platform', {}).get('os_name', 'unknown'),
         platform=job_datum.get('machine_platform', {}).get('platform', 'unknown'),
         architecture=job_datum.get('machine_platform', {}).get('architecture', 'unknown'),
     )
 
     option_names = job_datum.get('option_collection', [])
-    option_collection_hash = OptionCollection.calculate_hash(option_names)
-    if not OptionCollection.objects.filter(option_collection_hash=option_collection_hash).exists():
-        # in the unlikely event that we haven't seen this set of options
-        # before, add the appropriate database rows
-        options = []
-        for option_name in option_names:
-            option, _ = Option.objects.get_or_create(name=option_name)
-            options.append(option)
-        for option in options:
-            OptionCollection.objects.create(
-                option_collection_hash=option_collection_hash, option=option
-            )
+    option_collection_hash = reference_data.get_option_collection_hash(option_names)
 
-    machine, _ = Machine.objects.get_or_create(name=job_datum.get('machine', 'unknown'))
+    machine = reference_data.get(Machine, name=job_datum.get('machine', 'unknown'))
 
-    job_type, _ = JobType.objects.get_or_create(
-        symbol=job_datum.get('job_symbol') or 'unknown', name=job_datum.get('name') or 'unknown'
+    job_type = reference_data.get(
+        JobType,
+        symbol=job_datum.get('job_symbol') or 'unknown',
+        name=job_datum.get('name') or 'unknown',
     )
 
-    job_group, _ = JobGroup.objects.get_or_create(
+    job_group = reference_data.get(
+        JobGroup,
         name=job_datum.get('group_name') or 'unknown',
         symbol=job_datum.get('group_symbol') or 'unknown',
     )
@@ -123,7 +183,7 @@ def _load_job(repository, job_datum, push_id):
     product_name = job_datum.get('product_name', 'unknown')
     if not product_name.strip():
         product_name = 'unknown'
-    product, _ = Product.objects.get_or_create(name=product_name)
+    product = reference_data.get(Product, name=product_name)
 
     job_guid = job_datum['job_guid']
     job_guid = job_guid[0:50]
@@ -141,7 +201,9 @@ def _load_job(repository, job_datum, push_id):
 
     reference_data_name = job_datum.get('reference_data_name', None)
 
-    default_failure_classification = FailureClassification.objects.get(name='not classified')
+    default_failure_classification = reference_data.get(
+        FailureClassification, create=False, name='not classified'
+    )
 
     sh = sha1()
     sh.update(
@@ -174,7 +236,8 @@ def _load_job(repository, job_datum, push_id):
     if not reference_data_name:
         reference_data_name = signature_hash
 
-    signature, _ = ReferenceDataSignatures.objects.get_or_create(
+    signature = reference_data.get(
+        ReferenceDataSignatures,
         name=reference_data_name,
         signature=signature_hash,
         build_system_type=build_system_type,
@@ -203,6 +266,44 @@ def _load_job(repository, job_datum, push_id):
     start_time = datetime.fromtimestamp(_get_number(job_datum.get('start_timestamp')))
     end_time = datetime.fromtimestamp(_get_number(job_datum.get('end_timestamp')))
 
+    return {
+        "guid": job_guid,
+        "repository": repository,
+        "signature": signature,
+        "build_platform": build_platform,
+        "machine_platform": machine_platform,
+        "machine": machine,
+        "option_collection_hash": option_collection_hash,
+        "job_type": job_type,
+        "job_group": job_group,
+        "product": product,
+        "failure_classification": default_failure_classification,
+        "who": who,
+        "reason": reason,
+        "result": result,
+        "state": state,
+        "tier": tier,
+        "submit_time": submit_time,
+        "start_time": start_time,
+        "end_time": end_time,
+        "push_id": push_id,
+    }
+
+
+def _load_job(repository, job_datum, push_id):
+    """
+    Load a job into the treeherder database
+
+    If the job is a ``retry`` the ``job_guid`` will have a special
+    suffix on it.  But the matching ``pending``/``running`` job will not.
+    So we append the suffixed ``job_guid`` to ``retry_job_guids``
+    so that we can update the job_id_lookup later with the non-suffixed
+    ``job_guid`` (root ``job_guid``). Then we can find the right
+    ``pending``/``running`` job and update it with this ``retry`` job.
+    """
+    values = _get_job_values(repository, job_datum, push_id)
+    job_guid = values['guid']
+
     # first, try to create the job with the given guid (if it doesn't
     # exist yet)
     job_guid_root = get_guid_root(job_guid)
@@ -212,31 +313,9 @@ def _load_job(repository, job_datum, push_id):
         # it, but allow it to skip if it's the same guid.  The odds are
         # extremely high that this is a pending and running job that came in
         # quick succession and are being processed by two different workers.
-        Job.objects.get_or_create(
-            guid=job_guid,
-            defaults={
-                "repository": repository,
-                "signature": signature,
-                "build_platform": build_platform,
-                "machine_platform": machine_platform,
-                "machine": machine,
-                "option_collection_hash": option_collection_hash,
-                "job_type": job_type,
-                "job_group": job_group,
-                "product": product,
-                "failure_classification": default_failure_classification,
-                "who": who,
-                "reason": reason,
-                "result": result,
-                "state": state,
-                "tier": tier,
-                "submit_time": submit_time,
-                "start_time": start_time,
-                "end_time": end_time,
-                "last_modified": datetime.now(),
-                "push_id": push_id,
-            },
-        )
+        defaults = dict(values, last_modified=datetime.now())
+        del defaults['guid']
+        Job.objects.get_or_create(guid=job_guid, defaults=defaults)
     # Can't just use the ``job`` we would get from the ``get_or_create``
     # because we need to try the job_guid_root instance first for update,
     # rather than a possible retry job instance.
@@ -245,118 +324,223 @@ def _load_job(repository, job_datum, push_id):
     except ObjectDoesNotExist:
         job = Job.objects.get(guid=job_guid)
 
-    # add taskcluster metadata if applicable
-    if all([k in job_datum for k in ['taskcluster_task_id', 'taskcluster_retry_id']]):
-        try:
-            TaskclusterMetadata.objects.create(
-                job=job,
-                task_id=job_datum['taskcluster_task_id'],
-                retry_id=job_datum['taskcluster_retry_id'],
-            )
-        except IntegrityError:
-            pass
+    _load_taskcluster_metadata([(job, job_datum)])
 
     # Update job with any data that would have changed
     Job.objects.filter(id=job.id).update(
-        guid=job_guid,
-        signature=signature,
-        build_platform=build_platform,
-        machine_platform=machine_platform,
-        machine=machine,
-        option_collection_hash=option_collection_hash,
-        job_type=job_type,
-        job_group=job_group,
-        product=product,
-        result=result,
-        state=state,
-        tier=tier,
-        submit_time=submit_time,
-        start_time=start_time,
-        end_time=end_time,
-        last_modified=datetime.now(),
-        push_id=push_id,
+        last_modified=datetime.now(), **{field: values[field] for field in JOB_UPDATE_FIELDS}
     )
 
-    log_refs = job_datum.get('log_references', [])
-    job_logs = []
-    if log_refs:
-        for log in log_refs:
-            name = log.get('name') or 'unknown'
-            name = name[0:50]
+    schedule_log_parsing(_load_job_logs([(job, job_datum)]), repository)
 
-            url = log.get('url') or 'unknown'
-            url = url[0:255]
+    return job_guid
 
-            parse_status_map = dict([(k, v) for (v, k) in JobLog.STATUSES])
-            mapped_status = parse_status_map.get(log.get('parse_status'))
-            if mapped_status:
-                parse_status = mapped_status
+
+def _load_jobs(repository, data, push_ids, existing_jobs):
+    """
+    Load a batch of jobs into the treeherder database, with a handful of
+    queries for the whole batch.
+
+    ``existing_jobs`` are the stored jobs the batch may update, by guid, as
+    returned by ``_get_existing_jobs``.  Jobs are written in the order they
+    are given, just as ``_load_job`` would: jobs sharing a root ``job_guid``
+    are written one after the other, since a retry job updates the
+    ``pending``/``running`` job it follows.
+
+    Returns the data of the jobs loaded.  When a batch fails to be written,
+    its jobs are loaded one by one instead, so a bad job only fails by itself.
+    """
+    loaded = []
+    while data:
+        batch = []
+        remaining = []
+        guid_roots = set()
+        for datum in data:
+            guid_root = get_guid_root(datum['job']['job_guid'][0:50])
+            if guid_root in guid_roots:
+                remaining.append(datum)
             else:
-                parse_status = JobLog.PENDING
+                guid_roots.add(guid_root)
+                batch.append(datum)
+        data = remaining
+
+        jobs = []
+        for datum in batch:
+            try:
+                revision = datum['revision']
+                if revision not in push_ids:
+                    raise Push.DoesNotExist(
+                        "No push found in {} for revision {}".format(repository.name, revision)
+                    )
+                jobs.append((datum, _get_job_values(repository, datum['job'], push_ids[revision])))
+            except Exception as e:
+                _handle_job_error(datum, e)
+        if not jobs:
+            continue
 
-            jl, _ = JobLog.objects.get_or_create(
-                job=job, name=name, url=url, defaults={'status': parse_status}
-            )
+        try:
+            with transaction.atomic():
+                job_logs = _write_jobs(jobs, existing_jobs)
+        except Exception:
+            # e.g. another process inserted one of the jobs meanwhile
+            logger.warning("Failed to store a batch of %s jobs, storing them one by one", len(jobs))
+            for datum, values in jobs:
+                try:
+                    _load_job(repository, datum['job'], values['push_id'])
+                    loaded.append(datum)
+                except Exception as e:
+                    _handle_job_error(datum, e)
+            # what was written is unknown
+            existing_jobs = _get_existing_jobs(datum['job']['job_guid'] for datum in data)
+            continue
 
-            job_logs.append(jl)
+        # only once the logs are committed, for the parser to find them
+        schedule_log_parsing(job_logs, repository)
+        loaded.extend(datum for datum, _ in jobs)
 
-        _schedule_log_parsing(job, job_logs, result, repository)
+    return loaded
 
-    return job_guid
 
+def _get_changed_fields(job, values):
+    """Returns the fields of ``JOB_UPDATE_FIELDS`` whose value in ``values`` differs from ``job``'s."""
+    changed = []
+    for field in JOB_UPDATE_FIELDS:
+        attname = Job._meta.get_field(field).attname
+        value = values[field]
+        if isinstance(value, Model):
+            value = value.pk
+        if getattr(job, attname) != value:
+            changed.append(field)
+    return changed
 
-def _schedule_log_parsing(job, job_logs, result, repository):
-    """Kick off the initial task that parses the log data.
 
-    log_data is a list of job log objects and the result for that job
+def _write_jobs(jobs, existing_jobs):
     """
+    Inserts and updates the jobs of a batch, given as (datum, job values)
+    pairs whose root ``job_guid``s are all distinct.
 
-    # importing here to avoid an import loop
-    from treeherder.log_parser.tasks import parse_logs
+    Each job is written with a single query, and only when it changed: new
+    jobs are inserted, and only the changed columns of the stored ones are
+    updated.  ``existing_jobs`` is kept up to date with the jobs written.
 
-    task_types = {"errorsummary_json", "live_backing_log"}
-    sheriffed_repos = {
-        "autoland",
-        "mozilla-central",
-        "mozilla-beta",
-        "mozilla-release",
-        "mozilla-esr78",
-    }
+    Returns the logs to parse, as ``_load_job_logs`` does.
+    """
+    now = datetime.now()
+    new_jobs = []
+    changed_jobs = defaultdict(list)
+    loaded = []
+    for datum, values in jobs:
+        # update the job_guid_root instance rather than a possible retry job instance
+        job = existing_jobs.get(get_guid_root(values['guid'])) or existing_jobs.get(values['guid'])
+        if job is None:
+            job = Job(last_modified=now, **values)
+            new_jobs.append(job)
+        else:
+            changed = _get_changed_fields(job, values)
+            if changed:
+                existing_jobs.pop(job.guid)
+                for field in changed:
+                    setattr(job, field, values[field])
+                job.last_modified = now
+                changed_jobs[tuple(changed)].append(job)
+        existing_jobs[job.guid] = job
+        loaded.append((job, datum['job']))
+
+    if len(new_jobs) == 1:
+        # a single insert gets the id of the row
+        new_jobs[0].save(force_insert=True)
+    elif new_jobs:
+        Job.objects.bulk_create(new_jobs, batch_size=BULK_BATCH_SIZE)
+        # the ids of inserted rows aren't returned by MySQL
+        ids = dict(
+            Job.objects.filter(guid__in=[job.guid for job in new_jobs]).values_list('guid', 'id')
+        )
+        for job in new_jobs:
+            job.id = ids[job.guid]
+    for fields, jobs_to_update in changed_jobs.items():
+        Job.objects.bulk_update(
+            jobs_to_update, fields + ('last_modified',), batch_size=BULK_BATCH_SIZE
+        )
 
-    job_log_ids = []
-    for job_log in job_logs:
-        # a log can be submitted already parsed.  So only schedule
-        # a parsing task if it's ``pending``
-        # the submitter is then responsible for submitting the
-        # text_log_summary artifact
-        if job_log.status != JobLog.PENDING:
-            continue
+    # the metadata of a job is stored along with its first state
+    new_job_ids = {job.id for job in new_jobs}
+    _load_taskcluster_metadata(
+        [(job, job_datum) for job, job_datum in loaded if job.id in new_job_ids]
+    )
+    return _load_job_logs(loaded, new_job_ids)
 
-        # if this is not a known type of log, abort parse
-        if job_log.name not in task_types:
-            continue
 
-        job_log_ids.append(job_log.id)
+def _load_taskcluster_metadata(jobs):
+    """Adds the taskcluster metadata of the given (job, job_datum) pairs, if applicable."""
+    metadata = [
+        TaskclusterMetadata(
+            job=job,
+            task_id=job_datum['taskcluster_task_id'],
+            retry_id=job_datum['taskcluster_retry_id'],
+        )
+        for job, job_datum in jobs
+        if all([k in job_datum for k in ['taskcluster_task_id', 'taskcluster_retry_id']])
+    ]
+    if metadata:
+        TaskclusterMetadata.objects.bulk_create(metadata, ignore_conflicts=True)
+
 
-        # TODO: Replace the use of different queues for failures vs not with the
-        # RabbitMQ priority feature (since the idea behind separate queues was
-        # only to ensure failures are dealt with first if there is a backlog).
-        if result != 'success':
-            if job_log.name == "errorsummary_json":
-                queue = "log_parser_fail_json"
-                priority = "failures"
-            else:
-                queue = "log_parser_fail_raw"
-                priority = "failures"
-            if repository.name in sheriffed_repos:
-                queue += "_sheriffed"
+def _load_job_logs(jobs, new_job_ids=frozenset()):
+    """
+    Adds the logs of the given (job, job_datum) pairs.  The jobs whose ids
+    are in `new_job_ids` were just inserted, so have no logs yet.
+
+    Returns the (job, job logs, result) of each job with logs, for their
+    parsing to be scheduled.
+    """
+    parse_status_map = dict([(k, v) for (v, k) in JobLog.STATUSES])
+
+    job_logs = {}
+    for job, job_datum in jobs:
+        for log in job_datum.get('log_references', []):
+            name = log.get('name') or 'unknown'
+            name = name[0:50]
+
+            url = log.get('url') or 'unknown'
+            url = url[0:255]
+
+            mapped_status = parse_status_map.get(log.get('parse_status'))
+            if mapped_status:
+                parse_status = mapped_status
             else:
-                queue += "_unsheriffed"
-        else:
-            queue = 'log_parser'
-            priority = "normal"
+                parse_status = JobLog.PENDING
+
+            job_logs.setdefault(
+                (job.id, name, url), JobLog(job=job, name=name, url=url, status=parse_status)
+            )
 
-        parse_logs.apply_async(queue=queue, args=[job.id, [job_log.id], priority])
+    if not job_logs:
+        return []
+
+    def get_stored_logs(job_ids):
+        if not job_ids:
+            return {}
+        return {
+            (job_log.job_id, job_log.name, job_log.url): job_log
+            for job_log in JobLog.objects.filter(job_id__in=job_ids)
+        }
+
+    job_ids = {job.id for job, _ in jobs}
+    stored = get_stored_logs(job_ids - new_job_ids)
+    new_logs = [job_log for key, job_log in job_logs.items() if key not in stored]
+    if new_logs:
+        # logs inserted meanwhile by another process are kept as they are
+        JobLog.objects.bulk_create(new_logs, ignore_conflicts=True)
+        stored = get_stored_logs(job_ids)
+
+    logs_by_job = {}
+    for key in job_logs:
+        logs_by_job.setdefault(key[0], []).append(stored[key])
+    return [
+        (job, logs_by_job[job.id], job_datum.get('result', 'unknown'))
+        for job, job_datum in jobs
+        if job.id in logs_by_job
+    ]
 
 
 def store_job_data(repository, originalData):
@@ -415,57 +599,23 @@ def store_job_data(repository, originalData):
         return
 
     # remove any existing jobs that already have the same state
-    data = _remove_existing_jobs(data)
+    existing_jobs = _get_existing_jobs(datum['job']['job_guid'] for datum in data)
+    data = _remove_existing_jobs(data, existing_jobs)
     if not data:
         return
 
-    superseded_job_guid_placeholders = []
-
-    # TODO: Refactor this now that store_job_data() is only over called with one job at a time.
-    for datum in data:
-        try:
-            # TODO: this might be a good place to check the datum against
-            # a JSON schema to ensure all the fields are valid.  Then
-            # the exception we caught would be much more informative.  That
-            # being said, if/when we transition to only using the pulse
-            # job consumer, then the data will always be vetted with a
-            # JSON schema before we get to this point.
-            job = datum['job']
-            revision = datum['revision']
-            superseded = datum.get('superseded', [])
-
-            revision_field = 'revision__startswith' if len(revision) < 40 else 'revision'
-            filter_kwargs = {'repository': repository, revision_field: revision}
-            push_id = Push.objects.values_list('id', flat=True).get(**filter_kwargs)
-
-            # load job
-            job_guid = _load_job(repository, job, push_id)
-
-            for superseded_guid in superseded:
-                superseded_job_guid_placeholders.append(
-                    # superseded by guid, superseded guid
-                    [job_guid, superseded_guid]
-                )
-        except Exception as e:
-            # Surface the error immediately unless running in production, where we'd
-            # rather report it on New Relic and not block storing the remaining jobs.
-            # TODO: Once buildbot support is removed, remove this as part of
-            # refactoring this method to process just one job at a time.
-            if 'DYNO' not in os.environ:
-                raise
-
-            logger.exception(e)
-            # make more fields visible in new relic for the job
-            # where we encountered the error
-            datum.update(datum.get("job", {}))
-            newrelic.agent.record_exception(params=datum)
-
-            # skip any jobs that hit errors in these stages.
-            continue
+    # TODO: this might be a good place to check the data against
+    # a JSON schema to ensure all the fields are valid.  Then
+    # the exception we caught would be much more informative.  That
+    # being said, if/when we transition to only using the pulse
+    # job consumer, then the data will always be vetted with a
+    # JSON schema before we get to this point.
+    push_ids = get_push_ids(repository, {datum['revision'] for datum in data})
+    loaded = _load_jobs(repository, data, push_ids, existing_jobs)
 
     # Update the result/state of any jobs that were superseded by those ingested above.
-    if superseded_job_guid_placeholders:
-        for (job_guid, superseded_by_guid) in superseded_job_guid_placeholders:
-            Job.objects.filter(guid=superseded_by_guid).update(
-                result='superseded', state='completed'
-            )
+    superseded_guids = [
+        superseded_guid for datum in loaded for superseded_guid in datum.get('superseded', [])
+    ]
+    if superseded_guids:
+        Job.objects.filter(guid__in=superseded_guids).update(result='superseded', state='completed')
@@ -6,6 +6,13 @@ from treeherder.etl.bugzilla import BzApiBugProcess
 class Command(BaseCommand):
     """Management command to manually update bugscache from bugzilla"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Fetch all the intermittent bugs instead of those changed since the last update',
+        )
+
     def handle(self, *args, **options):
         process = BzApiBugProcess()
-        process.run()
+        process.run(full=options['full'])
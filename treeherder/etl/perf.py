@@ -7,6 +7,8 @@ from typing import List, Tuple
 import simplejson as json
 
 from django.conf import settings
+from django.db import IntegrityError, transaction
+
 from treeherder.log_parser.utils import validate_perf_data
 from treeherder.model.models import Job, OptionCollection
 from treeherder.perf.models import (
@@ -15,10 +17,18 @@ from treeherder.perf.models import (
     PerformanceFramework,
     PerformanceSignature,
 )
-from treeherder.perf.tasks import generate_alerts
+from treeherder.perf.tasks import schedule_alerts
+from treeherder.utils.lru import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Most perf data belongs to signatures which were already ingested, so keep
+# them around instead of looking them up for every artifact. Entries expire
+# to pick up signatures changed or removed by other processes.
+signature_cache = LRUCache(
+    settings.PERFHERDER_SIGNATURE_CACHE_SIZE, timeout=settings.PERFHERDER_SIGNATURE_CACHE_TIMEOUT
+)
+
 
 def _get_application_name(validated_perf_datum: dict):
     try:
@@ -82,8 +92,202 @@ def _deduce_push_timestamp(perf_datum: dict, job_push_time: datetime) -> Tuple[d
     return (multidata_timestamp or job_push_time), is_multi_commit
 
 
-def _load_perf_datum(job: Job, perf_datum: dict):
-    validate_perf_data(perf_datum)
+def _get_signature_cache_key(repository_id, framework_id, application, signature_hash):
+    return (repository_id, framework_id, application, signature_hash)
+
+
+def invalidate_signature_cache(signatures):
+    """Drops `signatures` from the signature cache, after they got changed by other means."""
+    signature_cache.delete_many(
+        _get_signature_cache_key(
+            signature.repository_id,
+            signature.framework_id,
+            signature.application,
+            signature.signature_hash,
+        )
+        for signature in signatures
+    )
+
+
+def _get_signatures(repository, framework, application, signature_hashes):
+    """Returns the existing signatures among `signature_hashes`, by hash."""
+    cache_keys = {
+        signature_hash: _get_signature_cache_key(
+            repository.id, framework.id, application, signature_hash
+        )
+        for signature_hash in signature_hashes
+    }
+    cached_signatures = signature_cache.get_many(cache_keys.values())
+    signatures = {
+        signature_hash: cached_signatures[cache_key]
+        for (signature_hash, cache_key) in cache_keys.items()
+        if cache_key in cached_signatures
+    }
+
+    missing_hashes = [
+        signature_hash for signature_hash in signature_hashes if signature_hash not in signatures
+    ]
+    if missing_hashes:
+        signatures.update(
+            (signature.signature_hash, signature)
+            for signature in PerformanceSignature.objects.filter(
+                repository=repository,
+                framework=framework,
+                application=application,
+                signature_hash__in=missing_hashes,
+            )
+        )
+        _cache_signatures(signatures.values())
+    return signatures
+
+
+def _cache_signatures(signatures):
+    signature_cache.set_many(
+        {
+            _get_signature_cache_key(
+                signature.repository_id,
+                signature.framework_id,
+                signature.application,
+                signature.signature_hash,
+            ): signature
+            for signature in signatures
+        }
+    )
+
+
+def _get_signature_field_name(field):
+    return PerformanceSignature._meta.get_field(field).name
+
+
+def _bulk_update_signatures(signatures, specs):
+    """Applies the new properties of already existing signatures, with a single query."""
+    updated_signatures = []
+    updated_fields = set()
+    for signature_hash, defaults in specs.items():
+        signature = signatures.get(signature_hash)
+        if signature is None:
+            continue
+        defaults = dict(defaults)
+        if signature.last_updated > defaults['last_updated']:
+            defaults['last_updated'] = signature.last_updated
+
+        changed_fields = [
+            field for (field, value) in defaults.items() if getattr(signature, field) != value
+        ]
+        for field in changed_fields:
+            setattr(signature, field, defaults[field])
+        if changed_fields:
+            updated_signatures.append(signature)
+            updated_fields.update(_get_signature_field_name(field) for field in changed_fields)
+
+    if updated_signatures:
+        try:
+            PerformanceSignature.objects.bulk_update(updated_signatures, sorted(updated_fields))
+        except Exception:
+            # the cached signatures no longer reflect the stored ones
+            invalidate_signature_cache(updated_signatures)
+            raise
+
+
+def _bulk_create_signatures(repository, framework, application, specs):
+    """Creates the signatures missing for `specs`, returns them by hash."""
+    if not specs:
+        return {}
+
+    try:
+        with transaction.atomic():
+            PerformanceSignature.objects.bulk_create(
+                [
+                    PerformanceSignature(
+                        repository=repository,
+                        signature_hash=signature_hash,
+                        framework=framework,
+                        application=application,
+                        **defaults,
+                    )
+                    for (signature_hash, defaults) in specs.items()
+                ]
+            )
+    except IntegrityError:
+        # some were created meanwhile by another ingestion, so fall back to
+        # creating (or updating) them one by one
+        for signature_hash, defaults in specs.items():
+            _create_or_update_signature(
+                repository, signature_hash, framework, application, dict(defaults)
+            )
+
+    # bulk inserts don't provide the ids of the new rows on MySQL
+    signatures = {
+        signature.signature_hash: signature
+        for signature in PerformanceSignature.objects.filter(
+            repository=repository,
+            framework=framework,
+            application=application,
+            signature_hash__in=list(specs),
+        )
+    }
+    _cache_signatures(signatures.values())
+    return signatures
+
+
+def _bulk_create_perf_data(job, push_timestamp, signature_values):
+    """
+    Stores the values of `signature_values` (a dict of signatures to values),
+    unless the job already provided them.
+
+    Returns the signatures which received a new datum.
+    """
+    datum_lookup = dict(
+        repository=job.repository, job=job, push=job.push, push_timestamp=push_timestamp
+    )
+    existing_signature_ids = set(
+        PerformanceDatum.objects.filter(
+            signature__in=list(signature_values), **datum_lookup
+        ).values_list('signature_id', flat=True)
+    )
+    new_signature_values = {
+        signature: value
+        for (signature, value) in signature_values.items()
+        if signature.id not in existing_signature_ids
+    }
+    if not new_signature_values:
+        return []
+
+    try:
+        with transaction.atomic():
+            PerformanceDatum.objects.bulk_create(
+                [
+                    PerformanceDatum(signature=signature, value=value, **datum_lookup)
+                    for (signature, value) in new_signature_values.items()
+                ]
+            )
+    except IntegrityError:
+        # the same data is being ingested concurrently, or some of the
+        # cached signatures were removed meanwhile
+        invalidate_signature_cache(new_signature_values)
+        return [
+            signature
+            for (signature, value) in new_signature_values.items()
+            if PerformanceDatum.objects.get_or_create(
+                signature=signature, defaults={'value': value}, **datum_lookup
+            )[1]
+        ]
+
+    # bulk inserts bypass `PerformanceDatum.save()`, so update the
+    # signatures' timestamps ourselves
+    PerformanceSignature.objects.filter(
+        id__in=[signature.id for signature in new_signature_values],
+        last_updated__lt=push_timestamp,
+    ).update(last_updated=push_timestamp)
+    for signature in new_signature_values:
+        signature.last_updated = max(signature.last_updated, push_timestamp)
+
+    return list(new_signature_values)
+
+
+def _load_perf_datum(job: Job, perf_datum: dict, validated: bool = False):
+    if not validated:
+        validate_perf_data(perf_datum)
 
     extra_properties = {}
     reference_data = {
@@ -111,10 +315,18 @@ def _load_perf_datum(job: Job, perf_datum: dict):
         )
         return
     application = _get_application_name(perf_datum)
+    deduced_timestamp, is_multi_commit = _deduce_push_timestamp(perf_datum, job.push.time)
+
+    # first gather the properties of all the artifact's signatures, so
+    # they can be resolved & stored in bulk
+    summary_specs = {}
+    subtest_specs = {}
+    subtest_parents = {}
+    values = {}
+    should_alert = {}
     for suite in perf_datum['suites']:
         suite_extra_properties = copy.copy(extra_properties)
         ordered_tags = _order_and_concat(suite.get('tags', []))
-        deduced_timestamp, is_multi_commit = _deduce_push_timestamp(perf_datum, job.push.time)
         suite_extra_options = ''
 
         if suite.get('extraOptions'):
@@ -130,17 +342,14 @@ def _load_perf_datum(job: Job, perf_datum: dict):
             summary_properties.update(reference_data)
             summary_properties.update(suite_extra_properties)
             summary_signature_hash = _get_signature_hash(summary_properties)
-            signature = _create_or_update_signature(
-                job.repository,
+            summary_specs.setdefault(
                 summary_signature_hash,
-                framework,
-                application,
                 {
                     'test': '',
                     'suite': suite['name'],
                     'suite_public_name': suite.get('publicName'),
-                    'option_collection': option_collection,
-                    'platform': job.machine_platform,
+                    'option_collection_id': option_collection.id,
+                    'platform_id': job.machine_platform_id,
                     'tags': ordered_tags,
                     'extra_options': suite_extra_options,
                     'measurement_unit': suite.get('unit'),
@@ -159,57 +368,33 @@ def _load_perf_datum(job: Job, perf_datum: dict):
                     'last_updated': job.push.time,
                 },
             )
+            values.setdefault(summary_signature_hash, suite['value'])
+            should_alert.setdefault(summary_signature_hash, suite.get('shouldAlert') is not False)
 
-            (suite_datum, datum_created) = PerformanceDatum.objects.get_or_create(
-                repository=job.repository,
-                job=job,
-                push=job.push,
-                signature=signature,
-                push_timestamp=deduced_timestamp,
-                defaults={'value': suite['value']},
-            )
-            if suite_datum.should_mark_as_multi_commit(is_multi_commit, datum_created):
-                # keep a register with all multi commit perf data
-                MultiCommitDatum.objects.create(perf_datum=suite_datum)
-            if (
-                signature.should_alert is not False
-                and datum_created
-                and job.repository.performance_alerts_enabled
-            ):
-                generate_alerts.apply_async(args=[signature.id], queue='generate_perf_alerts')
+        # only the first of several subtests with the same name is considered
+        subtest_values = {}
+        for subtest in suite['subtests']:
+            subtest_values.setdefault(subtest['name'], subtest['value'])
 
         for subtest in suite['subtests']:
             subtest_properties = {'suite': suite['name'], 'test': subtest['name']}
             subtest_properties.update(reference_data)
             subtest_properties.update(suite_extra_properties)
 
-            summary_signature = None
             if summary_signature_hash is not None:
                 subtest_properties.update({'parent_signature': summary_signature_hash})
-                summary_signature = PerformanceSignature.objects.get(
-                    repository=job.repository,
-                    framework=framework,
-                    signature_hash=summary_signature_hash,
-                    application=application,
-                )
             subtest_signature_hash = _get_signature_hash(subtest_properties)
-            value = list(
-                subtest['value']
-                for subtest in suite['subtests']
-                if subtest['name'] == subtest_properties['test']
-            )
-            signature = _create_or_update_signature(
-                job.repository,
+            if summary_signature_hash is not None:
+                subtest_parents.setdefault(subtest_signature_hash, summary_signature_hash)
+            subtest_specs.setdefault(
                 subtest_signature_hash,
-                framework,
-                application,
                 {
                     'test': subtest_properties['test'],
                     'suite': suite['name'],
                     'test_public_name': subtest.get('publicName'),
                     'suite_public_name': suite.get('publicName'),
-                    'option_collection': option_collection,
-                    'platform': job.machine_platform,
+                    'option_collection_id': option_collection.id,
+                    'platform_id': job.machine_platform_id,
                     'tags': ordered_tags,
                     'extra_options': suite_extra_options,
                     'measurement_unit': subtest.get('unit'),
@@ -226,43 +411,91 @@ def _load_perf_datum(job: Job, perf_datum: dict):
                     'min_back_window': subtest.get('minBackWindow'),
                     'max_back_window': subtest.get('maxBackWindow'),
                     'fore_window': subtest.get('foreWindow'),
-                    'parent_signature': summary_signature,
+                    'parent_signature_id': None,
                     'last_updated': job.push.time,
                 },
             )
-            (subtest_datum, datum_created) = PerformanceDatum.objects.get_or_create(
-                repository=job.repository,
-                job=job,
-                push=job.push,
-                signature=signature,
-                push_timestamp=deduced_timestamp,
-                defaults={'value': value[0]},
-            )
-            if subtest_datum.should_mark_as_multi_commit(is_multi_commit, datum_created):
-                # keep a register with all multi commit perf data
-                MultiCommitDatum.objects.create(perf_datum=subtest_datum)
-
+            values.setdefault(subtest_signature_hash, subtest_values[subtest['name']])
             # by default if there is no summary, we should schedule a
             # generate alerts task for the subtest, since we have new data
             # (this can be over-ridden by the optional "should alert"
             # property)
-            if (
-                (
-                    signature.should_alert
-                    or (signature.should_alert is None and suite.get('value') is None)
-                )
-                and datum_created
-                and job.repository.performance_alerts_enabled
-            ):
-                generate_alerts.apply_async(args=[signature.id], queue='generate_perf_alerts')
+            should_alert.setdefault(
+                subtest_signature_hash,
+                bool(
+                    subtest.get('shouldAlert')
+                    or (subtest.get('shouldAlert') is None and suite.get('value') is None)
+                ),
+            )
+
+    signatures = _get_signatures(
+        job.repository, framework, application, list(summary_specs) + list(subtest_specs)
+    )
+    signatures.update(
+        _bulk_create_signatures(
+            job.repository,
+            framework,
+            application,
+            {
+                signature_hash: defaults
+                for (signature_hash, defaults) in summary_specs.items()
+                if signature_hash not in signatures
+            },
+        )
+    )
+    for subtest_signature_hash, summary_signature_hash in subtest_parents.items():
+        subtest_specs[subtest_signature_hash]['parent_signature_id'] = signatures[
+            summary_signature_hash
+        ].id
+    _bulk_update_signatures(signatures, {**summary_specs, **subtest_specs})
+    signatures.update(
+        _bulk_create_signatures(
+            job.repository,
+            framework,
+            application,
+            {
+                signature_hash: defaults
+                for (signature_hash, defaults) in subtest_specs.items()
+                if signature_hash not in signatures
+            },
+        )
+    )
+
+    created_signatures = _bulk_create_perf_data(
+        job,
+        deduced_timestamp,
+        {signatures[signature_hash]: value for (signature_hash, value) in values.items()},
+    )
+
+    if PerformanceDatum.should_mark_as_multi_commit(is_multi_commit, bool(created_signatures)):
+        # keep a register with all multi commit perf data
+        MultiCommitDatum.objects.bulk_create(
+            [
+                MultiCommitDatum(perf_datum_id=perf_datum_id)
+                for perf_datum_id in PerformanceDatum.objects.filter(
+                    repository=job.repository,
+                    job=job,
+                    push=job.push,
+                    push_timestamp=deduced_timestamp,
+                    signature__in=created_signatures,
+                ).values_list('id', flat=True)
+            ]
+        )
+
+    if job.repository.performance_alerts_enabled:
+        for signature in created_signatures:
+            if should_alert[signature.signature_hash]:
+                schedule_alerts(signature.id)
 
 
 def store_performance_artifact(job, artifact):
     blob = json.loads(artifact['blob'])
     performance_data = blob['performance_data']
+    # set by the log parser, which already validated the data
+    validated = artifact.get('validated', False)
 
     if isinstance(performance_data, list):
         for perfdatum in performance_data:
-            _load_perf_datum(job, perfdatum)
+            _load_perf_datum(job, perfdatum, validated)
     else:
-        _load_perf_datum(job, performance_data)
+        _load_perf_datum(job, performance_data, validated)
@@ -12,6 +12,8 @@ import taskcluster_urls
 
 from treeherder.etl.schema import get_json_schema
 from treeherder.etl.taskcluster_pulse.parse_route import parseRoute
+from treeherder.utils.lru import LRUCache
+from treeherder.utils.taskcluster import task_definitions
 
 env = environ.Env()
 logger = logging.getLogger(__name__)
@@ -19,6 +21,12 @@ loop = asyncio.get_event_loop()
 projectsToIngest = env("PROJECTS_TO_INGEST", default=None)
 session = taskcluster.aio.createSession(loop=loop)
 
+# whether the tasks of a (mobile) task group are ignored, by root url and task group
+DECISION_TASK_CACHE_SIZE = 1000
+DECISION_TASK_CACHE_TIMEOUT = 60 * 60
+task_group_verdicts = LRUCache(DECISION_TASK_CACHE_SIZE, timeout=DECISION_TASK_CACHE_TIMEOUT)
+pending_task_group_lookups = {}
+
 
 # Build a mapping from exchange name to task status
 EXCHANGE_EVENT_MAP = {
@@ -30,6 +38,16 @@ EXCHANGE_EVENT_MAP = {
 }
 
 
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine on the event loop of this module from synchronous code,
+    even while the loop runs in another thread (see `TaskPipeline`).
+    """
+    if loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+    return loop.run_until_complete(coroutine)
+
+
 class PulseHandlerError(Exception):
     """Base error"""
 
@@ -101,7 +119,57 @@ def validateTask(task):
     return True
 
 
-def ignore_task(task, taskId, rootUrl, project):
+def ignore_task_group(decision_task):
+    """Whether the tasks of a mobile decision task aren't meant to be ingested."""
+    scopes = decision_task["metadata"].get("source")
+    ignore = True
+    for scope in scopes:
+        # e.g. assume:repo:github.com/mozilla-mobile/fenix:branch:master
+        if scope.find('branch:master') != -1:
+            ignore = False
+            break
+
+    # This handles nightly tasks
+    # e.g. index.mobile.v2.fenix.branch.master.latest.taskgraph.decision-nightly
+    for route in decision_task["routes"]:
+        if route.find('master') != -1:
+            ignore = False
+            break
+
+    return ignore
+
+
+async def fetch_task_group_verdict(rootUrl, taskGroupId):
+    """
+    Returns whether the tasks of the given task group are ignored, from its
+    decision task.
+
+    Every task of a group shares the same decision task, so the verdict is
+    kept for DECISION_TASK_CACHE_TIMEOUT seconds, and concurrent lookups of
+    the same group wait for a single fetch.
+    """
+    key = (rootUrl, taskGroupId)
+    ignore = task_group_verdicts.get(key)
+    if ignore is not None:
+        return ignore
+
+    lookup = pending_task_group_lookups.get(key)
+    if lookup is None:
+
+        async def lookup_task_group():
+            try:
+                asyncQueue = taskcluster.aio.Queue({"rootUrl": rootUrl}, session=session)
+                ignore = ignore_task_group(await asyncQueue.task(taskGroupId))
+                task_group_verdicts.set(key, ignore)
+                return ignore
+            finally:
+                del pending_task_group_lookups[key]
+
+        lookup = pending_task_group_lookups[key] = asyncio.ensure_future(lookup_task_group())
+    return await asyncio.shield(lookup)
+
+
+async def ignore_task(task, taskId, rootUrl, project):
     ignore = False
     # This logic is useful to reduce the number of tasks we ingest and requirying
     # less dynos and less database writes. You can adjust PROJECTS_TO_INGEST on the app to meet your needs
@@ -130,22 +198,7 @@ def ignore_task(task, taskId, rootUrl, project):
                 pass
         else:
             # The decision task is the ultimate source for determining this information
-            queue = taskcluster.Queue({"rootUrl": rootUrl}, session=session)
-            decision_task = queue.task(task["taskGroupId"])
-            scopes = decision_task["metadata"].get("source")
-            ignore = True
-            for scope in scopes:
-                # e.g. assume:repo:github.com/mozilla-mobile/fenix:branch:master
-                if scope.find('branch:master') != -1:
-                    ignore = False
-                    break
-
-            # This handles nightly tasks
-            # e.g. index.mobile.v2.fenix.branch.master.latest.taskgraph.decision-nightly
-            for route in decision_task["routes"]:
-                if route.find('master') != -1:
-                    ignore = False
-                    break
+            ignore = await fetch_task_group_verdict(rootUrl, task["taskGroupId"])
 
     if ignore:
         logger.debug('Task to be ignored ({})'.format(taskId))
@@ -161,8 +214,11 @@ def ignore_task(task, taskId, rootUrl, project):
 async def handleMessage(message, taskDefinition=None):
     jobs = []
     taskId = message["payload"]["status"]["taskId"]
-    asyncQueue = taskcluster.aio.Queue({"rootUrl": message["root_url"]}, session=session)
-    task = (await asyncQueue.task(taskId)) if not taskDefinition else taskDefinition
+    task = taskDefinition or task_definitions.get(message["root_url"], taskId)
+    if not task:
+        asyncQueue = taskcluster.aio.Queue({"rootUrl": message["root_url"]}, session=session)
+        task = await asyncQueue.task(taskId)
+        task_definitions.set(message["root_url"], taskId, task)
 
     try:
         parsedRoute = parseRouteInfo("tc-treeherder", taskId, task["routes"], task)
@@ -170,7 +226,7 @@ async def handleMessage(message, taskDefinition=None):
         logger.debug("%s", str(e))
         return jobs
 
-    if ignore_task(task, taskId, message["root_url"], parsedRoute['project']):
+    if await ignore_task(task, taskId, message["root_url"], parsedRoute['project']):
         return jobs
 
     logger.debug("Message received for task %s", taskId)
@@ -2,6 +2,7 @@
 This module contains tasks related to pulse job ingestion
 """
 import asyncio
+import logging
 
 import newrelic.agent
 
@@ -10,6 +11,8 @@ from treeherder.etl.push_loader import PushLoader
 from treeherder.etl.taskcluster_pulse.handler import handleMessage
 from treeherder.workers.task import retryable_task
 
+logger = logging.getLogger(__name__)
+
 # NOTE: default values for root_url parameters can be removed once all tasks that lack
 # that parameter have been processed
 
@@ -39,6 +42,51 @@ def store_pulse_tasks(
             JobLoader().process_job(run, root_url)
 
 
+@retryable_task(name='store-pulse-tasks-batch', max_retries=10)
+def store_pulse_tasks_batch(messages, root_url='https://firefox-ci-tc.services.mozilla.com'):
+    """
+    Fetches the tasks of a batch of pulse messages from Taskcluster, and stores
+    their jobs together.
+
+    Each message is given as its ``store_pulse_tasks`` arguments.  Messages
+    which can't be stored with the batch are handed to ``store_pulse_tasks``,
+    to be retried on their own.
+    """
+    loop = asyncio.get_event_loop()
+    newrelic.agent.add_custom_parameter("messages", len(messages))
+    results = loop.run_until_complete(
+        asyncio.gather(
+            *[
+                handleMessage(
+                    {
+                        "exchange": exchange,
+                        "payload": pulse_job,
+                        "root_url": root_url,
+                    }
+                )
+                for pulse_job, exchange, _ in messages
+            ],
+            return_exceptions=True,
+        )
+    )
+
+    retried = set()
+    runs = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to handle a task message of the batch: %s", result)
+            retried.add(index)
+        else:
+            runs.extend((index, run) for run in result if run)
+
+    failed = JobLoader().process_jobs([run for _, run in runs], root_url)
+    failed_ids = {id(run) for run in failed}
+    retried.update(index for index, run in runs if id(run) in failed_ids)
+
+    for index in sorted(retried):
+        store_pulse_tasks.apply_async(args=[*messages[index], root_url], queue='store_pulse_tasks')
+
+
 @retryable_task(name='store-pulse-pushes', max_retries=10)
 def store_pulse_pushes(
     body, exchange, routing_key, root_url='https://firefox-ci-tc.services.mozilla.com'
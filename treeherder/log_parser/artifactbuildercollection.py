@@ -1,6 +1,11 @@
+import copy
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import newrelic.agent
+from django.conf import settings
+from requests.models import ITER_CHUNK_SIZE
 
 from treeherder.utils.http import make_request
 
@@ -10,6 +15,12 @@ from .parsers import EmptyPerformanceData
 logger = logging.getLogger(__name__)
 # Max log size in bytes we will download (prior to decompression).
 MAX_DOWNLOAD_SIZE_IN_BYTES = 5 * 1024 * 1024
+# Same, for logs parsed in chunks by several processes.
+MAX_PARALLEL_DOWNLOAD_SIZE_IN_BYTES = 20 * 1024 * 1024
+# Size of the (decompressed) chunks logs are split in, to be parsed in parallel.
+CHUNK_SIZE_IN_BYTES = 4 * 1024 * 1024
+
+_pools = {}
 
 
 class ArtifactBuilderCollection:
@@ -51,16 +62,20 @@ class ArtifactBuilderCollection:
     * Parsers:
     * PerformanceParser"""
 
-    def __init__(self, url, builders=None):
+    def __init__(self, url, builders=None, processes=None):
         """
         ``url`` - url of the log to be parsed
         ``builders`` - ArtifactBuilder instances to generate artifacts.
         In omitted, use defaults.
+        ``processes`` - amount of processes parsing the log in chunks, 0 to
+        parse it line by line in this one. Defaults to the
+        ``LOG_PARSER_PROCESSES`` setting.
 
         """
 
         self.url = url
         self.artifacts = {}
+        self.processes = settings.LOG_PARSER_PROCESSES if processes is None else processes
 
         if builders:
             # ensure that self.builders is a list, even if a single parser was
@@ -91,23 +106,24 @@ class ArtifactBuilderCollection:
                 'unstructured_log_encoding', response.headers.get('Content-Encoding', 'None')
             )
 
-            if download_size_in_bytes > MAX_DOWNLOAD_SIZE_IN_BYTES:
+            max_download_size_in_bytes = (
+                MAX_PARALLEL_DOWNLOAD_SIZE_IN_BYTES
+                if self.processes
+                else MAX_DOWNLOAD_SIZE_IN_BYTES
+            )
+            if download_size_in_bytes > max_download_size_in_bytes:
                 raise LogSizeException(
                     'Download size of %i bytes exceeds limit' % download_size_in_bytes
                 )
 
-            # Lines must be explicitly decoded since `iter_lines()`` returns bytes by default
-            # and we cannot use its `decode_unicode=True` mode, since otherwise Unicode newline
-            # characters such as `\u0085` (which can appear in test output) are treated the same
-            # as `\n` or `\r`, and so split into unwanted additional lines by `iter_lines()`.
-            for line in response.iter_lines():
-                for builder in self.builders:
-                    try:
-                        # Using `replace` to prevent malformed unicode (which might possibly exist
-                        # in test message output) from breaking parsing of the rest of the log.
-                        builder.parse_line(line.decode('utf-8', 'replace'))
-                    except EmptyPerformanceData:
-                        logger.warning("We have parsed an empty PERFHERDER_DATA for %s", self.url)
+            if self.processes:
+                self.parse_in_chunks(response)
+            else:
+                self.parse_lines(response)
+
+            if self.complete:
+                # leaving the block closes the stream without reading the rest of the log
+                newrelic.agent.add_custom_parameter('unstructured_log_parsing_stopped_early', True)
 
         # gather the artifacts from all builders
         for builder in self.builders:
@@ -120,6 +136,129 @@ class ArtifactBuilderCollection:
                 continue
             self.artifacts[name] = artifact
 
+    @property
+    def complete(self):
+        """Whether none of the builders needs to see any more lines."""
+        return all(builder.complete for builder in self.builders)
+
+    def parse_lines(self, response):
+        """Run each line of the log through the builders which still need more lines."""
+        builders = [builder for builder in self.builders if not builder.complete]
+
+        # Lines must be explicitly decoded since `iter_lines()`` returns bytes by default
+        # and we cannot use its `decode_unicode=True` mode, since otherwise Unicode newline
+        # characters such as `\u0085` (which can appear in test output) are treated the same
+        # as `\n` or `\r`, and so split into unwanted additional lines by `iter_lines()`.
+        lines = response.iter_lines()
+        while builders:
+            line = next(lines, None)
+            if line is None:
+                break
+            if _parse_line(self.url, builders, line):
+                builders = [builder for builder in builders if not builder.complete]
+
+    def parse_in_chunks(self, response):
+        """
+        Split the log in chunks of whole lines, parsed by a pool of processes.
+
+        Each chunk is parsed by copies of the builders, which are then merged
+        back into the builders in the order of the chunks.
+        """
+        pool = _get_pool(self.processes)
+        pending = deque()
+        # builders holding the state the next chunk has to be parsed in,
+        # without the results merged so far
+        templates = copy.deepcopy(self.builders)
+
+        for chunk in _iter_chunks(response, CHUNK_SIZE_IN_BYTES):
+            if self.complete:
+                break
+            # copy the builders right away, as the pool only pickles them later on
+            chunk_builders = copy.deepcopy(templates)
+            pending.append(pool.submit(_parse_chunk, chunk_builders, chunk))
+            for template in templates:
+                template.skim(chunk)
+
+            # don't hold more of the log in memory than the pool can work on
+            if len(pending) > 2 * self.processes:
+                self._merge(pending.popleft().result())
+
+        while pending:
+            if self.complete:
+                # the results of the remaining chunks aren't needed anymore
+                for future in pending:
+                    future.cancel()
+                break
+            self._merge(pending.popleft().result())
+
+    def _merge(self, chunk_builders):
+        for builder, chunk_builder in zip(self.builders, chunk_builders):
+            builder.merge(chunk_builder)
+
+
+def _parse_line(url, builders, line):
+    """Run a line through the builders, returns whether any of them is now complete."""
+    # Using `replace` to prevent malformed unicode (which might possibly exist
+    # in test message output) from breaking parsing of the rest of the log.
+    line = line.decode('utf-8', 'replace')
+    completed = False
+    for builder in builders:
+        try:
+            builder.parse_line(line)
+        except EmptyPerformanceData:
+            logger.warning("We have parsed an empty PERFHERDER_DATA for %s", url)
+        completed = completed or builder.complete
+    return completed
+
+
+def _parse_chunk(builders, chunk):
+    # same line splitting as `iter_lines()`
+    lines = chunk.splitlines()
+    for builder in builders:
+        builder.parse_chunk(chunk, lines)
+    return builders
+
+
+def _iter_chunks(response, chunk_size):
+    """Yield the decompressed log in chunks of at least `chunk_size` bytes, ending with a newline."""
+    parts = []
+    size = 0
+    last_byte = b''
+    # read the log the same way `iter_lines()` does
+    for data in response.iter_content(chunk_size=ITER_CHUNK_SIZE):
+        if not data:
+            continue
+        # `iter_lines()` yields an extra empty line for a "\r\n" split across
+        # reads; add it as well, so line numbers match those of serial parsing
+        if last_byte == b'\r' and data.startswith(b'\n'):
+            parts.append(b'\n')
+            size += 1
+        last_byte = data[-1:]
+
+        parts.append(data)
+        size += len(data)
+        if size < chunk_size:
+            continue
+
+        buffer = b''.join(parts)
+        end = buffer.rfind(b'\n') + 1
+        if end:
+            yield buffer[:end]
+            buffer = buffer[end:]
+        parts = [buffer]
+        size = len(buffer)
+
+    buffer = b''.join(parts)
+    if buffer:
+        yield buffer
+
+
+def _get_pool(processes):
+    """The pool of processes parsing logs, kept across logs."""
+    if processes not in _pools:
+        _pools[processes] = ProcessPoolExecutor(max_workers=processes)
+    return _pools[processes]
+
 
 class LogSizeException(Exception):
     pass
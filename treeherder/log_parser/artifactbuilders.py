@@ -1,6 +1,6 @@
 import logging
 
-from .parsers import PerformanceParser, ErrorParser
+from .parsers import EmptyPerformanceData, PerformanceParser, ErrorParser
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,35 @@ class ArtifactBuilderBase:
         self.parser.parse_line(line, self.lineno)
         self.lineno += 1
 
+    def parse_chunk(self, chunk, lines):
+        """Parse a raw chunk of log (bytes), already split in `lines`."""
+        for line in lines:
+            if self.parser.complete:
+                break
+            try:
+                # Using `replace` to prevent malformed unicode (which might possibly exist
+                # in test message output) from breaking parsing of the rest of the log.
+                self.parse_line(line.decode('utf-8', 'replace'))
+            except EmptyPerformanceData:
+                logger.warning(
+                    "We have parsed an empty PERFHERDER_DATA for %s", self.artifact['logurl']
+                )
+
+    @property
+    def complete(self):
+        """Whether the builder doesn't need to see any more lines."""
+        return self.parser.complete
+
+    def skim(self, chunk):
+        """Inspect a raw chunk of log before it's handed to a copy of this builder."""
+        self.parser.skim(chunk)
+
+    def merge(self, other):
+        """Add the results of `other`, which parsed the lines following the ones seen here."""
+        if not self.parser.complete:
+            self.parser.merge(other.parser, self.lineno)
+        self.lineno += other.lineno
+
     def finish_parse(self):
         """Run any clean-up/summary actions associated with the parser."""
         # The last lineno seen is one less than ``lineno`` since it's
@@ -79,3 +108,16 @@ class PerformanceDataArtifactBuilder(ArtifactBuilderBase):
         super().__init__(url)
         self.parser = PerformanceParser()
         self.name = "performance_data"
+
+    def parse_chunk(self, chunk, lines):
+        if self.parser.complete:
+            return
+        # only the few lines with perf data matter, so look them up directly
+        for start, end in self.parser.find_data_lines(chunk):
+            try:
+                self.parser.parse_line(chunk[start:end].decode('utf-8', 'replace'), self.lineno)
+            except EmptyPerformanceData:
+                logger.warning(
+                    "We have parsed an empty PERFHERDER_DATA for %s", self.artifact['logurl']
+                )
+        self.lineno += len(lines)
@@ -1,7 +1,6 @@
 from collections import defaultdict
 import json
 import logging
-from itertools import islice
 
 import newrelic.agent
 from django.conf import settings
@@ -11,21 +10,31 @@ from requests.exceptions import HTTPError
 
 from treeherder.etl.text import astral_filter
 from treeherder.model.models import FailureLine, Group, JobLog, GroupStatus
-from treeherder.utils.http import fetch_text
+from treeherder.utils.http import make_request
+from treeherder.utils.lru import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Group names recur across logs and groups are never deleted, so remember
+# their ids rather than looking them up for every log
+GROUP_CACHE_SIZE = 20000
+group_cache = LRUCache(GROUP_CACHE_SIZE)
+
 
 def store_failure_lines(job_log):
     log_iter = fetch_log(job_log)
     if not log_iter:
         return False
-    return write_failure_lines(job_log, log_iter)
+    try:
+        return write_failure_lines(job_log, log_iter)
+    finally:
+        # stops the download if not all of the log was needed
+        log_iter.close()
 
 
 def fetch_log(job_log):
     try:
-        log_text = fetch_text(job_log.url)
+        response = make_request(job_log.url, stream=True)
     except HTTPError as e:
         job_log.update_status(JobLog.FAILED)
         if e.response is not None and e.response.status_code in (403, 404):
@@ -33,20 +42,62 @@ def fetch_log(job_log):
             return
         raise
 
-    if not log_text:
+    log_iter = _iter_log(response)
+    first_item = next(log_iter, None)
+    if first_item is None:
         return
 
-    return (json.loads(item) for item in log_text.splitlines())
+    return _prepend(first_item, log_iter)
 
 
-def write_failure_lines(job_log, log_iter):
-    failure_lines = []
+def _iter_log(response):
+    """Decode the lines of the log as they're downloaded."""
+    with response:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def _prepend(item, log_iter):
+    try:
+        yield item
+        yield from log_iter
+    finally:
+        log_iter.close()
+
+
+def read_log(log_iter):
+    """
+    Return the lines of the log to store: the first failure lines and group
+    results, up to their respective cutoffs.
+
+    Only reads as much of the log as needed to fill both.
+    """
     failure_lines_cutoff = settings.FAILURE_LINES_CUTOFF
-    log_list = list(islice(log_iter, failure_lines_cutoff + 1))
+    group_results_cutoff = settings.GROUP_RESULTS_CUTOFF
+    failure_lines = []
+    group_results = []
 
-    if len(log_list) > failure_lines_cutoff:
-        # Alter the N+1th log line to indicate the list was truncated.
-        log_list[-1].update(action='truncated')
+    for item in log_iter:
+        if item.get('action') == 'group_result':
+            if len(group_results) < group_results_cutoff:
+                group_results.append(item)
+        elif len(failure_lines) <= failure_lines_cutoff:
+            failure_lines.append(item)
+
+        if len(failure_lines) > failure_lines_cutoff and len(group_results) >= group_results_cutoff:
+            break
+
+    if len(failure_lines) > failure_lines_cutoff:
+        # Alter the N+1th failure line to indicate the list was truncated.
+        failure_lines[-1].update(action='truncated')
+
+    return failure_lines + group_results
+
+
+def write_failure_lines(job_log, log_iter):
+    failure_lines = []
+    log_list = read_log(log_iter)
 
     transformer = None
     with transaction.atomic():
@@ -104,8 +155,8 @@ def get_kwargs(failure_line):
     return {key: failure_line[key] for key in _failure_line_keys if key in failure_line}
 
 
-def create_failure_line(job_log, failure_line):
-    return FailureLine.objects.create(
+def build_failure_line(job_log, failure_line):
+    return FailureLine(
         repository=job_log.job.repository,
         job_guid=job_log.job.guid,
         job_log=job_log,
@@ -113,28 +164,61 @@ def create_failure_line(job_log, failure_line):
     )
 
 
-def create_group_result(job_log, line):
-    group_path = line["group"]
-
-    # Log to New Relic if it's not in a form we like.  We can enter
-    # Bugs to upstream to remedy them.
-    if "\\" in group_path or ":" in group_path or len(group_path) > 255:
-        newrelic.agent.record_custom_event(
-            "malformed_test_group",
-            {
-                "message": "Group paths must be relative, with no backslashes and <255 chars",
-                "group": line["group"],
-                "group_path": group_path,
-                "length": len(group_path),
-                "repository": job_log.job.repository,
-                "job_guid": job_log.job.guid,
-            },
-        )
-    else:
-        group, _ = Group.objects.get_or_create(name=group_path[:255])
-        GroupStatus.objects.create(
-            job_log=job_log, group=group, status=GroupStatus.get_status(line['status'])
-        )
+def get_group_ids(names):
+    """
+    Return the ids of the groups named `names` by name, creating the missing
+    ones, in the order of `names`.
+    """
+    group_ids = group_cache.get_many(names)
+    missing_names = [name for name in names if name not in group_ids]
+    if not missing_names:
+        return group_ids
+
+    found_ids = dict(Group.objects.filter(name__in=missing_names).values_list('name', 'id'))
+    new_names = [name for name in missing_names if name not in found_ids]
+    if new_names:
+        # other logs may be creating some of them at the same time
+        Group.objects.bulk_create([Group(name=name) for name in new_names], ignore_conflicts=True)
+        found_ids.update(Group.objects.filter(name__in=new_names).values_list('name', 'id'))
+    for name in missing_names:
+        if name not in found_ids:
+            # only matched by the database collation (e.g. when differing in case)
+            found_ids[name] = Group.objects.get_or_create(name=name)[0].id
+
+    new_group_ids = {name: found_ids[name] for name in missing_names}
+    group_ids.update(new_group_ids)
+    # groups created within a transaction which gets rolled back mustn't be kept
+    transaction.on_commit(lambda: group_cache.set_many(new_group_ids))
+    return group_ids
+
+
+def build_group_results(job_log, group_results):
+    statuses = []
+    for line in group_results:
+        group_path = line["group"]
+
+        # Log to New Relic if it's not in a form we like.  We can enter
+        # Bugs to upstream to remedy them.
+        if "\\" in group_path or ":" in group_path or len(group_path) > 255:
+            newrelic.agent.record_custom_event(
+                "malformed_test_group",
+                {
+                    "message": "Group paths must be relative, with no backslashes and <255 chars",
+                    "group": line["group"],
+                    "group_path": group_path,
+                    "length": len(group_path),
+                    "repository": job_log.job.repository,
+                    "job_guid": job_log.job.guid,
+                },
+            )
+        else:
+            statuses.append((group_path[:255], GroupStatus.get_status(line['status'])))
+
+    group_ids = get_group_ids(list(dict.fromkeys(name for (name, _) in statuses)))
+    return [
+        GroupStatus(job_log=job_log, group_id=group_ids[name], status=status)
+        for (name, status) in statuses
+    ]
 
 
 def create(job_log, log_list):
@@ -156,12 +240,12 @@ def create(job_log, log_list):
         else:
             failure_lines.append(line)
 
-    for group in group_results:
-        create_group_result(job_log, group)
+    GroupStatus.objects.bulk_create(build_group_results(job_log, group_results))
 
     failure_line_results = [
-        create_failure_line(job_log, failure_line) for failure_line in failure_lines
+        build_failure_line(job_log, failure_line) for failure_line in failure_lines
     ]
+    FailureLine.objects.bulk_create(failure_line_results)
     job_log.update_status(JobLog.PARSED)
     return failure_line_results
 
@@ -34,6 +34,21 @@ class ParserBase:
         """Clean-up/summary tasks run at the end of parsing."""
         pass
 
+    def skim(self, chunk):
+        """
+        Inspect a raw chunk of log before it's handed to a copy of this parser.
+
+        When a log is parsed in chunks, each chunk is parsed by a copy of the
+        parser taken right before the chunk is skimmed, so this is where state
+        carried over from previous lines has to be set.
+        """
+        pass
+
+    def merge(self, other, lineno_offset):
+        """Add the results of `other`, which parsed the lines following the ones seen here."""
+        self.artifact.extend(other.artifact)
+        self.complete = other.complete
+
     def get_artifact(self):
         """By default, just return the artifact as-is."""
         return self.artifact
@@ -111,6 +126,39 @@ class ErrorParser(ParserBase):
 
     RE_MOZHARNESS_PREFIX = re.compile(r"^\d+:\d+:\d+ +(?:DEBUG|INFO|WARNING) - +")
 
+    # Every error line contains at least one of these, be it one of the
+    # IN_SEARCH_TERMS or a line matched by the RE_ERR_* expressions above.
+    # The vast majority of log lines contain none of them, which plain
+    # substring searches tell much faster than running all the checks of
+    # `is_error_line`, so the latter only runs for candidate lines.
+    # Keep in sync with the terms & expressions above!
+    ERROR_LINE_MARKERS = (
+        # "error" and "Error" in IN_SEARCH_TERMS, RE_ERR_MATCH & RE_ERR_SEARCH
+        "rror",
+        # "ERROR" in IN_SEARCH_TERMS, RE_ERR_1_MATCH & RE_ERR_SEARCH
+        "RROR",
+        "TEST-UNEXPECTED-",
+        "PROCESS-CRASH",
+        "Assertion fail",
+        "ABORT:",
+        "Sanitizer",
+        "command timed out:",
+        "wget: unable ",
+        # "bash.exe: *** " in IN_SEARCH_TERMS, "make: ***" in RE_ERR_MATCH &
+        # RE_ERR_SEARCH
+        ": ***",
+        "exit code: 137",
+        "LEAKING THE WORLD",
+        "CRITICAL - ",
+        "FATAL - ",
+        "Exception: ",
+        "exception]",
+        "[  FAILED  ] ",
+        "remoteFailed:",
+        "rm: cannot ",
+        "abort:",
+    )
+
     def __init__(self):
         """A simple error detection sub-parser"""
         super().__init__("errors")
@@ -118,11 +166,19 @@ class ErrorParser(ParserBase):
 
     def add(self, line, lineno):
         self.artifact.append({"linenumber": lineno, "line": line.rstrip()})
+        self._check_saturation()
+
+    def _check_saturation(self):
+        # once the artifact is full there's no need to look at further lines
+        if len(self.artifact) > settings.MAX_ERROR_LINES:
+            self.complete = True
 
     def parse_line(self, line, lineno):
         """Check a single line for an error.  Keeps track of the linenumber"""
 
-        if len(self.artifact) >= settings.MAX_ERROR_LINES:
+        # keep one more line than reported, in case merging the next chunk
+        # of the log drops the first line of its artifact as a duplicate
+        if len(self.artifact) > settings.MAX_ERROR_LINES:
             return
         # TaskCluster logs are a bit wonky.
         #
@@ -152,17 +208,55 @@ class ErrorParser(ParserBase):
         if line.startswith('[taskcluster '):
             self.is_taskcluster = True
 
+        # Stripping a prefix can't make a line an error candidate, so
+        # leave alone the lines which can't be errors anyway.
+        if not self.is_error_candidate(line):
+            return
+
         # For performance reasons, only do this if we have identified as
         # a TC task.
         if self.is_taskcluster:
             line = re.sub(self.RE_TASKCLUSTER_NORMAL_PREFIX, "", line)
 
-        if self.is_error_line(line) and (
+        if self._is_error_line(line) and (
             len(self.artifact) == 0 or self.artifact[-1]["line"] != line.rstrip()
         ):
             self.add(line, lineno)
 
+    def skim(self, chunk):
+        if not self.is_taskcluster:
+            self.is_taskcluster = (
+                chunk.startswith(b'[taskcluster ')
+                or b'\n[taskcluster ' in chunk
+                or b'\r[taskcluster ' in chunk
+            )
+
+    def merge(self, other, lineno_offset):
+        for error in other.artifact:
+            if len(self.artifact) > settings.MAX_ERROR_LINES:
+                break
+            if self.artifact and self.artifact[-1]["line"] == error["line"]:
+                continue
+            self.artifact.append(
+                {"linenumber": error["linenumber"] + lineno_offset, "line": error["line"]}
+            )
+        self.is_taskcluster = self.is_taskcluster or other.is_taskcluster
+        self._check_saturation()
+
+    def get_artifact(self):
+        return self.artifact[: settings.MAX_ERROR_LINES]
+
+    def is_error_candidate(self, line):
+        """Whether the line contains any of the markers found in error lines."""
+        for marker in self.ERROR_LINE_MARKERS:
+            if marker in line:
+                return True
+        return False
+
     def is_error_line(self, line):
+        return self.is_error_candidate(line) and self._is_error_line(line)
+
+    def _is_error_line(self, line):
         if self.RE_EXCLUDE_1_SEARCH.search(line):
             return False
 
@@ -184,19 +278,55 @@ class ErrorParser(ParserBase):
 class PerformanceParser(ParserBase):
     """a sub-parser to find generic performance data"""
 
+    MARKER = 'PERFHERDER_DATA:'
+
+    # What follows the marker in PERFHERDER_DATA lines.
     # Using $ in the regex as an end of line bounds causes the
     # regex to fail on windows logs. This is likely due to the
     # ^M character representation of the windows end of line.
-    RE_PERFORMANCE = re.compile(r'.*?PERFHERDER_DATA:\s+({.*})')
+    RE_PERFORMANCE_DATA = re.compile(r'\s+({.*})')
 
     def __init__(self):
         super().__init__("performance_data")
 
+    @classmethod
+    def find_data(cls, line):
+        """Returns the JSON data of a PERFHERDER_DATA line, None for any other line."""
+        # hardly any line has the marker, which is much cheaper to look for
+        # than to run a regex over every line
+        start = line.find(cls.MARKER)
+        while start != -1:
+            match = cls.RE_PERFORMANCE_DATA.match(line, start + len(cls.MARKER))
+            if match:
+                return match.group(1)
+            start = line.find(cls.MARKER, start + 1)
+        return None
+
+    @classmethod
+    def find_data_lines(cls, chunk):
+        """
+        Returns the (start, end) offsets of the lines of a raw chunk of log
+        (bytes) which contain the marker, without splitting all of it in lines.
+        """
+        marker = cls.MARKER.encode()
+        offsets = []
+        start = chunk.find(marker)
+        while start != -1:
+            # lines are split the same way as `bytes.splitlines()` does
+            line_start = max(chunk.rfind(b'\n', 0, start), chunk.rfind(b'\r', 0, start)) + 1
+            line_end = min(
+                (end for end in (chunk.find(b'\n', start), chunk.find(b'\r', start)) if end != -1),
+                default=len(chunk),
+            )
+            offsets.append((line_start, line_end))
+            start = chunk.find(marker, line_end)
+        return offsets
+
     def parse_line(self, line, lineno):
-        match = self.RE_PERFORMANCE.match(line)
-        if match:
+        perf_data = self.find_data(line)
+        if perf_data is not None:
             try:
-                data = json.loads(match.group(1))
+                data = json.loads(perf_data)
                 if not bool(data):
                     raise EmptyPerformanceData("The perf data is empty.")
                 validate_perf_data(data)
@@ -0,0 +1,106 @@
+"""
+Scheduling of the log parsing tasks.
+
+Logs are parsed in lanes, each lane being a queue with its own workers, so
+that the logs of failed jobs don't wait behind those of successful jobs when
+there is a backlog.  Within a lane, tasks are also given a priority (failures
+first, then sheriffed trees), which RabbitMQ honours when the queues are
+declared with `LOG_PARSER_QUEUE_PRIORITIES` enabled.
+"""
+import time
+from collections import defaultdict
+
+import newrelic.agent
+
+from treeherder.model.models import JobLog
+
+SHERIFFED_REPOSITORIES = {
+    "autoland",
+    "mozilla-central",
+    "mozilla-beta",
+    "mozilla-release",
+    "mozilla-esr78",
+}
+
+# the kinds of logs which get parsed
+PARSED_LOG_NAMES = {"errorsummary_json", "live_backing_log"}
+
+# from the most to the least urgent lane
+LANES = (
+    "log_parser_fail_json_sheriffed",
+    "log_parser_fail_raw_sheriffed",
+    "log_parser_fail_json_unsheriffed",
+    "log_parser_fail_raw_unsheriffed",
+    "log_parser",
+)
+
+
+def get_lane(job_log, result, repository):
+    """Returns the queue the given log of a job of `repository` is parsed from."""
+    if result == 'success':
+        return "log_parser"
+    kind = "json" if job_log.name == "errorsummary_json" else "raw"
+    trees = "sheriffed" if repository.name in SHERIFFED_REPOSITORIES else "unsheriffed"
+    return "log_parser_fail_{}_{}".format(kind, trees)
+
+
+def get_priority(result, repository):
+    """Returns the priority of parsing the logs of a job, from 0 to 3 (the most urgent)."""
+    priority = 0
+    if result != 'success':
+        priority += 2
+    if repository.name in SHERIFFED_REPOSITORIES:
+        priority += 1
+    return priority
+
+
+def schedule_log_parsing(jobs, repository):
+    """
+    Kicks off the parsing of the logs of the given jobs of `repository`,
+    given as (job, job logs, result) triples.
+
+    A log can be submitted already parsed, in which case the submitter is
+    responsible for submitting the text_log_summary artifact, so only
+    ``pending`` logs get parsed.  The logs of a job which go to the same lane
+    are parsed by a single task, and the most urgent tasks are sent first.
+    """
+    # importing here to avoid an import loop
+    from treeherder.log_parser.tasks import parse_logs
+
+    tasks = defaultdict(list)
+    for job, job_logs, result in jobs:
+        for job_log in job_logs:
+            if job_log.status != JobLog.PENDING or job_log.name not in PARSED_LOG_NAMES:
+                continue
+            lane = get_lane(job_log, result, repository)
+            tasks[(lane, get_priority(result, repository), job.id)].append(job_log.id)
+
+    for (lane, priority, job_id), job_log_ids in sorted(
+        tasks.items(), key=lambda task: (LANES.index(task[0][0]), -task[0][1])
+    ):
+        parse_logs.apply_async(
+            queue=lane,
+            priority=priority,
+            args=[job_id, job_log_ids, "normal" if lane == "log_parser" else "failures"],
+            kwargs={"lane": lane, "scheduled_at": time.time()},
+        )
+
+
+def record_lane_wait_time(lane, scheduled_at):
+    """Records how long a parsing task waited in its lane before running."""
+    if lane is None or scheduled_at is None:
+        return
+    wait_time = max(time.time() - scheduled_at, 0)
+    newrelic.agent.add_custom_parameter("lane", lane)
+    newrelic.agent.record_custom_metric("Custom/LogParser/{}/WaitTime".format(lane), wait_time)
+
+
+def get_lane_depths(connection):
+    """Returns the number of tasks waiting in each lane, using the given broker connection."""
+    channel = connection.default_channel
+    depths = {}
+    for lane in LANES:
+        # a passive declaration only reads the state of an existing queue
+        _, message_count, _ = channel.queue_declare(queue=lane, passive=True)
+        depths[lane] = message_count
+    return depths
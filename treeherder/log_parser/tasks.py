@@ -2,6 +2,7 @@ import logging
 
 import newrelic.agent
 import simplejson as json
+from celery import task
 from celery.exceptions import SoftTimeLimitExceeded
 from requests.exceptions import HTTPError
 
@@ -10,6 +11,7 @@ from treeherder.log_parser.artifactbuildercollection import (
     ArtifactBuilderCollection,
     LogSizeException,
 )
+from treeherder.log_parser.scheduler import get_lane_depths, record_lane_wait_time
 from treeherder.model.models import Job, JobLog
 from treeherder.workers.task import retryable_task
 
@@ -19,8 +21,11 @@ logger = logging.getLogger(__name__)
 
 
 @retryable_task(name='log-parser', max_retries=10)
-def parse_logs(job_id, job_log_ids, priority):
+def parse_logs(job_id, job_log_ids, priority, lane=None, scheduled_at=None):
     newrelic.agent.add_custom_parameter("job_id", str(job_id))
+    # retries don't count as waiting in the lane
+    if not parse_logs.request.retries:
+        record_lane_wait_time(lane, scheduled_at)
 
     job = Job.objects.get(id=job_id)
     job_logs = JobLog.objects.filter(id__in=job_log_ids, job=job)
@@ -76,6 +81,15 @@ def parse_logs(job_id, job_log_ids, priority):
         raise first_exception
 
 
+@task(name='report-log-parser-lanes')
+def report_log_parser_lanes():
+    """Records the number of log parsing tasks waiting in each lane."""
+    with report_log_parser_lanes.app.connection_for_read() as connection:
+        depths = get_lane_depths(connection)
+    for lane, depth in depths.items():
+        newrelic.agent.record_custom_metric("Custom/LogParser/{}/Depth".format(lane), depth)
+
+
 def store_failure_lines(job_log):
     """Store the failure lines from a log corresponding to the structured
     errorsummary file."""
@@ -132,6 +146,9 @@ def extract_text_log_artifacts(job_log):
                 "name": name,
                 "type": 'json',
                 "blob": json.dumps(artifact),
+                # the performance parser only keeps data complying with the
+                # Perfherder schema, so there's no need to validate it again
+                "validated": name == 'performance_data',
             }
         )
 
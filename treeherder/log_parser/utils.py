@@ -1,7 +1,9 @@
 import os
 
 import simplejson as json
-from jsonschema import ValidationError, validate
+from jsonschema import ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
 
 
 def _lookup_extra_options_max(schema):
@@ -13,9 +15,17 @@ with open(os.path.join('schemas', 'performance-artifact.json')) as f:
     MAX_LENGTH = _lookup_extra_options_max(PERFHERDER_SCHEMA)
     SECOND_MAX_LENGTH = 45
 
+# Building a validator checks the schema itself, so only do it once per process
+PERFHERDER_VALIDATOR_CLASS = validator_for(PERFHERDER_SCHEMA)
+PERFHERDER_VALIDATOR_CLASS.check_schema(PERFHERDER_SCHEMA)
+PERFHERDER_VALIDATOR = PERFHERDER_VALIDATOR_CLASS(PERFHERDER_SCHEMA)
+
 
 def validate_perf_data(performance_data: dict):
-    validate(performance_data, PERFHERDER_SCHEMA)
+    # same error reporting as `jsonschema.validate()`
+    error = best_match(PERFHERDER_VALIDATOR.iter_errors(performance_data))
+    if error is not None:
+        raise error
 
     expected_range = (SECOND_MAX_LENGTH, MAX_LENGTH)
     for suite in performance_data["suites"]:
@@ -0,0 +1,216 @@
+import datetime
+import logging
+import re
+import uuid
+from collections import defaultdict, namedtuple
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from treeherder.model.models import Bugscache
+from treeherder.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# bumped whenever the bugscache table changes, so every worker knows its index
+# has to be refreshed
+BUGSCACHE_INDEX_VERSION_CACHE_KEY = 'bugscache-index-version'
+
+# the fields returned for each suggested bug, same as `Bugscache.search`
+SUGGESTION_FIELDS = (
+    'id',
+    'status',
+    'resolution',
+    'summary',
+    'crash_signature',
+    'keywords',
+    'os',
+    'whiteboard',
+)
+
+MAX_SUGGESTIONS = 50
+REFRESH_CHUNK_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+IndexedBug = namedtuple('IndexedBug', ['suggestion', 'modified', 'summary', 'words'])
+
+
+def invalidate_bugscache_index():
+    """Makes every worker refresh its index before its next search."""
+    cache.set(BUGSCACHE_INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def get_bugscache_index_version():
+    version = cache.get(BUGSCACHE_INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(BUGSCACHE_INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(BUGSCACHE_INDEX_VERSION_CACHE_KEY)
+    return version
+
+
+def normalize_search_term(search_term):
+    return search_term.lower()
+
+
+class BugscacheIndex:
+    """
+    In-process index of the bugscache table answering bug suggestion searches.
+
+    Like `Bugscache.search`, a bug matches when its summary contains the
+    search term, ignoring case.  Bug summaries are indexed by word: the words
+    of the search term which are delimited on both sides within the term
+    itself have to be words of any matching summary, so the summaries to check
+    are narrowed down to those holding all of them.  Terms without such a word
+    are checked against every summary.
+
+    MySQL's FULLTEXT relevance is approximated by the number of times the term
+    appears in the summary, ties are ordered by bug id.
+
+    The same terms (test paths, crash signatures) come up again and again
+    across the failed jobs of a push, so results are kept around by
+    normalized term until they expire or the index is refreshed.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._bugs = {}
+        self._postings = defaultdict(set)
+        self._lock = Lock()
+        self.results = LRUCache(
+            settings.BUGSCACHE_SEARCH_CACHE_SIZE, timeout=settings.BUGSCACHE_SEARCH_CACHE_TIMEOUT
+        )
+
+    def __len__(self):
+        return len(self._bugs)
+
+    def clear(self):
+        with self._lock:
+            self.version = None
+            self._bugs.clear()
+            self._postings.clear()
+        self.results.clear()
+
+    def add(self, rows):
+        """Indexes (or re-indexes) bugscache rows, given as dicts."""
+        with self._lock:
+            for row in rows:
+                self._remove(row['id'])
+                summary = row['summary'].lower()
+                words = frozenset(WORD_RE.findall(summary))
+                self._bugs[row['id']] = IndexedBug(
+                    suggestion={field: row[field] for field in SUGGESTION_FIELDS},
+                    modified=row['modified'],
+                    summary=summary,
+                    words=words,
+                )
+                for word in words:
+                    self._postings[word].add(row['id'])
+
+    def remove(self, bug_ids):
+        with self._lock:
+            for bug_id in bug_ids:
+                self._remove(bug_id)
+
+    def _remove(self, bug_id):
+        bug = self._bugs.pop(bug_id, None)
+        if bug is None:
+            return
+        for word in bug.words:
+            postings = self._postings[word]
+            postings.discard(bug_id)
+            if not postings:
+                del self._postings[word]
+
+    def sync(self):
+        """Refreshes the index if the bugscache table changed since it was built."""
+        version = get_bugscache_index_version()
+        if version != self.version:
+            self.refresh()
+            self.results.clear()
+            self.version = version
+
+    def refresh(self):
+        """
+        Brings the index up to date with the bugscache table.
+
+        Only the rows added or modified since the last refresh are fetched.
+        """
+        if not self._bugs:
+            self.add(Bugscache.objects.values('modified', *SUGGESTION_FIELDS))
+            logger.debug('Indexed %s bugs', len(self._bugs))
+            return
+
+        stored = dict(Bugscache.objects.values_list('id', 'modified'))
+        with self._lock:
+            removed = [bug_id for bug_id in self._bugs if bug_id not in stored]
+            changed = [
+                bug_id
+                for bug_id, modified in stored.items()
+                if bug_id not in self._bugs or self._bugs[bug_id].modified != modified
+            ]
+
+        self.remove(removed)
+        for i in range(0, len(changed), REFRESH_CHUNK_SIZE):
+            chunk = changed[i : i + REFRESH_CHUNK_SIZE]
+            self.add(Bugscache.objects.filter(id__in=chunk).values('modified', *SUGGESTION_FIELDS))
+        logger.debug('Re-indexed %s bugs, removed %s', len(changed), len(removed))
+
+    def search_many(self, search_terms):
+        """Returns a dict with the search results of each of `search_terms`."""
+        # matching ignores case, so do cached results
+        terms = {search_term: normalize_search_term(search_term) for search_term in search_terms}
+        found = self.results.get_many(set(terms.values()))
+
+        missing = set(terms.values()).difference(found)
+        if missing:
+            searched = {term: self.search(term) for term in missing}
+            self.results.set_many(searched)
+            found.update(searched)
+
+        return {search_term: found[term] for search_term, term in terms.items()}
+
+    def search(self, search_term, max_size=MAX_SUGGESTIONS):
+        """Same as `Bugscache.search`, without querying the database."""
+        # bugs modified since then get suggested by default if they are
+        # not resolved, see `Bugscache.search`
+        time_limit = datetime.datetime.now() - datetime.timedelta(days=365)
+        term = normalize_search_term(search_term)
+
+        with self._lock:
+            matches = []
+            for bug_id in self._candidates(term):
+                bug = self._bugs[bug_id]
+                relevance = bug.summary.count(term)
+                if relevance:
+                    matches.append((-relevance, bug_id, bug))
+
+            matches.sort(key=lambda match: match[:2])
+
+            open_recent = []
+            all_others = []
+            for _, _, bug in matches:
+                if bug.suggestion['resolution'] == '' and bug.modified >= time_limit:
+                    bugs = open_recent
+                else:
+                    bugs = all_others
+                if len(bugs) < max_size:
+                    bugs.append(dict(bug.suggestion))
+
+        return {"open_recent": open_recent, "all_others": all_others}
+
+    def _candidates(self, term):
+        words = [
+            match.group()
+            for match in WORD_RE.finditer(term)
+            if match.start() > 0 and match.end() < len(term)
+        ]
+        if not words:
+            return self._bugs.keys()
+
+        postings = sorted((self._postings.get(word, set()) for word in words), key=len)
+        return set.intersection(*postings)
+
+
+bugscache_index = BugscacheIndex()
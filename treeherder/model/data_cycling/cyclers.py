@@ -10,6 +10,7 @@ from django.db.models import Count
 from treeherder.config import settings
 from treeherder.model.data_cycling.removal_strategies import RemovalStrategy
 from treeherder.model.models import Job, JobType, JobGroup, Machine
+from treeherder.model.reference_data import invalidate_reference_data
 from treeherder.perf.exceptions import NoDataCyclingAtAll, MaxRuntimeExceeded
 from treeherder.perf.models import PerformanceSignature, PerformanceAlertSummary
 from treeherder.services.taskcluster import TaskclusterModel, DEFAULT_ROOT_URL as root_url
@@ -81,6 +82,8 @@ class TreeherderCycler(DataCycler):
         prune('job_type_id', JobType)
         prune('job_group_id', JobGroup)
         prune('machine_id', Machine)
+        # ingestion processes may have cached the ids of the removed rows
+        invalidate_reference_data()
 
 
 class PerfherderCycler(DataCycler):
@@ -1,17 +1,18 @@
+import datetime
 import logging
 import re
-import newrelic.agent
 
-from django.core.cache import cache
-
-from treeherder.model.models import Bugscache, TextLogError
+from treeherder.model.bugscache_index import normalize_search_term
+from treeherder.model.models import Bugscache, ErrorSummary, Job, TextLogError
+from treeherder.utils.queryset import chunked_qs
 
 logger = logging.getLogger(__name__)
 
 
-# the amount of time we cache bug suggestion lookups (to speed up loading the
-# bug suggestions panel for recently finished jobs)
-BUG_SUGGESTION_CACHE_TIMEOUT = 86400
+# stored bug suggestions are refreshed when the bugscache changes for the jobs
+# of that period, older ones are rarely looked at
+ERROR_SUMMARY_REFRESH_WINDOW = datetime.timedelta(days=7)
+ERROR_SUMMARY_REFRESH_CHUNK_SIZE = 1000
 
 LEAK_RE = re.compile(r'\d+ bytes leaked \((.+)\)$|leak at (.+)$')
 CRASH_RE = re.compile(r'.+ application crashed \[@ (.+)\]$')
@@ -20,37 +21,81 @@ PROCESS_ID_RE = re.compile(r"(?:PID \d+|GECKO\(\d+\)) \| +")
 REFTEST_RE = re.compile(r'\s+[=!]=\s+.*')
 
 
-def get_error_summary(job):
+def get_error_summary(job, refresh=False):
     """
     Create a list of bug suggestions for a job.
 
-    Caches the results if there are any.
+    The suggestions are stored once computed, and read back by later calls
+    unless `refresh` is set.
     """
-    cache_key = 'error-summary-{}'.format(job.id)
-    cached_error_summary = cache.get(cache_key)
-    if cached_error_summary is not None:
-        return cached_error_summary
+    if not refresh:
+        try:
+            return ErrorSummary.objects.only('summary').get(job=job).bug_suggestions
+        except ErrorSummary.DoesNotExist:
+            pass
 
-    # don't cache or do anything if we have no text log errors to get
+    # don't store or do anything if we have no text log errors to get
     # results for
     errors = TextLogError.objects.filter(job=job)
     if not errors:
         return []
 
-    # cache terms generated from error line to save excessive querying
-    term_cache = {}
+    # search all the terms generated from the error lines at once
+    clean_lines = [get_cleaned_line(err.line) for err in errors]
+    search_terms = {get_error_search_term(line) for line in clean_lines}
+    search_terms.update(get_crash_signature(line) for line in clean_lines)
+    search_terms.discard(None)
+    term_cache = Bugscache.search_many(search_terms)
 
     error_summary = [bug_suggestions_line(err, term_cache) for err in errors]
 
-    try:
-        cache.set(cache_key, error_summary, BUG_SUGGESTION_CACHE_TIMEOUT)
-    except Exception as e:
-        newrelic.agent.record_custom_event('error caching error_summary for job', job.id)
-        logger.error('error caching error_summary for job %s: %s', job.id, e, exc_info=True)
+    ErrorSummary.objects.update_or_create(
+        job=job, defaults={'summary': ErrorSummary.compress(error_summary)}
+    )
 
     return error_summary
 
 
+def refresh_error_summaries(bug_summaries):
+    """
+    Recompute the stored bug suggestions affected by changes to bugs with the
+    given summaries, i.e. those of recent jobs having a search term matching
+    one of them.  Returns the number of jobs refreshed.
+    """
+    bug_summaries = [normalize_search_term(summary) for summary in bug_summaries]
+    if not bug_summaries:
+        return 0
+
+    # the same terms come up in many jobs
+    term_matches = {}
+
+    def is_affected(error_summary):
+        for line in error_summary.bug_suggestions:
+            for term in line['search_terms']:
+                if term not in term_matches:
+                    normalized = normalize_search_term(term)
+                    term_matches[term] = any(normalized in summary for summary in bug_summaries)
+                if term_matches[term]:
+                    return True
+        return False
+
+    since = datetime.datetime.now() - ERROR_SUMMARY_REFRESH_WINDOW
+    error_summaries = ErrorSummary.objects.filter(created__gte=since)
+    refreshed = 0
+    for chunk in chunked_qs(
+        error_summaries,
+        chunk_size=ERROR_SUMMARY_REFRESH_CHUNK_SIZE,
+        fields=['id', 'job', 'summary'],
+    ):
+        job_ids = [error_summary.job_id for error_summary in chunk if is_affected(error_summary)]
+        for job in Job.objects.filter(id__in=job_ids):
+            get_error_summary(job, refresh=True)
+        refreshed += len(job_ids)
+
+    logger.info('Refreshed the bug suggestions of %s jobs', refreshed)
+    return refreshed
+
+
 def bug_suggestions_line(err, term_cache=None):
     """
     Get Bug suggestions for a given TextLogError (err).
@@ -75,7 +120,7 @@ def bug_suggestions_line(err, term_cache=None):
     if search_term:
         search_terms.append(search_term)
         if search_term not in term_cache:
-            term_cache[search_term] = Bugscache.search(search_term)
+            term_cache.update(Bugscache.search_many([search_term]))
         bugs = term_cache[search_term]
 
     if not bugs or not (bugs['open_recent'] or bugs['all_others']):
@@ -85,7 +130,7 @@ def bug_suggestions_line(err, term_cache=None):
         if crash_signature:
             search_terms.append(crash_signature)
             if crash_signature not in term_cache:
-                term_cache[crash_signature] = Bugscache.search(crash_signature)
+                term_cache.update(Bugscache.search_many([crash_signature]))
             bugs = term_cache[crash_signature]
 
     # TODO: Rename 'search' to 'error_text' or similar, since that's
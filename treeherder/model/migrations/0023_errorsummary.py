@@ -0,0 +1,34 @@
+# Generated by Django 3.1.1 on 2020-10-06 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0022_support_group_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErrorSummary',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('summary', models.BinaryField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('last_modified', models.DateTimeField(auto_now=True)),
+                (
+                    'job',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='error_summary',
+                        to='model.Job',
+                    ),
+                ),
+            ],
+            options={
+                'db_table': 'error_summary',
+            },
+        ),
+    ]
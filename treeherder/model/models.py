@@ -1,8 +1,10 @@
 import datetime
 import itertools
+import json
 import logging
 import re
 import time
+import zlib
 from hashlib import sha1
 
 import newrelic.agent
@@ -292,6 +294,20 @@ class Bugscache(models.Model):
 
         return {"open_recent": open_recent, "all_others": all_others}
 
+    @classmethod
+    def search_many(cls, search_terms):
+        """
+        Search for several terms at once, returns a dict of the results of
+        each term in the same format as `search`.
+
+        Searches are answered by the in-memory bugscache index, which caches
+        results across jobs.
+        """
+        from treeherder.model.bugscache_index import bugscache_index
+
+        bugscache_index.sync()
+        return bugscache_index.search_many(search_terms)
+
 
 class Machine(NamedModel):
     class Meta:
@@ -1274,6 +1290,36 @@ class TextLogError(models.Model):
             return None
 
 
+class ErrorSummary(models.Model):
+    """
+    The bug suggestions for the error lines of a job
+
+    Computed when the job's errors are stored, and again when changes to the
+    bugscache affect them (see `treeherder.model.error_summary`).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='error_summary')
+    # zlib compressed JSON, see `bug_suggestions`
+    summary = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "error_summary"
+
+    def __str__(self):
+        return "{0} {1}".format(self.id, self.job_id)
+
+    @staticmethod
+    def compress(bug_suggestions):
+        return zlib.compress(json.dumps(bug_suggestions, separators=(',', ':')).encode('utf-8'))
+
+    @property
+    def bug_suggestions(self):
+        return json.loads(zlib.decompress(self.summary).decode('utf-8'))
+
+
 class TextLogErrorMetadata(models.Model):
     """
     Link matching TextLogError and FailureLine instances.
@@ -0,0 +1,140 @@
+import logging
+import uuid
+from hashlib import sha1
+
+from django.core.cache import cache
+
+from treeherder.model.models import (
+    BuildPlatform,
+    FailureClassification,
+    JobGroup,
+    JobType,
+    MachinePlatform,
+    Option,
+    OptionCollection,
+    Product,
+)
+from treeherder.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# bumped when reference data rows are removed, so ids cached before are dropped
+REFERENCE_DATA_VERSION_CACHE_KEY = 'reference-data-version'
+REFERENCE_DATA_CACHE_KEY = 'reference-data-{}-{}-{}'
+REFERENCE_DATA_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_DATA_CACHE_SIZE = 50000
+
+# tiny tables loaded whole when a worker starts, machines and signatures are
+# only cached once seen
+PRELOADED_MODELS = {
+    BuildPlatform: ('os_name', 'platform', 'architecture'),
+    MachinePlatform: ('os_name', 'platform', 'architecture'),
+    JobGroup: ('name', 'symbol'),
+    JobType: ('name', 'symbol'),
+    Product: ('name',),
+    FailureClassification: ('name',),
+}
+
+
+def invalidate_reference_data():
+    """Makes every process forget the reference data ids it cached."""
+    cache.set(REFERENCE_DATA_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def get_reference_data_version():
+    version = cache.get(REFERENCE_DATA_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(REFERENCE_DATA_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(REFERENCE_DATA_VERSION_CACHE_KEY)
+    return version
+
+
+class ReferenceDataResolver:
+    """
+    Resolves reference data rows (platforms, job types, machines...) from the
+    values identifying them, creating the missing ones.
+
+    Rows are looked up in an in-process map first, then in the cache shared
+    by all processes, and only then in the database, where missing rows are
+    inserted with `get_or_create` (safe against concurrent inserts thanks to
+    the unique constraints of these tables).  Lookups return unsaved model
+    instances holding the id and the identifying fields of the row, enough
+    to be used as foreign keys.
+    """
+
+    def __init__(self, max_size=REFERENCE_DATA_CACHE_SIZE):
+        self.version = None
+        self.rows = LRUCache(max_size)
+
+    def clear(self):
+        self.version = None
+        self.rows.clear()
+
+    def sync(self):
+        """Drops the rows cached in this process if reference data was removed since."""
+        version = get_reference_data_version()
+        if version != self.version:
+            self.rows.clear()
+            self.version = version
+
+    def preload(self):
+        self.sync()
+        for model, fields in PRELOADED_MODELS.items():
+            for row in model.objects.values('id', *fields):
+                key = self._key(model, {field: row[field] for field in fields})
+                self.rows.set(key, row)
+        for option_collection_hash in OptionCollection.objects.values_list(
+            'option_collection_hash', flat=True
+        ).distinct():
+            self.rows.set((OptionCollection._meta.db_table, option_collection_hash), True)
+        logger.debug('Preloaded %s reference data rows', len(self.rows))
+
+    def get(self, model, defaults=None, create=True, **lookup):
+        """
+        Returns the `model` row matching `lookup`, created with `defaults`
+        if missing (unless `create` is False, then `DoesNotExist` is raised).
+        """
+        key = self._key(model, lookup)
+        row = self.rows.get(key)
+        if row is None:
+            shared_key = self._shared_key(key)
+            row = cache.get(shared_key)
+            if row is None:
+                if create:
+                    instance, _ = model.objects.get_or_create(defaults=defaults, **lookup)
+                else:
+                    instance = model.objects.get(**lookup)
+                # keep the values as stored, which can differ from the lookup
+                # ones in case or trailing spaces
+                row = {field: getattr(instance, field) for field in ('id', *lookup)}
+                cache.set(shared_key, row, REFERENCE_DATA_CACHE_TIMEOUT)
+            self.rows.set(key, row)
+        return model(**row)
+
+    def get_option_collection_hash(self, option_names):
+        """Returns the hash of the given options, creating their collection if missing."""
+        option_collection_hash = OptionCollection.calculate_hash(option_names)
+        key = (OptionCollection._meta.db_table, option_collection_hash)
+        if self.rows.get(key) is None:
+            shared_key = self._shared_key(key)
+            if cache.get(shared_key) is None:
+                # in the unlikely event that we haven't seen this set of options
+                # before, add the appropriate database rows
+                for option_name in option_names:
+                    option, _ = Option.objects.get_or_create(name=option_name)
+                    OptionCollection.objects.get_or_create(
+                        option_collection_hash=option_collection_hash, option=option
+                    )
+                cache.set(shared_key, True, REFERENCE_DATA_CACHE_TIMEOUT)
+            self.rows.set(key, True)
+        return option_collection_hash
+
+    def _key(self, model, lookup):
+        return (model._meta.db_table, tuple(sorted(lookup.items())))
+
+    def _shared_key(self, key):
+        digest = sha1(repr(key[1]).encode('utf-8')).hexdigest()
+        return REFERENCE_DATA_CACHE_KEY.format(self.version, key[0], digest)
+
+
+reference_data = ReferenceDataResolver()
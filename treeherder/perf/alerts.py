@@ -7,6 +7,7 @@ from typing import List, Tuple
 
 import simplejson as json
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import F, Q
 from django.db.models.query import QuerySet
@@ -20,9 +21,14 @@ from treeherder.perf.models import (
     PerformanceDatum,
     PerformanceSignature,
 )
-from treeherder.perfalert.perfalert import RevisionDatum, detect_changes
+from treeherder.perfalert.perfalert import ChangeDetector, RevisionDatum, detect_changes
 from treeherder.utils import default_serializer
 
+CHANGE_DETECTOR_CACHE_KEY = 'perf-change-detector-{}'
+# the cached change detection state is rebuilt from the whole series at least
+# this often, to pick up data that was deleted or changed in place
+CHANGE_DETECTOR_CACHE_TIMEOUT = 86400
+
 
 def get_alert_properties(prev_value, new_value, lower_is_better):
     AlertProperties = namedtuple(
@@ -40,6 +46,85 @@ def get_alert_properties(prev_value, new_value, lower_is_better):
     return AlertProperties(pct_change, delta, is_regression, prev_value, new_value)
 
 
+def get_change_detector():
+    """Returns the `detect_changes` implementation selected in the settings."""
+    if settings.PERFHERDER_ALERTS_VECTORIZED:
+        from treeherder.perfalert.perfalert.vectorized import detect_changes_vectorized
+
+        return detect_changes_vectorized
+    return detect_changes
+
+
+def _revision_data(rows):
+    revision_data = {}
+    for (push_id, push_timestamp, value) in rows:
+        if not revision_data.get(push_id):
+            revision_data[push_id] = RevisionDatum(
+                int(time.mktime(push_timestamp.timetuple())), push_id, []
+            )
+        revision_data[push_id].values.append(value)
+    return list(revision_data.values())
+
+
+def _analyze_series_incrementally(signature, series, parameters, max_alert_age, latest_alert):
+    """
+    Analyzes only the data added to the series since the last analysis.
+
+    Uses the `ChangeDetector` state cached for the signature.  Returns None if
+    there's no usable state, in which case the series must be analyzed from
+    scratch.
+    """
+    state = cache.get(CHANGE_DETECTOR_CACHE_KEY.format(signature.id))
+    if state is None or state['parameters'] != parameters or state['latest_alert'] != latest_alert:
+        return None
+
+    detector = state['detector']
+    if detector.data:
+        kept_since = datetime.fromtimestamp(detector.data[0].push_timestamp)
+        if kept_since < max_alert_age:
+            # old data is leaving the series, which affects its start
+            return None
+        # re-read the kept revisions, to catch data committed out of order
+        series = series.filter(Q(id__gt=state['last_datum_id']) | Q(push_timestamp__gte=kept_since))
+    else:
+        series = series.filter(id__gt=state['last_datum_id'])
+
+    datum_ids = state['datum_ids']
+    new_rows = [
+        row
+        for row in series.values_list('id', 'push_id', 'push_timestamp', 'value')
+        if row[0] not in datum_ids
+    ]
+    analyzed_series = detector.update(_revision_data(row[1:] for row in new_rows))
+    if analyzed_series is None:
+        return None
+
+    datum_ids.update((datum_id, push_id) for (datum_id, push_id, _, _) in new_rows)
+    last_datum_id = max([state['last_datum_id']] + [row[0] for row in new_rows])
+    _store_change_detector(signature, detector, latest_alert, last_datum_id, datum_ids)
+    return analyzed_series
+
+
+def _store_change_detector(signature, detector, latest_alert, last_datum_id, datum_ids):
+    kept_pushes = {revision.push_id for revision in detector.data}
+    cache.set(
+        CHANGE_DETECTOR_CACHE_KEY.format(signature.id),
+        {
+            'parameters': detector.parameters,
+            'latest_alert': latest_alert,
+            'detector': detector,
+            'last_datum_id': last_datum_id,
+            # only the data of the kept revisions needs deduplicating
+            'datum_ids': {
+                datum_id: push_id
+                for (datum_id, push_id) in datum_ids.items()
+                if push_id in kept_pushes
+            },
+        },
+        CHANGE_DETECTOR_CACHE_TIMEOUT,
+    )
+
+
 def generate_new_alerts_in_series(signature):
     # get series data starting from either:
     # (1) the last alert, if there is one
@@ -53,16 +138,9 @@ def generate_new_alerts_in_series(signature):
         .order_by('-summary__push__time')
         .values_list('summary__push__time', flat=True)[:1]
     )
-    if latest_alert_timestamp:
-        series = series.filter(push_timestamp__gt=latest_alert_timestamp[0])
-
-    revision_data = {}
-    for d in series:
-        if not revision_data.get(d.push_id):
-            revision_data[d.push_id] = RevisionDatum(
-                int(time.mktime(d.push_timestamp.timetuple())), d.push_id, []
-            )
-        revision_data[d.push_id].values.append(d.value)
+    latest_alert = latest_alert_timestamp[0] if latest_alert_timestamp else None
+    if latest_alert:
+        series = series.filter(push_timestamp__gt=latest_alert)
 
     min_back_window = signature.min_back_window
     if min_back_window is None:
@@ -77,12 +155,30 @@ def generate_new_alerts_in_series(signature):
     if alert_threshold is None:
         alert_threshold = settings.PERFHERDER_REGRESSION_THRESHOLD
 
-    analyzed_series = detect_changes(
-        revision_data.values(),
+    detector = ChangeDetector(
         min_back_window=min_back_window,
         max_back_window=max_back_window,
         fore_window=fore_window,
     )
+    analyzed_series = _analyze_series_incrementally(
+        signature, series, detector.parameters, max_alert_age, latest_alert
+    )
+    if analyzed_series is None:
+        rows = list(series.values_list('id', 'push_id', 'push_timestamp', 'value'))
+        analyzed_series = get_change_detector()(
+            _revision_data(row[1:] for row in rows),
+            min_back_window=min_back_window,
+            max_back_window=max_back_window,
+            fore_window=fore_window,
+        )
+        detector.load(analyzed_series)
+        _store_change_detector(
+            signature,
+            detector,
+            latest_alert,
+            max((row[0] for row in rows), default=0),
+            {row[0]: row[1] for row in rows},
+        )
 
     with transaction.atomic():
         for (prev, cur) in zip(analyzed_series, analyzed_series[1:]):
@@ -1,12 +1,62 @@
 import newrelic.agent
+from django.conf import settings
+from django.core.cache import cache
 
 from treeherder.perf.alerts import generate_new_alerts_in_series
 from treeherder.perf.models import PerformanceSignature
 from treeherder.workers.task import retryable_task
 
+ALERTS_PENDING_CACHE_KEY = 'generate-alerts-pending-{}'
+ALERTS_REQUESTS_RECEIVED_CACHE_KEY = 'generate-alerts-requests-received'
+ALERTS_REQUESTS_COALESCED_CACHE_KEY = 'generate-alerts-requests-coalesced'
+
 
 @retryable_task(name='generate-alerts', max_retries=10)
 def generate_alerts(signature_id):
     newrelic.agent.add_custom_parameter("signature_id", str(signature_id))
+    # data arriving from now on may not be seen by this analysis,
+    # so it has to schedule another one
+    cache.delete(ALERTS_PENDING_CACHE_KEY.format(signature_id))
     signature = PerformanceSignature.objects.get(id=signature_id)
     generate_new_alerts_in_series(signature)
+
+
+def schedule_alerts(signature_id):
+    """
+    Schedules an alerts analysis for a signature which received new data.
+
+    Requests for a signature which already has an analysis scheduled within
+    the last `PERFHERDER_ALERTS_COALESCING_WINDOW` seconds are merged into it,
+    as that analysis will see their data too.  Returns whether a new analysis
+    was scheduled.
+    """
+    _increment_counter(ALERTS_REQUESTS_RECEIVED_CACHE_KEY)
+
+    window = settings.PERFHERDER_ALERTS_COALESCING_WINDOW
+    if window <= 0:
+        generate_alerts.apply_async(args=[signature_id], queue='generate_perf_alerts')
+        return True
+
+    # the pending flag is cleared when the analysis starts, and expires on
+    # its own in case the analysis never runs
+    pending_timeout = window + settings.CELERY_TASK_SOFT_TIME_LIMIT
+    if not cache.add(ALERTS_PENDING_CACHE_KEY.format(signature_id), True, pending_timeout):
+        _increment_counter(ALERTS_REQUESTS_COALESCED_CACHE_KEY)
+        return False
+
+    # give the rest of the push's data the time to arrive
+    generate_alerts.apply_async(args=[signature_id], queue='generate_perf_alerts', countdown=window)
+    return True
+
+
+def get_alerts_scheduling_counters():
+    return {
+        'received': cache.get(ALERTS_REQUESTS_RECEIVED_CACHE_KEY, 0),
+        'coalesced': cache.get(ALERTS_REQUESTS_COALESCED_CACHE_KEY, 0),
+    }
+
+
+def _increment_counter(cache_key):
+    # counters are kept until reset by hand
+    if not cache.add(cache_key, 1, None):
+        cache.incr(cache_key)
@@ -1,3 +1,4 @@
+import bisect
 import copy
 import functools
 
@@ -117,6 +118,72 @@ class RevisionDatum:
         )
 
 
+def _analyze_point(
+    data, i, last_seen_regression, min_back_window, max_back_window, fore_window, t_threshold
+):
+    """Computes the t-test score of data[i], returns the new `last_seen_regression`."""
+    di = data[i]
+
+    # keep on getting previous data until we've either got at least 12
+    # data points *or* we've hit the maximum back window
+    jw = []
+    di.amount_prev_data = 0
+    prev_indice = i - 1
+    while (
+        di.amount_prev_data < max_back_window
+        and prev_indice >= 0
+        and ((i - prev_indice) <= min(max(last_seen_regression, min_back_window), max_back_window))
+    ):
+        jw.append(data[prev_indice])
+        di.amount_prev_data += len(jw[-1].values)
+        prev_indice -= 1
+
+    # accumulate present + future data until we've got at least 12 values
+    kw = []
+    di.amount_next_data = 0
+    next_indice = i
+    while di.amount_next_data < fore_window and next_indice < len(data):
+        kw.append(data[next_indice])
+        di.amount_next_data += len(kw[-1].values)
+        next_indice += 1
+
+    di.historical_stats = analyze(jw)
+    di.forward_stats = analyze(kw)
+
+    di.t = abs(calc_t(jw, kw, linear_weights))
+    # add additional historical data points next time if we
+    # haven't detected a likely regression
+    if di.t > t_threshold:
+        return 0
+    return last_seen_regression + 1
+
+
+def _is_change_point(data, i, min_back_window, fore_window, t_threshold):
+    di = data[i]
+
+    # if we don't have enough data yet, skip for now (until more comes
+    # in)
+    if di.amount_prev_data < min_back_window or di.amount_next_data < fore_window:
+        return False
+
+    if di.t <= t_threshold:
+        return False
+
+    # Check the adjacent points
+    prev = data[i - 1]
+    if prev.t > di.t:
+        return False
+    # next may or may not exist if it's the last in the series
+    if (i + 1) < len(data):
+        next = data[i + 1]
+        if next.t > di.t:
+            return False
+
+    # This datapoint has a t value higher than the threshold and higher
+    # than either neighbor.  Mark it as the cause of a regression.
+    return True
+
+
 def detect_changes(data, min_back_window=12, max_back_window=24, fore_window=12, t_threshold=7):
     # Use T-Tests
     # Analyze test data using T-Tests, comparing data[i-j:i] to data[i:i+k]
@@ -124,70 +191,148 @@ def detect_changes(data, min_back_window=12, max_back_window=24, fore_window=12,
 
     last_seen_regression = 0
     for i in range(1, len(data)):
-        di = data[i]
-
-        # keep on getting previous data until we've either got at least 12
-        # data points *or* we've hit the maximum back window
-        jw = []
-        di.amount_prev_data = 0
-        prev_indice = i - 1
-        while (
-            di.amount_prev_data < max_back_window
-            and prev_indice >= 0
-            and (
-                (i - prev_indice)
-                <= min(max(last_seen_regression, min_back_window), max_back_window)
-            )
-        ):
-            jw.append(data[prev_indice])
-            di.amount_prev_data += len(jw[-1].values)
-            prev_indice -= 1
-
-        # accumulate present + future data until we've got at least 12 values
-        kw = []
-        di.amount_next_data = 0
-        next_indice = i
-        while di.amount_next_data < fore_window and next_indice < len(data):
-            kw.append(data[next_indice])
-            di.amount_next_data += len(kw[-1].values)
-            next_indice += 1
-
-        di.historical_stats = analyze(jw)
-        di.forward_stats = analyze(kw)
-
-        di.t = abs(calc_t(jw, kw, linear_weights))
-        # add additional historical data points next time if we
-        # haven't detected a likely regression
-        if di.t > t_threshold:
-            last_seen_regression = 0
-        else:
-            last_seen_regression += 1
+        last_seen_regression = _analyze_point(
+            data,
+            i,
+            last_seen_regression,
+            min_back_window,
+            max_back_window,
+            fore_window,
+            t_threshold,
+        )
 
     # Now that the t-test scores are calculated, go back through the data to
     # find where changes most likely happened.
     for i in range(1, len(data)):
-        di = data[i]
-
-        # if we don't have enough data yet, skip for now (until more comes
-        # in)
-        if di.amount_prev_data < min_back_window or di.amount_next_data < fore_window:
-            continue
-
-        if di.t <= t_threshold:
-            continue
-
-        # Check the adjacent points
-        prev = data[i - 1]
-        if prev.t > di.t:
-            continue
-        # next may or may not exist if it's the last in the series
-        if (i + 1) < len(data):
-            next = data[i + 1]
-            if next.t > di.t:
-                continue
-
-        # This datapoint has a t value higher than the threshold and higher
-        # than either neighbor.  Mark it as the cause of a regression.
-        di.change_detected = True
+        if _is_change_point(data, i, min_back_window, fore_window, t_threshold):
+            data[i].change_detected = True
 
     return data
+
+
+class ChangeDetector:
+    """
+    Incremental version of `detect_changes`.
+
+    Keeps the trailing revisions of an analyzed series, so that new values
+    only require recomputing the t-test scores their arrival can change
+    instead of re-analyzing the whole series.
+    """
+
+    def __init__(
+        self,
+        min_back_window=12,
+        max_back_window=24,
+        fore_window=12,
+        t_threshold=7,
+        max_revisions=None,
+    ):
+        self.min_back_window = min_back_window
+        self.max_back_window = max_back_window
+        self.fore_window = fore_window
+        self.t_threshold = t_threshold
+        # enough trailing revisions to rebuild the back and fore windows of
+        # the most recent points, with some slack for late retriggers
+        self.max_revisions = max_revisions or 2 * (max_back_window + fore_window)
+
+        self.data = []
+        # whether `data` starts at the beginning of the series
+        self.complete = True
+        # `last_seen_regression` after analyzing data[0], if it was analyzed
+        self.start_regression_count = 0
+
+    @property
+    def parameters(self):
+        return (self.min_back_window, self.max_back_window, self.fore_window, self.t_threshold)
+
+    def load(self, data):
+        """Adopts a complete series already analyzed by `detect_changes`."""
+        self.data = list(data)
+        self.complete = True
+        self.start_regression_count = 0
+        self._trim()
+
+    def update(self, revision_data):
+        """
+        Adds the values of `revision_data` (a list of `RevisionDatum`) to the series.
+
+        Values for a push already in the series are appended to its values.
+        Returns the part of the series which was re-analyzed, preceded by one
+        untouched revision, or None if the values reach further back than the
+        kept revisions, in which case the series has to be re-analyzed
+        from scratch.
+        """
+        if not revision_data:
+            return []
+
+        changed_index = None
+        for revision in sorted(revision_data):
+            index = self._merge(revision)
+            if index is None:
+                return None
+            # revisions are merged in order, so later ones can't shift it
+            if changed_index is None or index < changed_index:
+                changed_index = index
+
+        return self._reanalyze(changed_index)
+
+    def _merge(self, revision):
+        for index, datum in enumerate(self.data):
+            if datum.push_id == revision.push_id:
+                datum.values.extend(revision.values)
+                return index
+
+        if self.data and revision < self.data[0] and not self.complete:
+            return None
+
+        index = bisect.bisect_right(self.data, revision)
+        self.data.insert(index, revision)
+        return index
+
+    def _reanalyze(self, changed_index):
+        # a point's fore window spans at most `fore_window` revisions, so
+        # earlier points can't see the change, while its back window spans
+        # at most `max_back_window` revisions
+        start = changed_index - max(self.fore_window, 1) + 1
+        if start - self.max_back_window < 0 and not self.complete:
+            return None
+        start = max(1, start)
+
+        last_seen_regression = self._last_seen_regression_before(start)
+        for i in range(start, len(self.data)):
+            last_seen_regression = _analyze_point(
+                self.data,
+                i,
+                last_seen_regression,
+                self.min_back_window,
+                self.max_back_window,
+                self.fore_window,
+                self.t_threshold,
+            )
+
+        # change points also depend on the t-test score of their neighbours
+        first_changed = max(1, start - 1)
+        for i in range(first_changed, len(self.data)):
+            self.data[i].change_detected = _is_change_point(
+                self.data, i, self.min_back_window, self.fore_window, self.t_threshold
+            )
+
+        reanalyzed = self.data[first_changed - 1 :]
+        self._trim()
+        return reanalyzed
+
+    def _last_seen_regression_before(self, i):
+        count = 0
+        for j in range(i - 1, 0, -1):
+            if self.data[j].t > self.t_threshold:
+                return count
+            count += 1
+        return count + self.start_regression_count
+
+    def _trim(self):
+        excess = len(self.data) - self.max_revisions
+        if excess <= 0:
+            return
+        self.start_regression_count = self._last_seen_regression_before(excess + 1)
+        self.data = self.data[excess:]
+        self.complete = False
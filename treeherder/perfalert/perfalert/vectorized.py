@@ -0,0 +1,210 @@
+"""Array-backed implementation of `perfalert.detect_changes`.
+
+The reference implementation rebuilds the back and fore windows of every
+point and runs `analyze()` over them, which is O(n * window) work in pure
+Python.  Here the per-revision sums are turned into prefix sums once, so the
+weighted means, variances and t-scores of every window can be read off with a
+handful of array operations.
+
+The back window of a point depends on the t-scores computed before it (it
+shrinks back to `min_back_window` after a likely regression), so the t-scores
+are precomputed for every back window width the algorithm can pick and the
+sequential walk only has to select the right one for each point.
+"""
+import numpy as np
+
+
+def _revision_sums(data):
+    counts = np.array([len(d.values) for d in data], dtype=np.int64)
+    values = np.array([v for d in data for v in d.values], dtype=np.float64)
+
+    # center the values so prefix sums of squares don't swamp small windows
+    reference = values.mean() if len(values) else 0.0
+    centered = values - reference
+
+    revision_of_value = np.repeat(np.arange(len(data)), counts)
+    sums = np.bincount(revision_of_value, weights=centered, minlength=len(data))
+    squares = np.bincount(revision_of_value, weights=centered ** 2, minlength=len(data))
+
+    return counts, values, reference, sums, squares
+
+
+def _prefix(arr):
+    return np.concatenate(([0], np.cumsum(arr)))
+
+
+def _run_starts(values):
+    """Index of the first value of the run of equal values each value is in.
+
+    Used to detect windows holding a single repeated value, which the
+    reference implementation reports with a variance of exactly zero.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = values[1:] != values[:-1]
+    return np.maximum.accumulate(np.where(new_run, np.arange(len(values)), 0))
+
+
+class _SeriesSums:
+    def __init__(self, data):
+        counts, self.values, self.reference, sums, squares = _revision_sums(data)
+        index = np.arange(len(data), dtype=np.float64)
+
+        self.c_n = _prefix(counts)
+        self.c_s = _prefix(sums)
+        self.c_q = _prefix(squares)
+        # first moments over the revision index, needed for linear weights
+        self.c_rn = _prefix(index * counts)
+        self.c_rs = _prefix(index * sums)
+        self.run_starts = _run_starts(self.values)
+
+    def constant(self, start, end):
+        """Which of the windows [start, end) contain a single repeated value."""
+        first = self.c_n[start]
+        last = self.c_n[end] - 1
+        non_empty = last >= first
+        return non_empty & (self.run_starts[np.where(non_empty, last, 0)] <= first)
+
+    def stats(self, start, end, weighted_sums, weights_total):
+        """Average and sample variance of each window [start, end).
+
+        The average is `weighted_sums / weights_total`, the variance is the
+        unweighted sample variance around that average, as in `analyze()`.
+        """
+        n = self.c_n[end] - self.c_n[start]
+        s = self.c_s[end] - self.c_s[start]
+        q = self.c_q[end] - self.c_q[start]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg = np.where(n > 0, weighted_sums / weights_total, 0.0)
+            variance = np.where(n > 1, (q - 2 * avg * s + n * avg ** 2) / (n - 1), 0.0)
+        variance = np.maximum(variance, 0.0)
+
+        avg = np.where(n > 0, avg + self.reference, 0.0)
+
+        # report windows of one repeated value exactly, like `analyze()` does
+        constant = self.constant(start, end)
+        avg = np.where(constant, self.values[np.where(constant, self.c_n[start], 0)], avg)
+        variance = np.where(constant, 0.0, variance)
+
+        return avg, n, variance
+
+    def plain_stats(self, start, end):
+        s = self.c_s[end] - self.c_s[start]
+        n = self.c_n[end] - self.c_n[start]
+        return self.stats(start, end, s, n)
+
+    def back_linear_stats(self, start, end):
+        # revision r of the window [start, end) is weighted by (r - start + 1)
+        offset = start - 1
+        return self.stats(
+            start,
+            end,
+            (self.c_rs[end] - self.c_rs[start]) - offset * (self.c_s[end] - self.c_s[start]),
+            (self.c_rn[end] - self.c_rn[start]) - offset * (self.c_n[end] - self.c_n[start]),
+        )
+
+    def fore_linear_stats(self, start, end):
+        # revision r of the window [start, end) is weighted by (end - r)
+        return self.stats(
+            start,
+            end,
+            end * (self.c_s[end] - self.c_s[start]) - (self.c_rs[end] - self.c_rs[start]),
+            end * (self.c_n[end] - self.c_n[start]) - (self.c_rn[end] - self.c_rn[start]),
+        )
+
+
+def _calc_t(back, fore):
+    """Vectorized version of `calc_t()` over precomputed window stats."""
+    avg1, n1, var1 = back
+    avg2, n2, var2 = fore
+    delta = avg2 - avg1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = delta / np.sqrt(var1 / n1 + var2 / n2)
+    t = np.where((var1 == 0) & (var2 == 0), np.inf, t)
+    t = np.where(delta == 0, 0.0, t)
+    t = np.where((n1 == 0) | (n2 == 0), 0.0, t)
+    return np.abs(t)
+
+
+def detect_changes_vectorized(
+    data, min_back_window=12, max_back_window=24, fore_window=12, t_threshold=7
+):
+    """Drop-in replacement for `perfalert.detect_changes`.
+
+    Sets the same attributes on the returned `RevisionDatum` objects and flags
+    the same points with `change_detected`.
+    """
+    data = sorted(data)
+    num_revisions = len(data)
+    if num_revisions < 2:
+        return data
+
+    sums = _SeriesSums(data)
+    c_n = sums.c_n
+    indices = np.arange(1, num_revisions)
+
+    # forward windows don't depend on earlier results: keep taking revisions
+    # until there are at least `fore_window` values
+    if fore_window > 0:
+        fore_end = np.searchsorted(c_n, c_n[indices] + fore_window, side='left')
+        fore_end = np.clip(fore_end, indices + 1, num_revisions)
+    else:
+        fore_end = indices.copy()
+    fore_stats = sums.fore_linear_stats(indices, fore_end)
+
+    # back windows stop once they hold `max_back_window` values, or span more
+    # revisions than the current width allows
+    by_count = np.searchsorted(c_n, c_n[indices] - max_back_window, side='right') - 1
+    min_width = min(max(0, min_back_window), max_back_window)
+    widths = np.arange(min_width, max(min_width, max_back_window) + 1)
+    back_start = np.maximum(indices[np.newaxis, :] - widths[:, np.newaxis], by_count)
+    back_start = np.clip(back_start, 0, indices)
+    t_by_width = _calc_t(sums.back_linear_stats(back_start, indices), fore_stats)
+
+    # walk the series to pick the back window width each point actually uses
+    t_rows = t_by_width.tolist()
+    chosen = np.empty(len(indices), dtype=np.int64)
+    last_seen_regression = 0
+    for column in range(len(indices)):
+        width = min(max(last_seen_regression, min_back_window), max_back_window)
+        row = width - min_width
+        chosen[column] = row
+        if t_rows[row][column] > t_threshold:
+            last_seen_regression = 0
+        else:
+            last_seen_regression += 1
+
+    t = t_by_width[chosen, indices - 1]
+    back_start = back_start[chosen, indices - 1]
+    amount_prev = c_n[indices] - c_n[back_start]
+    amount_next = c_n[fore_end] - c_n[indices]
+    historical = sums.plain_stats(back_start, indices)
+    forward = sums.plain_stats(indices, fore_end)
+
+    for column, i in enumerate(indices):
+        di = data[i]
+        di.t = float(t[column])
+        di.amount_prev_data = int(amount_prev[column])
+        di.amount_next_data = int(amount_next[column])
+        di.historical_stats = _stats_dict(historical, column)
+        di.forward_stats = _stats_dict(forward, column)
+
+    # same peak selection as `detect_changes`
+    all_t = np.array([d.t for d in data])
+    candidates = (amount_prev >= min_back_window) & (amount_next >= fore_window) & (t > t_threshold)
+    candidates &= all_t[indices - 1] <= t
+    next_t = np.append(all_t[2:], -np.inf)
+    candidates &= next_t <= t
+
+    for i in indices[candidates]:
+        data[i].change_detected = True
+
+    return data
+
+
+def _stats_dict(stats, column):
+    avg, n, variance = stats
+    return {"avg": float(avg[column]), "n": int(n[column]), "variance": float(variance[column])}
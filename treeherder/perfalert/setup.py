@@ -23,4 +23,5 @@ setup(
     packages=['perfalert'],
     zip_safe=False,
     install_requires=[],
+    extras_require={'vectorized': ['numpy']},
 )
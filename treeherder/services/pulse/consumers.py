@@ -1,6 +1,7 @@
 import logging
 import threading
 import socket
+import time
 
 import environ
 import newrelic.agent
@@ -8,10 +9,15 @@ from django.conf import settings
 from kombu import Connection, Exchange, Queue
 from kombu.mixins import ConsumerMixin
 
-from treeherder.etl.tasks.pulse_tasks import store_pulse_pushes, store_pulse_tasks
+from treeherder.etl.tasks.pulse_tasks import (
+    store_pulse_pushes,
+    store_pulse_tasks,
+    store_pulse_tasks_batch,
+)
 from treeherder.utils.http import fetch_json
 
 from .exchange import get_exchange
+from .pipeline import TaskPipeline
 
 env = environ.Env()
 logger = logging.getLogger(__name__)
@@ -38,6 +44,10 @@ HGMO_PUSH_BINDINGS = [
     "exchange/hgpushes/v1.#",
 ]
 
+# How often (in seconds) a consumer using a `TaskPipeline` checks for stored messages to
+# acknowledge, when no message is received meanwhile
+PIPELINE_POLL_INTERVAL = 0.1
+
 
 class PulseConsumer(ConsumerMixin):
     """
@@ -52,6 +62,11 @@ class PulseConsumer(ConsumerMixin):
         self.root_url = source['root_url']
         self.source = source
         self.build_routing_key = build_routing_key
+        self.tasks_batch = []
+        self.tasks_batch_started = None
+        self.pipeline = None
+        if settings.PULSE_TASKS_PIPELINE and set(self.bindings()) & set(TASKCLUSTER_TASK_BINDINGS):
+            self.pipeline = TaskPipeline(self.root_url)
 
     def get_consumers(self, Consumer, channel):
         return [Consumer(**c) for c in self.consumers]
@@ -81,6 +96,63 @@ class PulseConsumer(ConsumerMixin):
         # prune stale queues using the binding strings
         self.prune_bindings(bindings)
 
+    def store_task(self, body, exchange, routing_key, message):
+        """
+        Hands a task message to the `store_pulse_tasks` workers, or to the
+        consumer's `TaskPipeline` with `PULSE_TASKS_PIPELINE` enabled.
+
+        With `PULSE_TASKS_BATCH_SIZE` above 1, messages are held back until
+        that many are received or the oldest one waited for
+        `PULSE_TASKS_BATCH_WINDOW` seconds, then handed over together.
+        Messages are acknowledged once handed over.
+        """
+        if self.pipeline is not None:
+            self.pipeline.submit(body, exchange, routing_key, message)
+            return
+
+        if settings.PULSE_TASKS_BATCH_SIZE <= 1:
+            store_pulse_tasks.apply_async(
+                args=[body, exchange, routing_key, self.root_url], queue='store_pulse_tasks'
+            )
+            message.ack()
+            return
+
+        if not self.tasks_batch:
+            self.tasks_batch_started = time.monotonic()
+        self.tasks_batch.append((body, exchange, routing_key, message))
+        if len(self.tasks_batch) >= settings.PULSE_TASKS_BATCH_SIZE:
+            self.flush_tasks()
+
+    def flush_tasks(self):
+        batch, self.tasks_batch = self.tasks_batch, []
+        if not batch:
+            return
+        store_pulse_tasks_batch.apply_async(
+            args=[
+                [[body, exchange, routing_key] for body, exchange, routing_key, _ in batch],
+                self.root_url,
+            ],
+            queue='store_pulse_tasks',
+        )
+        for *_, message in batch:
+            message.ack()
+
+    def consume(self, *args, **kwargs):
+        if self.pipeline is not None:
+            # stored messages have to be acknowledged for more to be received
+            kwargs.setdefault('safety_interval', PIPELINE_POLL_INTERVAL)
+        return super().consume(*args, **kwargs)
+
+    def on_iteration(self):
+        # called at least once a second while waiting for messages
+        if self.pipeline is not None:
+            self.pipeline.process()
+        elif (
+            self.tasks_batch
+            and time.monotonic() - self.tasks_batch_started >= settings.PULSE_TASKS_BATCH_WINDOW
+        ):
+            self.flush_tasks()
+
     def bind_to(self, exchange, routing_key):
         if not self.queue:
             self.queue = Queue(
@@ -91,7 +163,10 @@ class PulseConsumer(ConsumerMixin):
                 durable=True,
                 auto_delete=settings.PULSE_AUTO_DELETE_QUEUES,
             )
-            self.consumers.append(dict(queues=self.queue, callbacks=[self.on_message]))
+            consumer = dict(queues=self.queue, callbacks=[self.on_message])
+            if self.pipeline is not None:
+                consumer['prefetch_count'] = settings.PULSE_TASKS_PIPELINE_CONCURRENCY
+            self.consumers.append(consumer)
             # just in case the queue does not already exist on Pulse
             self.queue.declare()
         else:
@@ -153,10 +228,7 @@ class TaskConsumer(PulseConsumer):
         exchange = message.delivery_info['exchange']
         routing_key = message.delivery_info['routing_key']
         logger.debug('received job message from %s#%s', exchange, routing_key)
-        store_pulse_tasks.apply_async(
-            args=[body, exchange, routing_key, self.root_url], queue='store_pulse_tasks'
-        )
-        message.ack()
+        self.store_task(body, exchange, routing_key, message)
 
 
 class PushConsumer(PulseConsumer):
@@ -207,14 +279,12 @@ class JointConsumer(PulseConsumer):
         routing_key = message.delivery_info['routing_key']
         logger.debug('received job message from %s#%s', exchange, routing_key)
         if exchange.startswith('exchange/taskcluster-queue/v1/'):
-            store_pulse_tasks.apply_async(
-                args=[body, exchange, routing_key, self.root_url], queue='store_pulse_tasks'
-            )
+            self.store_task(body, exchange, routing_key, message)
         else:
             store_pulse_pushes.apply_async(
                 args=[body, exchange, routing_key, self.root_url], queue='store_pulse_pushes'
             )
-        message.ack()
+            message.ack()
 
 
 class Consumers:
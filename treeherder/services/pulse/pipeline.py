@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import newrelic.agent
+from django.conf import settings
+from django.db import close_old_connections
+
+from treeherder.etl.job_loader import JobLoader
+from treeherder.etl.taskcluster_pulse import handler
+from treeherder.etl.tasks.pulse_tasks import store_pulse_tasks
+
+logger = logging.getLogger(__name__)
+
+_started_loops = set()
+_started_loops_lock = threading.Lock()
+
+
+def start_event_loop(loop):
+    """Runs `loop` in a background thread, unless it was already started."""
+    with _started_loops_lock:
+        if loop not in _started_loops:
+            _started_loops.add(loop)
+            threading.Thread(target=loop.run_forever, name='pulse-tasks-loop', daemon=True).start()
+
+
+class TaskPipeline:
+    """
+    Stores the jobs of task messages within the Pulse listener, instead of
+    handing the messages to the `store_pulse_tasks` workers.
+
+    The tasks of the messages received are fetched and transformed
+    concurrently, on an event loop running in a background thread.  Handled
+    messages are stored in batches, as `store_pulse_tasks_batch` does, and
+    acknowledged once their jobs are committed.  Messages which can't be
+    stored with their batch are handed to `store_pulse_tasks`, to be retried
+    on their own.
+
+    Apart from `submit`'s callback, everything runs on the thread of the
+    consumer, which owns the AMQP channel.  The consumer's prefetch count
+    bounds the number of messages handled at once: no more messages are
+    delivered until stored ones are acknowledged.
+    """
+
+    def __init__(self, root_url, loop=None):
+        self.root_url = root_url
+        self.loop = loop or handler.loop
+        self.in_flight = 0
+        self.handled = queue.Queue()
+        self.batch = []
+        self.batch_started = None
+
+    def submit(self, body, exchange, routing_key, message):
+        """Starts handling a task message."""
+        start_event_loop(self.loop)
+        self.in_flight += 1
+        future = asyncio.run_coroutine_threadsafe(
+            handler.handleMessage(
+                {"exchange": exchange, "payload": body, "root_url": self.root_url}
+            ),
+            self.loop,
+        )
+        # called from the thread of the event loop
+        future.add_done_callback(
+            lambda future: self.handled.put(((body, exchange, routing_key), message, future))
+        )
+
+    def process(self):
+        """Stores the handled messages once they make a batch."""
+        while True:
+            try:
+                handled = self.handled.get_nowait()
+            except queue.Empty:
+                break
+            self.in_flight -= 1
+            if not self.batch:
+                self.batch_started = time.monotonic()
+            self.batch.append(handled)
+
+        if self.batch and (
+            # nothing more to wait for
+            not self.in_flight
+            or len(self.batch) >= settings.PULSE_TASKS_BATCH_SIZE
+            or time.monotonic() - self.batch_started >= settings.PULSE_TASKS_BATCH_WINDOW
+        ):
+            self.store()
+
+    @newrelic.agent.background_task(name='pulse-listener-tasks.store', group='Pulse Listener')
+    def store(self):
+        batch, self.batch = self.batch, []
+        newrelic.agent.add_custom_parameter("messages", len(batch))
+
+        retried = set()
+        runs = []
+        for index, (_, _, future) in enumerate(batch):
+            try:
+                runs.extend((index, run) for run in future.result() if run)
+            except Exception as e:
+                logger.warning("Failed to handle a task message: %s", e)
+                retried.add(index)
+
+        # the connection can be left over from long ago
+        close_old_connections()
+        try:
+            failed = JobLoader().process_jobs([run for _, run in runs], self.root_url)
+        except Exception:
+            logger.exception("Failed to store a batch of %s task messages", len(batch))
+            failed = [run for _, run in runs]
+        failed_ids = {id(run) for run in failed}
+        retried.update(index for index, run in runs if id(run) in failed_ids)
+
+        for index in sorted(retried):
+            store_pulse_tasks.apply_async(
+                args=[*batch[index][0], self.root_url], queue='store_pulse_tasks'
+            )
+        for _, message, _ in batch:
+            message.ack()
@@ -1,8 +1,78 @@
+import newrelic.agent
 import taskcluster_urls
+from django.conf import settings
+from django.core.cache import cache
 
 from treeherder.utils.http import fetch_json
+from treeherder.utils.lru import LRUCache
+
+TASK_DEFINITION_CACHE_KEY = 'task-definition-{}-{}'
+
+
+class TaskDefinitionCache:
+    """
+    Cache of Taskcluster task definitions, by root url and task id.
+
+    A task produces several pulse messages (pending, running, completed,
+    reruns) but its definition never changes once created, so it only needs
+    to be fetched once.  Definitions are kept in process, and optionally in
+    the cache shared by all processes when `TASK_DEFINITION_SHARED_CACHE` is
+    enabled, since the messages of a task are usually handled by different
+    workers.
+
+    Each lookup records a `Custom/TaskDefinitionCache/Hit` metric of 1 for a
+    hit and 0 for a miss, whose average is the hit rate.
+    """
+
+    def __init__(self, max_size, timeout, shared=False):
+        self.timeout = timeout
+        self.shared = shared
+        self.definitions = LRUCache(max_size, timeout=timeout)
+        self.shared_hits = 0
+
+    @property
+    def counters(self):
+        counters = self.definitions.counters
+        # a shared hit is a miss of the in-process cache
+        counters['misses'] -= self.shared_hits
+        counters['shared_hits'] = self.shared_hits
+        return counters
+
+    def clear(self):
+        self.definitions.clear()
+        self.shared_hits = 0
+
+    def get(self, root_url, task_id):
+        """Returns the cached definition of a task, or None."""
+        key = (root_url, task_id)
+        task = self.definitions.get(key)
+        if task is None and self.shared:
+            task = cache.get(TASK_DEFINITION_CACHE_KEY.format(root_url, task_id))
+            if task is not None:
+                self.shared_hits += 1
+                self.definitions.set(key, task)
+        newrelic.agent.record_custom_metric(
+            'Custom/TaskDefinitionCache/Hit', 0 if task is None else 1
+        )
+        return task
+
+    def set(self, root_url, task_id, task):
+        self.definitions.set((root_url, task_id), task)
+        if self.shared:
+            cache.set(TASK_DEFINITION_CACHE_KEY.format(root_url, task_id), task, self.timeout)
+
+
+task_definitions = TaskDefinitionCache(
+    settings.TASK_DEFINITION_CACHE_SIZE,
+    settings.TASK_DEFINITION_CACHE_TIMEOUT,
+    shared=settings.TASK_DEFINITION_SHARED_CACHE,
+)
 
 
 def get_task_definition(root_url, task_id):
-    task_url = taskcluster_urls.api(root_url, 'queue', 'v1', 'task/{}'.format(task_id))
-    return fetch_json(task_url)
+    task = task_definitions.get(root_url, task_id)
+    if task is None:
+        task_url = taskcluster_urls.api(root_url, 'queue', 'v1', 'task/{}'.format(task_id))
+        task = fetch_json(task_url)
+        task_definitions.set(root_url, task_id, task)
+    return task